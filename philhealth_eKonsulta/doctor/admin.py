@@ -1,26 +1,84 @@
 from django.contrib import admin
-from .models import Medicine, Consultation, Prescription
+from .models import Medicine, Consultation, Prescription, PrescriptionStat, DiagnosisCode, DoctorPatient, DrugInteraction, MedicinePrice, StockMovement
+
+# (10/19/2026) - Price history on the medicine page, future-dated rows schedule a price change
+class MedicinePriceInline(admin.TabularInline):
+    model = MedicinePrice
+    extra = 0
+    fields = ('price', 'effective_from', 'created_at')
+    readonly_fields = ('created_at',)
+
 
 # (12/18/2025 - Gocotano) - Register Medicine model for admin management
 @admin.register(Medicine)
 class MedicineAdmin(admin.ModelAdmin):
-    list_display = ('name', 'price', 'is_active', 'created_at')
-    search_fields = ('name', 'description')
-    list_filter = ('is_active', 'created_at')
+    list_display = ('name', 'price', 'active_ingredients', 'track_stock', 'stock_quantity', 'reorder_level', 'is_active', 'created_at')
+    search_fields = ('name', 'description', 'active_ingredients')
+    list_filter = ('is_active', 'track_stock', 'created_at')
+    readonly_fields = ('stock_quantity',)  # (10/19/2026) - Changed through stock receipts so the ledger stays complete
     ordering = ('name',)
+    inlines = [MedicinePriceInline]
 
 
 # (12/18/2025 - Gocotano) - Register Consultation model for admin management
 @admin.register(Consultation)
 class ConsultationAdmin(admin.ModelAdmin):
-    list_display = ('appointment', 'doctor', 'diagnosis', 'date')
-    search_fields = ('appointment__patient__first_name', 'appointment__patient__last_name', 'diagnosis')
+    list_display = ('appointment', 'doctor', 'diagnosis_code', 'diagnosis', 'date')
+    search_fields = ('appointment__patient__first_name', 'appointment__patient__last_name', 'diagnosis', 'diagnosis_code__code')
+    raw_id_fields = ('diagnosis_code',)  # (10/19/2026) - Avoid rendering every ICD-10 code in a dropdown
     list_filter = ('date', 'doctor')
 
 
 # (12/18/2025 - Gocotano) - Register Prescription model for admin management
 @admin.register(Prescription)
 class PrescriptionAdmin(admin.ModelAdmin):
-    list_display = ('consultation', 'medicine', 'quantity', 'get_total_price', 'created_at')
+    list_display = ('consultation', 'medicine', 'quantity', 'unit_price', 'get_total_price', 'created_at')
     search_fields = ('consultation__appointment__patient__first_name', 'medicine__name')
     list_filter = ('created_at', 'medicine')
+
+
+# (10/19/2026) - Register PrescriptionStat model for admin management
+@admin.register(PrescriptionStat)
+class PrescriptionStatAdmin(admin.ModelAdmin):
+    list_display = ('doctor', 'keyword', 'medicine', 'times_prescribed', 'total_quantity', 'last_prescribed_at')
+    search_fields = ('keyword', 'medicine__name', 'doctor__username')
+    list_filter = ('doctor',)
+
+
+# (10/19/2026) - Register DiagnosisCode model for admin management
+@admin.register(DiagnosisCode)
+class DiagnosisCodeAdmin(admin.ModelAdmin):
+    list_display = ('code', 'description', 'is_active')
+    search_fields = ('code', 'description')
+    list_filter = ('is_active',)
+
+
+# (10/19/2026) - Register DoctorPatient model for admin management
+@admin.register(DoctorPatient)
+class DoctorPatientAdmin(admin.ModelAdmin):
+    list_display = ('doctor', 'patient', 'first_seen', 'last_seen', 'visit_count')
+    search_fields = ('patient__first_name', 'patient__last_name')
+    list_filter = ('doctor',)
+
+
+# (10/19/2026) - Register DrugInteraction model for admin management
+@admin.register(DrugInteraction)
+class DrugInteractionAdmin(admin.ModelAdmin):
+    list_display = ('ingredient_a', 'ingredient_b', 'severity', 'description')
+    search_fields = ('ingredient_a', 'ingredient_b')
+    list_filter = ('severity',)
+
+
+# (10/19/2026) - Register StockMovement model for admin viewing, the ledger is written by doctor/inventory.py only
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('medicine', 'change', 'balance_after', 'reason', 'reference', 'created_by', 'created_at')
+    search_fields = ('medicine__name', 'reference')
+    list_filter = ('reason', 'created_at')
+    raw_id_fields = ('medicine', 'prescription')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
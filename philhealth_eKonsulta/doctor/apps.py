@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class DoctorConfig(AppConfig):
     name = 'doctor'
+
+    # (10/19/2026) - Register model signal handlers
+    def ready(self):
+        from . import signals  # noqa: F401
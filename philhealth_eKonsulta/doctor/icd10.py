@@ -0,0 +1,113 @@
+# (10/19/2026) - In-memory ICD-10 prefix trie for diagnosis code autocomplete
+
+import csv
+import re
+import threading
+from bisect import bisect_left
+from django.conf import settings
+
+CODE_PATTERN = re.compile(r'^[A-Z][0-9][0-9A-Z]*$')
+
+
+# (10/19/2026) - Read (code, description) pairs from the ICD-10 reference file
+def read_codes(path):
+    with open(path, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            code = (row.get('code') or '').strip().upper()
+            description = (row.get('description') or '').strip()
+            if code and description:
+                yield code, description
+
+
+def normalize_code(code):
+    return (code or '').upper().replace('.', '').strip()
+
+
+class _Node:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        # Sorted indexes of every entry reachable under this prefix
+        self.entries = []
+
+
+# (10/19/2026) - Prefix trie over codes (upper case, no dot) and description words (lower case)
+class Icd10Trie:
+    def __init__(self, codes):
+        self.codes = sorted(codes)
+        self.by_code = {normalize_code(code): (code, description) for code, description in self.codes}
+        self.root = _Node()
+        for index, (code, description) in enumerate(self.codes):
+            self._insert(normalize_code(code), index)
+            for word in set(re.findall(r'[a-z0-9]+', description.lower())):
+                self._insert(word, index)
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(read_codes(path))
+
+    def _insert(self, key, index):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            # Entries are inserted in order so only the last one can be a duplicate
+            if not node.entries or node.entries[-1] != index:
+                node.entries.append(index)
+
+    def _find(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.entries
+
+    def __len__(self):
+        return len(self.codes)
+
+    def get(self, code):
+        return self.by_code.get(normalize_code(code))
+
+    # (10/19/2026) - Match a code prefix, or every word prefix in a description search
+    def search(self, query, limit=10):
+        query = (query or '').strip()
+        if not query:
+            return []
+
+        code = normalize_code(query)
+        if CODE_PATTERN.match(code):
+            return [self.codes[index] for index in self._find(code)[:limit]]
+
+        words = re.findall(r'[a-z0-9]+', query.lower())
+        if not words:
+            return []
+        candidates = sorted((self._find(word) for word in words), key=len)
+        smallest, others = candidates[0], candidates[1:]
+
+        results = []
+        for index in smallest:
+            if all(_contains(entries, index) for entries in others):
+                results.append(self.codes[index])
+                if len(results) == limit:
+                    break
+        return results
+
+
+def _contains(entries, index):
+    position = bisect_left(entries, index)
+    return position < len(entries) and entries[position] == index
+
+
+_trie = None
+_trie_lock = threading.Lock()
+
+
+# (10/19/2026) - Process-wide trie, built from the reference file on first use
+def get_trie():
+    global _trie
+    if _trie is None:
+        with _trie_lock:
+            if _trie is None:
+                _trie = Icd10Trie.from_file(settings.ICD10_CODES_FILE)
+    return _trie
@@ -0,0 +1,145 @@
+# (10/19/2026) - Drug interaction checking against an in-memory pair index
+#
+# The DrugInteraction table (loaded from doctor/data/drug_interactions.csv with
+# `load_drug_interactions`) is compiled once per process into a dict keyed by the sorted
+# pair of normalized active ingredients. Medicines are mapped to their ingredients at the
+# same time, so checking a prescription is only dictionary lookups.
+#
+# Saving a rule or a medicine resets the index of the process that saved it. Every other
+# process (gunicorn worker, or after a `load_drug_interactions` run) recompiles once its copy is
+# INTERACTION_INDEX_TTL seconds old, or as soon as it is asked about a medicine it has not seen.
+
+import csv
+import re
+import threading
+import time
+from itertools import combinations
+from .models import DrugInteraction, Medicine
+
+SEVERITY_ORDER = {'MAJOR': 0, 'MODERATE': 1, 'MINOR': 2}
+# Longest time another process keeps checking against rules that were changed
+INTERACTION_INDEX_TTL = 60
+
+# Dosage forms and marketing words that show up in medicine names but are not ingredients
+NON_INGREDIENT_WORDS = {
+    'tablet', 'tablets', 'tab', 'capsule', 'capsules', 'cap', 'cream', 'ointment', 'drops', 'eye', 'ear',
+    'suspension', 'syrup', 'inhaler', 'patch', 'oil', 'solution', 'otic', 'forte', 'advance', 'cardio',
+}
+DOSE_PATTERN = re.compile(r'\d+(\.\d+)?\s*(mg|mcg|g|ml|iu|%)?')
+
+
+# (10/19/2026) - "Aluminum/Magnesium Hydroxide 500mg" -> "aluminum magnesium hydroxide"
+def normalize_ingredient(text):
+    text = DOSE_PATTERN.sub(' ', (text or '').lower())
+    words = [word for word in re.findall(r'[a-z]+', text) if word not in NON_INGREDIENT_WORDS]
+    return ' '.join(words)
+
+
+# (10/19/2026) - Ingredients of a medicine: the explicit list if set, otherwise parsed from
+# names like "Bioflu (Phenylephrine + Chlorphenamine + Paracetamol)"
+def medicine_ingredients(name, active_ingredients=''):
+    if active_ingredients:
+        parts = re.split(r'[+,;]', active_ingredients)
+    else:
+        inner = re.findall(r'\(([^)]*)\)', name or '')
+        outer = re.sub(r'\([^)]*\)', ' ', name or '')
+        parts = [outer]
+        for group in inner:
+            parts.extend(re.split(r'[+,;]', group))
+    # Single letters ("Vitamins A, C, E") are too ambiguous to match on
+    return {ingredient for ingredient in map(normalize_ingredient, parts) if len(ingredient) > 2}
+
+
+def interaction_key(ingredient_a, ingredient_b):
+    return tuple(sorted((normalize_ingredient(ingredient_a), normalize_ingredient(ingredient_b))))
+
+
+# (10/19/2026) - Read rules from the reference CSV (ingredient_a,ingredient_b,severity,description)
+def read_interactions(path):
+    with open(path, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            key = interaction_key(row.get('ingredient_a'), row.get('ingredient_b'))
+            severity = (row.get('severity') or '').strip().upper()
+            if all(key) and key[0] != key[1] and severity in SEVERITY_ORDER:
+                yield key, severity, (row.get('description') or '').strip()
+
+
+class InteractionIndex:
+    def __init__(self, rules, medicines):
+        # (ingredient, ingredient) -> (severity, description)
+        self.pairs = {key: (severity, description) for key, severity, description in rules}
+        # medicine id -> (name, ingredients)
+        self.medicines = {
+            medicine_id: (name, medicine_ingredients(name, active_ingredients))
+            for medicine_id, name, active_ingredients in medicines
+        }
+
+    # (10/19/2026) - Warnings for a list of medicine ids, most severe first
+    def check(self, medicine_ids):
+        items = []
+        for medicine_id in dict.fromkeys(medicine_ids):
+            if medicine_id in self.medicines:
+                items.append((medicine_id, *self.medicines[medicine_id]))
+
+        warnings = []
+        for (id_a, name_a, ingredients_a), (id_b, name_b, ingredients_b) in combinations(items, 2):
+            for shared in sorted(ingredients_a & ingredients_b):
+                warnings.append({
+                    'severity': 'MODERATE',
+                    'medicines': [name_a, name_b],
+                    'medicine_ids': [id_a, id_b],
+                    'description': f'Both contain {shared}; check the total dose.',
+                })
+            for ingredient_a in ingredients_a:
+                for ingredient_b in ingredients_b:
+                    if ingredient_a == ingredient_b:
+                        continue
+                    rule = self.pairs.get((ingredient_a, ingredient_b) if ingredient_a < ingredient_b else (ingredient_b, ingredient_a))
+                    if rule:
+                        warnings.append({
+                            'severity': rule[0],
+                            'medicines': [name_a, name_b],
+                            'medicine_ids': [id_a, id_b],
+                            'description': rule[1],
+                        })
+        warnings.sort(key=lambda warning: SEVERITY_ORDER[warning['severity']])
+        return warnings
+
+
+_index = None
+_index_expires = 0.0
+# Bumped by every reset, so a compile that started before a reset is not kept
+_generation = 0
+_index_lock = threading.Lock()
+
+
+# (10/19/2026) - Process-wide index, compiled from the database on first use and again once it
+# is INTERACTION_INDEX_TTL seconds old. A medicine in medicine_ids that the index does not know
+# but the database has was added since it was compiled, so it is compiled again.
+def get_interaction_index(medicine_ids=()):
+    global _index, _index_expires
+    index = _index
+    if index is not None and time.monotonic() < _index_expires:
+        unknown = [medicine_id for medicine_id in medicine_ids if medicine_id not in index.medicines]
+        if not unknown or not Medicine.objects.filter(id__in=unknown).exists():
+            return index
+    with _index_lock:
+        if _index is not None and _index is not index and time.monotonic() < _index_expires:
+            return _index
+        generation = _generation
+        rules = DrugInteraction.objects.values_list('ingredient_a', 'ingredient_b', 'severity', 'description')
+        compiled = InteractionIndex(
+            (((a, b), severity, description) for a, b, severity, description in rules),
+            Medicine.objects.values_list('id', 'name', 'active_ingredients'),
+        )
+        if generation == _generation:
+            _index = compiled
+            _index_expires = time.monotonic() + INTERACTION_INDEX_TTL
+    return compiled
+
+
+# (10/19/2026) - Called from the DrugInteraction/Medicine signals; the next check recompiles
+def reset_interaction_index():
+    global _index, _generation
+    _generation += 1
+    _index = None
@@ -0,0 +1,91 @@
+# (10/19/2026) - Pharmacy stock: dispensing and receiving for medicines with track_stock set
+#
+# Every change goes through apply_stock_changes(), which locks the affected Medicine rows in
+# primary key order (so two consultations prescribing the same items cannot deadlock), checks
+# the balances, moves stock with a single F() update and writes the ledger rows.
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F, Q, Case, When, Value
+from .models import Medicine, StockMovement
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        # [(medicine name, available, requested)]
+        self.shortages = shortages
+        super().__init__('Insufficient stock: ' + ', '.join(
+            f'{name} (available {available}, requested {requested})' for name, available, requested in shortages
+        ))
+
+
+# (10/19/2026) - lines: [(medicine_id, signed quantity, prescription or None)]
+def apply_stock_changes(lines, reason, user=None, reference=''):
+    totals = defaultdict(int)
+    for medicine_id, change, _ in lines:
+        totals[medicine_id] += change
+
+    with transaction.atomic():
+        locked = list(
+            Medicine.objects.select_for_update()
+            .filter(pk__in=totals, track_stock=True)
+            .order_by('pk')
+            .values_list('pk', 'name', 'stock_quantity')
+        )
+        if not locked:
+            return []
+
+        shortages = [
+            (name, stock, -totals[pk]) for pk, name, stock in locked if stock + totals[pk] < 0
+        ]
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        Medicine.objects.filter(pk__in=[pk for pk, _, _ in locked]).update(
+            stock_quantity=F('stock_quantity') + Case(
+                *[When(pk=pk, then=Value(totals[pk])) for pk, _, _ in locked], default=Value(0)
+            )
+        )
+
+        balances = {pk: stock for pk, _, stock in locked}
+        movements = []
+        for medicine_id, change, prescription in lines:
+            if medicine_id not in balances:
+                continue  # Not stock tracked
+            balances[medicine_id] += change
+            movements.append(StockMovement(
+                medicine_id=medicine_id,
+                change=change,
+                balance_after=balances[medicine_id],
+                reason=reason,
+                prescription=prescription,
+                reference=reference,
+                created_by=user,
+            ))
+        return StockMovement.objects.bulk_create(movements)
+
+
+# (10/19/2026) - Take the prescribed quantities out of stock, raises InsufficientStock
+def dispense_prescriptions(prescriptions, user=None):
+    return apply_stock_changes(
+        [(prescription.medicine_id, -prescription.quantity, prescription) for prescription in prescriptions],
+        'DISPENSE',
+        user=user,
+    )
+
+
+# (10/19/2026) - Bulk receipt: quantities is {medicine_id: received quantity}
+def receive_stock(quantities, user=None, reference=''):
+    return apply_stock_changes(
+        [(medicine_id, quantity, None) for medicine_id, quantity in quantities.items() if quantity > 0],
+        'RECEIPT',
+        user=user,
+        reference=reference,
+    )
+
+
+# (10/19/2026) - Same predicate as the medicine_low_stock_idx partial index
+def low_stock():
+    return Medicine.objects.filter(
+        Q(track_stock=True, is_active=True, stock_quantity__lte=F('reorder_level'))
+    ).order_by('name')
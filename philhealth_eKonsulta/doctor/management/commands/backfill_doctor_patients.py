@@ -0,0 +1,28 @@
+# (10/19/2026) - Management command to rebuild the DoctorPatient relation from existing appointments
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from secretary.models import Appointment
+from doctor.models import DoctorPatient
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the doctor/patient relationship table used by My Patients'
+
+    def handle(self, *args, **options):
+        pairs = Appointment.objects.filter(
+            status__in=DoctorPatient.ACTIVE_STATUSES
+        ).values('doctor_id', 'patient_id').annotate(
+            first_seen=Min('date'),
+            last_seen=Max('date'),
+            visit_count=Count('id', filter=Q(status='COMPLETED')),
+        ).order_by()
+
+        links = [DoctorPatient(**pair) for pair in pairs.iterator(chunk_size=2000)]
+
+        with transaction.atomic():
+            DoctorPatient.objects.all().delete()
+            DoctorPatient.objects.bulk_create(links, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'Done! Linked {len(links)} doctor/patient pairs'))
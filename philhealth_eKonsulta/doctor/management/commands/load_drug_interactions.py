@@ -0,0 +1,38 @@
+# (10/19/2026) - Management command to load drug interaction rules from the reference CSV
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from doctor.models import DrugInteraction
+from doctor.interactions import read_interactions, reset_interaction_index, INTERACTION_INDEX_TTL
+
+
+class Command(BaseCommand):
+    help = 'Load drug interaction rules (ingredient_a,ingredient_b,severity,description) into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(settings.DRUG_INTERACTIONS_FILE), help='Path to the interactions CSV file')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING(f'Loading drug interactions from {options["file"]}...'))
+
+        existing = {(rule.ingredient_a, rule.ingredient_b): rule for rule in DrugInteraction.objects.all()}
+        to_create = []
+        to_update = []
+
+        for (ingredient_a, ingredient_b), severity, description in read_interactions(options['file']):
+            current = existing.get((ingredient_a, ingredient_b))
+            if current is None:
+                to_create.append(DrugInteraction(
+                    ingredient_a=ingredient_a, ingredient_b=ingredient_b, severity=severity, description=description
+                ))
+            elif (current.severity, current.description) != (severity, description):
+                current.severity = severity
+                current.description = description
+                to_update.append(current)
+
+        DrugInteraction.objects.bulk_create(to_create, batch_size=1000)
+        DrugInteraction.objects.bulk_update(to_update, ['severity', 'description'], batch_size=1000)
+        reset_interaction_index()
+
+        self.stdout.write(self.style.SUCCESS(f'Done! Created: {len(to_create)}, Updated: {len(to_update)}'))
+        self.stdout.write(self.style.WARNING(f'Running app servers pick up the rules within {INTERACTION_INDEX_TTL} seconds.'))
@@ -0,0 +1,34 @@
+# (10/19/2026) - Management command to load the ICD-10 reference file into the DiagnosisCode table
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from doctor.models import DiagnosisCode
+from doctor.icd10 import read_codes
+
+
+class Command(BaseCommand):
+    help = 'Load ICD-10 diagnosis codes from the reference CSV file (code,description)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(settings.ICD10_CODES_FILE), help='Path to the ICD-10 CSV file')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING(f'Loading ICD-10 codes from {options["file"]}...'))
+
+        existing = {code.code: code for code in DiagnosisCode.objects.all()}
+        to_create = []
+        to_update = []
+
+        for code, description in read_codes(options['file']):
+            current = existing.get(code)
+            if current is None:
+                to_create.append(DiagnosisCode(code=code, description=description))
+            elif current.description != description or not current.is_active:
+                current.description = description
+                current.is_active = True
+                to_update.append(current)
+
+        DiagnosisCode.objects.bulk_create(to_create, batch_size=1000)
+        DiagnosisCode.objects.bulk_update(to_update, ['description', 'is_active'], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'Done! Created: {len(to_create)}, Updated: {len(to_update)}'))
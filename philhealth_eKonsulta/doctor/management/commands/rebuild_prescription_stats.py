@@ -0,0 +1,38 @@
+# (10/19/2026) - Management command to rebuild the per-doctor prescription counters from history
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from doctor.models import Prescription, PrescriptionStat, diagnosis_keywords
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the frequently prescribed medicine counters from existing prescriptions'
+
+    def handle(self, *args, **options):
+        prescriptions = Prescription.objects.values_list(
+            'consultation__doctor_id', 'medicine_id', 'consultation__diagnosis', 'quantity', 'created_at'
+        ).order_by('id')
+
+        # (10/19/2026) - Fold the history into counters first, one row per (doctor, keyword, medicine)
+        counters = {}
+        count = 0
+        for doctor_id, medicine_id, diagnosis, quantity, created_at in prescriptions.iterator(chunk_size=2000):
+            for keyword in [''] + diagnosis_keywords(diagnosis):
+                stat = counters.get((doctor_id, keyword, medicine_id))
+                if stat is None:
+                    stat = counters[(doctor_id, keyword, medicine_id)] = PrescriptionStat(
+                        doctor_id=doctor_id,
+                        keyword=keyword,
+                        medicine_id=medicine_id,
+                        last_prescribed_at=created_at,
+                    )
+                stat.times_prescribed += 1
+                stat.total_quantity += quantity
+                stat.last_prescribed_at = max(stat.last_prescribed_at, created_at)
+            count += 1
+
+        with transaction.atomic():
+            PrescriptionStat.objects.all().delete()
+            PrescriptionStat.objects.bulk_create(counters.values(), batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(counters)} counters from {count} prescriptions'))
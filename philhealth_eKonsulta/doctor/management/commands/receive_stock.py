@@ -0,0 +1,29 @@
+# (10/19/2026) - Management command to receive a pharmacy delivery from a CSV file
+
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from doctor.models import Medicine
+from doctor.inventory import receive_stock
+
+
+class Command(BaseCommand):
+    help = 'Add received quantities (medicine,quantity) to pharmacy stock; medicine is an id or exact name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', required=True, help='Path to the receipt CSV file')
+        parser.add_argument('--reference', default='', help='Delivery receipt or invoice number')
+
+    def handle(self, *args, **options):
+        with open(options['file'], newline='', encoding='utf-8') as handle:
+            rows = [(row['medicine'].strip(), row['quantity'].strip()) for row in csv.DictReader(handle)]
+
+        names = {name.lower(): pk for pk, name in Medicine.objects.filter(track_stock=True).values_list('pk', 'name')}
+        quantities = {}
+        for medicine, quantity in rows:
+            pk = int(medicine) if medicine.isdigit() else names.get(medicine.lower())
+            if pk is None or not quantity.isdigit():
+                raise CommandError(f'Invalid receipt line: {medicine},{quantity}')
+            quantities[pk] = quantities.get(pk, 0) + int(quantity)
+
+        movements = receive_stock(quantities, reference=options['reference'])
+        self.stdout.write(self.style.SUCCESS(f'Done! Received stock for {len(movements)} medicine(s).'))
@@ -0,0 +1,50 @@
+# (10/19/2026) - Doctor dashboard metrics, computed in one aggregate query and cached per doctor
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from secretary.models import Appointment
+
+METRICS_TIMEOUT = 60 * 10
+
+
+def metrics_cache_key(doctor_profile_id):
+    return f"doctor_metrics:{doctor_profile_id}"
+
+
+# (10/19/2026) - Appointment counts, this week's consultations and revenue for one DoctorProfile
+def get_doctor_metrics(doctor_profile):
+    today = timezone.localdate()
+    key = metrics_cache_key(doctor_profile.id)
+
+    metrics = cache.get(key)
+    if metrics is not None and metrics['day'] == today:
+        return metrics
+
+    week_start = timezone.make_aware(datetime.combine(today - timedelta(days=today.weekday()), time.min))
+    # Appointment -> consultation -> billing are one-to-one, so the joins never multiply rows
+    metrics = Appointment.objects.filter(doctor=doctor_profile).aggregate(
+        today_appointments=Count('id', filter=Q(date__date=today, status='PENDING')),
+        total_pending=Count('id', filter=Q(status='PENDING')),
+        total_approved=Count('id', filter=Q(status='APPROVE')),
+        total_completed=Count('id', filter=Q(status='COMPLETED')),
+        consultations_this_week=Count(
+            'consultation', filter=Q(status='COMPLETED', consultation__date__gte=week_start)
+        ),
+        revenue=Coalesce(
+            Sum('consultation__billing__total_amount'),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+    metrics['day'] = today
+    cache.set(key, metrics, METRICS_TIMEOUT)
+    return metrics
+
+
+def invalidate_doctor_metrics(doctor_profile_id):
+    if doctor_profile_id:
+        cache.delete(metrics_cache_key(doctor_profile_id))
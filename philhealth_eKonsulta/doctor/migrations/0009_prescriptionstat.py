@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0008_alter_consultation_id_alter_medicine_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrescriptionStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(blank=True, default='', max_length=50)),
+                ('times_prescribed', models.PositiveIntegerField(default=0)),
+                ('total_quantity', models.PositiveIntegerField(default=0)),
+                ('last_prescribed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescription_stats', to=settings.AUTH_USER_MODEL)),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescription_stats', to='doctor.medicine')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor', 'keyword', '-times_prescribed'], name='prescription_stat_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'keyword', 'medicine'), name='unique_prescription_stat')],
+            },
+        ),
+    ]
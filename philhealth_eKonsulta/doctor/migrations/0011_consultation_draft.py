@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0010_diagnosiscode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultation',
+            name='prescriptions_draft',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0012_doctorpatient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicine',
+            name='active_ingredients',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='DrugInteraction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient_a', models.CharField(max_length=100)),
+                ('ingredient_b', models.CharField(max_length=100)),
+                ('severity', models.CharField(choices=[('MAJOR', 'Major'), ('MODERATE', 'Moderate'), ('MINOR', 'Minor')], default='MODERATE', max_length=10)),
+                ('description', models.TextField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ingredient_a', 'ingredient_b'), name='unique_drug_interaction')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+# Existing prescriptions were billed at the current list price, so that becomes their snapshot,
+# and every medicine starts its history with the current price.
+def snapshot_prices(apps, schema_editor):
+    Medicine = apps.get_model('doctor', 'Medicine')
+    MedicinePrice = apps.get_model('doctor', 'MedicinePrice')
+    Prescription = apps.get_model('doctor', 'Prescription')
+
+    Prescription.objects.filter(unit_price__isnull=True).update(
+        unit_price=Subquery(Medicine.objects.filter(pk=OuterRef('medicine_id')).values('price')[:1])
+    )
+    MedicinePrice.objects.bulk_create(
+        [
+            MedicinePrice(medicine_id=medicine_id, price=price, effective_from=created_at)
+            for medicine_id, price, created_at in Medicine.objects.values_list('id', 'price', 'created_at')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0013_drug_interactions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prescription',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='MedicinePrice',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('effective_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='doctor.medicine')),
+            ],
+            options={
+                'ordering': ['-effective_from'],
+                'indexes': [models.Index(fields=['medicine', '-effective_from'], name='medicine_price_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('medicine', 'effective_from'), name='unique_medicine_price_date')],
+            },
+        ),
+        migrations.RunPython(snapshot_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='prescription',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
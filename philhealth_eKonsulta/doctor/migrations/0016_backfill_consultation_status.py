@@ -0,0 +1,25 @@
+# (10/19/2026) - Consultations saved before drafts existed were never marked COMPLETED
+
+from django.db import migrations
+from django.db.models import Q
+
+
+# Before autosave a consultation row was only written on the final submit, so every row still at
+# version 0 is a finished consultation, as is any whose appointment was completed or billed
+def complete_legacy_consultations(apps, schema_editor):
+    Consultation = apps.get_model('doctor', 'Consultation')
+    Consultation.objects.filter(status='ONGOING').filter(
+        Q(version=0) | Q(appointment__status='COMPLETED') | Q(billing__isnull=False)
+    ).update(status='COMPLETED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0015_pharmacy_stock'),
+        ('finance', '0003_billing_billingitem_transaction_delete_payment'),
+    ]
+
+    operations = [
+        migrations.RunPython(complete_legacy_consultations, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,34 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Window, Count, Min, Max, Sum, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Greatest, Least
+from django.db.models.functions import RowNumber
 from django.conf import settings
-from secretary.models import Appointment
+from django.utils import timezone
+from secretary.models import Appointment, Patient
+from login.models import DoctorProfile
+import re
+from decimal import Decimal
+
+
+# (10/19/2026) - Words ignored when pulling keywords out of a diagnosis
+DIAGNOSIS_STOPWORDS = {
+    'and', 'the', 'with', 'without', 'for', 'from', 'due', 'of', 'to', 'in', 'on',
+    'acute', 'chronic', 'mild', 'moderate', 'severe', 'possible', 'probable', 'rule', 'out',
+}
+MAX_DIAGNOSIS_KEYWORDS = 5
+
+
+# (10/19/2026) - Normalize a free-text diagnosis into a short list of lookup keywords
+def diagnosis_keywords(diagnosis):
+    keywords = []
+    for word in re.findall(r'[a-z0-9]+', (diagnosis or '').lower()):
+        if len(word) < 3 or word in DIAGNOSIS_STOPWORDS or word in keywords:
+            continue
+        keywords.append(word)
+        if len(keywords) == MAX_DIAGNOSIS_KEYWORDS:
+            break
+    return keywords
 
 
 # (12/18/2025 - Gocotano) - Medicine model to store available medicines with prices
@@ -10,12 +38,79 @@ class Medicine(models.Model):
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # (10/19/2026) - Optional "+"-separated active ingredients; parsed from the name when blank
+    active_ingredients = models.CharField(max_length=255, blank=True, default='')
+    # (10/19/2026) - Pharmacy stock, only enforced for medicines the clinic dispenses itself
+    track_stock = models.BooleanField(default=False)
+    stock_quantity = models.PositiveIntegerField(default=0)
+    reorder_level = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.name} - ₱{self.price}"
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # (10/19/2026) - Partial index holding only the low-stock medicines, see inventory.low_stock()
+            models.Index(
+                fields=['name'],
+                condition=Q(track_stock=True, is_active=True, stock_quantity__lte=F('reorder_level')),
+                name='medicine_low_stock_idx',
+            ),
+        ]
+
+    # (10/19/2026) - Price in effect at `when` from the price history, falling back to the list price
+    @staticmethod
+    def price_at(when=None):
+        history = MedicinePrice.objects.filter(
+            medicine=OuterRef('pk'), effective_from__lte=when or timezone.now()
+        ).order_by('-effective_from')
+        return Coalesce(
+            Subquery(history.values('price')[:1]), F('price'), output_field=models.DecimalField(max_digits=10, decimal_places=2)
+        )
+
+    # (10/19/2026) - {medicine_id: price} for several medicines in one query
+    @classmethod
+    def prices_at(cls, medicine_ids, when=None):
+        return dict(
+            cls.objects.filter(pk__in=medicine_ids)
+            .annotate(effective_price=cls.price_at(when))
+            .values_list('pk', 'effective_price')
+        )
+
+
+# (10/19/2026) - Effective-dated medicine prices. Rows are added when Medicine.price changes
+# (see signals.py) and can be scheduled ahead of time from the admin.
+class MedicinePrice(models.Model):
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name="price_history")
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    effective_from = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-effective_from']
+        constraints = [
+            models.UniqueConstraint(fields=['medicine', 'effective_from'], name='unique_medicine_price_date'),
+        ]
+        indexes = [
+            models.Index(fields=['medicine', '-effective_from'], name='medicine_price_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.medicine.name} - ₱{self.price} from {self.effective_from:%Y-%m-%d}"
+
+
+# (10/19/2026) - ICD-10 diagnosis codes, loaded from the reference file with `load_icd10`
+class DiagnosisCode(models.Model):
+    code = models.CharField(max_length=10, unique=True)
+    description = models.CharField(max_length=255)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.code} - {self.description}"
+
+    class Meta:
+        ordering = ['code']
 
 
 class Consultation(models.Model):
@@ -26,18 +121,39 @@ class Consultation(models.Model):
 
     appointment = models.OneToOneField(Appointment, on_delete = models.CASCADE, related_name="consultation")
     diagnosis  = models.TextField()
+    # (10/19/2026) - Structured ICD-10 code next to the free-text diagnosis, used for reporting
+    diagnosis_code = models.ForeignKey(
+        DiagnosisCode, on_delete=models.PROTECT, null=True, blank=True, related_name="consultations"
+    )
     # (Old Code) - prescription = models.TextField(blank=True, null=True)
     reason_notes = models.TextField(blank=True, null=True)  # (12/18/2025 - Gocotano) - Added reason notes field
     notes = models.TextField(blank=True, null=True)
     doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="consultation")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="ONGOING")
     date = models.DateTimeField(auto_now_add=True)  
+    # (10/19/2026) - Draft autosave: optimistic version counter and the unsent prescription rows
+    version = models.PositiveIntegerField(default=0)
+    prescriptions_draft = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            # (10/19/2026) - Diagnosis analytics group on the code within a date range
+            models.Index(fields=['diagnosis_code', 'date'], name='consultation_dx_date_idx'),
+        ]
 
+    # (Old Code) - Joined Medicine and used the live price for every row
+    # def get_total_amount(self):
+    #     return sum(
+    #         prescription.get_total_price()
+    #         for prescription in self.prescriptions.all()
+    #     )
+
+    # (10/19/2026) - Total from the prices captured on the prescription rows, no Medicine join
     def get_total_amount(self):
-        return sum(
-            prescription.get_total_price()
-            for prescription in self.prescriptions.all()
-        )
+        total = self.prescriptions.aggregate(
+            total=Sum(F('unit_price') * F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+        )['total']
+        return total or Decimal('0.00')
 
 
     def __str__(self):
@@ -51,10 +167,211 @@ class Prescription(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     doctor_prescription = models.TextField(blank=True, null=True)  # Doctor's specific instructions for this medicine
     created_at = models.DateTimeField(auto_now_add=True)
+    # (10/19/2026) - Price per unit when prescribed, so later price edits do not change old bills
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
 
     def __str__(self):
         return f"{self.medicine.name} x{self.quantity} for {self.consultation}"
 
+    # (10/19/2026) - Capture the effective price if the caller did not pass one
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = Medicine.prices_at([self.medicine_id])[self.medicine_id]
+        super().save(*args, **kwargs)
+
     # (12/18/2025 - Gocotano) - Calculate total price for this prescription item
     def get_total_price(self):
-        return self.medicine.price * self.quantity
\ No newline at end of file
+        # (Old Code) - return self.medicine.price * self.quantity
+        return self.unit_price * self.quantity
+
+
+# (10/19/2026) - Pharmacy stock ledger, one row per stock change with the balance after it
+class StockMovement(models.Model):
+    REASON_CHOICES = [
+        ('DISPENSE', 'Dispensed'),
+        ('RECEIPT', 'Received'),
+        ('ADJUSTMENT', 'Adjustment'),
+    ]
+
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name="stock_movements")
+    change = models.IntegerField()
+    balance_after = models.PositiveIntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    prescription = models.ForeignKey(
+        Prescription, on_delete=models.SET_NULL, null=True, blank=True, related_name="stock_movements"
+    )
+    reference = models.CharField(max_length=100, blank=True, default='')  # Delivery receipt / invoice number
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['medicine', '-created_at'], name='stock_movement_medicine_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.medicine.name} {self.change:+d} ({self.get_reason_display()})"
+
+
+# (10/19/2026) - Per-doctor prescription counters, kept up to date by the Prescription signals.
+# keyword='' holds the doctor's overall counts, other rows are per diagnosis keyword.
+class PrescriptionStat(models.Model):
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="prescription_stats")
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name="prescription_stats")
+    keyword = models.CharField(max_length=50, blank=True, default='')
+    times_prescribed = models.PositiveIntegerField(default=0)
+    total_quantity = models.PositiveIntegerField(default=0)
+    last_prescribed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'keyword', 'medicine'], name='unique_prescription_stat'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'keyword', '-times_prescribed'], name='prescription_stat_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.medicine.name} x{self.times_prescribed} ({self.keyword or 'overall'})"
+
+    # (10/19/2026) - Apply a +/- delta for one prescription to every counter row it belongs to
+    @classmethod
+    def apply(cls, doctor_id, medicine_id, diagnosis, quantity, count=1):
+        for keyword in [''] + diagnosis_keywords(diagnosis):
+            lookup = cls.objects.filter(doctor_id=doctor_id, keyword=keyword, medicine_id=medicine_id)
+            updates = {
+                'times_prescribed': F('times_prescribed') + count,
+                'total_quantity': F('total_quantity') + quantity * count,
+            }
+            if count < 0:
+                # Never drive the counters below zero if history was edited out of band
+                lookup.filter(times_prescribed__gte=-count, total_quantity__gte=-quantity * count).update(**updates)
+                continue
+            updates['last_prescribed_at'] = timezone.now()
+            if lookup.update(**updates):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        doctor_id=doctor_id,
+                        keyword=keyword,
+                        medicine_id=medicine_id,
+                        times_prescribed=count,
+                        total_quantity=quantity * count,
+                    )
+            except IntegrityError:
+                # Another request created the row first, add on top of it
+                lookup.update(**updates)
+
+    # (10/19/2026) - Top-N medicines overall and per diagnosis keyword, read in one indexed query
+    @classmethod
+    def suggestions(cls, doctor, diagnosis='', limit=5):
+        keywords = diagnosis_keywords(diagnosis)
+        rows = cls.objects.filter(
+            doctor=doctor,
+            keyword__in=[''] + keywords,
+            times_prescribed__gt=0,
+            medicine__is_active=True,
+        ).annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F('keyword')],
+                order_by=[F('times_prescribed').desc(), F('last_prescribed_at').desc()],
+            )
+        ).filter(rank__lte=limit).select_related('medicine').order_by('keyword', 'rank')
+
+        overall = []
+        by_keyword = {keyword: [] for keyword in keywords}
+        for row in rows:
+            (overall if row.keyword == '' else by_keyword[row.keyword]).append(row)
+        return {'overall': overall, 'by_keyword': by_keyword}
+
+
+# (10/19/2026) - Denormalized doctor/patient relationship behind My Patients.
+# A row exists while the pair has at least one APPROVE or COMPLETED appointment; visit_count counts COMPLETED ones.
+class DoctorPatient(models.Model):
+    ACTIVE_STATUSES = ('APPROVE', 'COMPLETED')
+
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name="patient_links")
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="doctor_links")
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    visit_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'patient'], name='unique_doctor_patient'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', '-last_seen'], name='doctor_patient_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor} - {self.patient} ({self.visit_count} visits)"
+
+    # (10/19/2026) - Incremental path: an appointment became APPROVE/COMPLETED for this pair
+    @classmethod
+    def add_visit(cls, doctor_id, patient_id, seen_at, completed):
+        lookup = cls.objects.filter(doctor_id=doctor_id, patient_id=patient_id)
+        updates = {
+            'first_seen': Least(F('first_seen'), seen_at),
+            'last_seen': Greatest(F('last_seen'), seen_at),
+            'visit_count': F('visit_count') + int(completed),
+        }
+        if lookup.update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    doctor_id=doctor_id,
+                    patient_id=patient_id,
+                    first_seen=seen_at,
+                    last_seen=seen_at,
+                    visit_count=int(completed),
+                )
+        except IntegrityError:
+            lookup.update(**updates)
+
+    # (10/19/2026) - Recompute one pair from its appointments (cancellations, deletes, moved appointments)
+    @classmethod
+    def refresh(cls, doctor_id, patient_id):
+        summary = Appointment.objects.filter(
+            doctor_id=doctor_id, patient_id=patient_id, status__in=cls.ACTIVE_STATUSES
+        ).aggregate(
+            first_seen=Min('date'),
+            last_seen=Max('date'),
+            visit_count=Count('id', filter=Q(status='COMPLETED')),
+        )
+        if summary['first_seen'] is None:
+            cls.objects.filter(doctor_id=doctor_id, patient_id=patient_id).delete()
+            return
+        cls.objects.update_or_create(doctor_id=doctor_id, patient_id=patient_id, defaults=summary)
+
+
+# (10/19/2026) - Drug interaction rules between two normalized active ingredients (ingredient_a < ingredient_b)
+class DrugInteraction(models.Model):
+    SEVERITY_CHOICES = [
+        ('MAJOR', 'Major'),
+        ('MODERATE', 'Moderate'),
+        ('MINOR', 'Minor'),
+    ]
+
+    ingredient_a = models.CharField(max_length=100)
+    ingredient_b = models.CharField(max_length=100)
+    severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default='MODERATE')
+    description = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ingredient_a', 'ingredient_b'], name='unique_drug_interaction'),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient_a} + {self.ingredient_b} ({self.severity})"
+
+    # (10/19/2026) - Keep the pair normalized and ordered so each pair is stored once
+    def save(self, *args, **kwargs):
+        from .interactions import interaction_key
+        self.ingredient_a, self.ingredient_b = interaction_key(self.ingredient_a, self.ingredient_b)
+        super().save(*args, **kwargs)
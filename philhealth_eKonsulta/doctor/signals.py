@@ -0,0 +1,179 @@
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver, Signal
+from secretary.models import Appointment
+from .models import diagnosis_keywords, Consultation, Prescription, PrescriptionStat, DoctorPatient, DrugInteraction, Medicine, MedicinePrice
+from .interactions import reset_interaction_index
+from .metrics import invalidate_doctor_metrics
+
+# (10/19/2026) - Sent by add_consultation inside its transaction once the consultation and its
+# prescriptions are saved; finance bills the consultation from it
+consultation_completed = Signal()
+
+
+# (10/19/2026) - Keep the per-doctor "frequently prescribed" counters in step with Prescription writes.
+# Counters are kept under the consultation's current diagnosis: edits to a prescription, or to the
+# diagnosis of a consultation that has prescriptions, move the old amounts to the new buckets.
+def _prescription_stat_state(instance):
+    # Read straight from __dict__ so deferred fields are never loaded just for tracking
+    return tuple(instance.__dict__.get(name) for name in ('consultation_id', 'medicine_id', 'quantity'))
+
+
+def _apply_prescription_stat(consultation_id, medicine_id, quantity, count):
+    # The consultation may already be gone when this runs as part of a cascade
+    consultation = Consultation.objects.filter(pk=consultation_id).values('doctor_id', 'diagnosis').first()
+    if consultation is None:
+        return
+    PrescriptionStat.apply(consultation['doctor_id'], medicine_id, consultation['diagnosis'], quantity, count=count)
+
+
+@receiver(post_init, sender=Prescription)
+def prescription_loaded_stat(sender, instance, **kwargs):
+    instance._stat_state = _prescription_stat_state(instance)
+
+
+@receiver(pre_save, sender=Prescription)
+def prescription_saving_stat(sender, instance, raw=False, **kwargs):
+    # Loaded with .only()/.defer(): read what was counted before it is overwritten
+    if not raw and instance.pk and None in instance._stat_state:
+        instance._stat_state = Prescription.objects.filter(pk=instance.pk).values_list(
+            'consultation_id', 'medicine_id', 'quantity'
+        ).first() or (None, None, None)
+
+
+@receiver(post_save, sender=Prescription)
+def prescription_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._stat_state
+    new = _prescription_stat_state(instance)
+    instance._stat_state = new
+    if old == new:
+        return
+    if old is not None and None not in old:
+        _apply_prescription_stat(*old, count=-1)
+    if created:
+        consultation = instance.consultation
+        PrescriptionStat.apply(consultation.doctor_id, instance.medicine_id, consultation.diagnosis, instance.quantity)
+    else:
+        _apply_prescription_stat(*new, count=1)
+
+
+@receiver(post_delete, sender=Prescription)
+def prescription_deleted(sender, instance, **kwargs):
+    consultation_id, medicine_id, quantity = instance._stat_state
+    if medicine_id is not None:
+        _apply_prescription_stat(consultation_id, medicine_id, quantity, count=-1)
+
+
+@receiver(post_init, sender=Consultation)
+def consultation_loaded_stat(sender, instance, **kwargs):
+    instance._stat_state = (instance.__dict__.get('doctor_id'), instance.__dict__.get('diagnosis'))
+
+
+@receiver(post_save, sender=Consultation)
+def consultation_saved_stat(sender, instance, created, raw=False, **kwargs):
+    old = instance._stat_state
+    new = (instance.doctor_id, instance.diagnosis)
+    instance._stat_state = new
+    if raw or created or old == new or None in old:
+        return
+    if old[0] == new[0] and diagnosis_keywords(old[1]) == diagnosis_keywords(new[1]):
+        return
+    for medicine_id, quantity in instance.prescriptions.values_list('medicine_id', 'quantity'):
+        PrescriptionStat.apply(old[0], medicine_id, old[1], quantity, count=-1)
+        PrescriptionStat.apply(new[0], medicine_id, new[1], quantity)
+
+
+# (10/19/2026) - Drop the cached dashboard metrics of the doctor whose numbers changed
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    invalidate_doctor_metrics(instance.doctor_id)
+
+
+@receiver(post_save, sender=Consultation)
+@receiver(post_delete, sender=Consultation)
+def consultation_changed(sender, instance, **kwargs):
+    invalidate_doctor_metrics(
+        Appointment.objects.filter(pk=instance.appointment_id).values_list('doctor_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender='finance.Billing')
+@receiver(post_delete, sender='finance.Billing')
+def billing_changed(sender, instance, **kwargs):
+    invalidate_doctor_metrics(
+        Consultation.objects.filter(pk=instance.consultation_id).values_list('appointment__doctor_id', flat=True).first()
+    )
+
+
+# (10/19/2026) - Keep DoctorPatient in step with appointment status changes
+def _appointment_state(instance):
+    # Read straight from __dict__ so deferred fields are never loaded just for tracking
+    return tuple(instance.__dict__.get(name) for name in ('doctor_id', 'patient_id', 'status', 'date'))
+
+
+@receiver(post_init, sender=Appointment)
+def appointment_loaded(sender, instance, **kwargs):
+    instance._doctor_patient_state = _appointment_state(instance)
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved_doctor_patient(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else getattr(instance, '_doctor_patient_state', None)
+    new = _appointment_state(instance)
+    instance._doctor_patient_state = new
+    doctor_id, patient_id, status, date = new
+    active = DoctorPatient.ACTIVE_STATUSES
+
+    if created:
+        if status in active:
+            DoctorPatient.add_visit(doctor_id, patient_id, date, completed=status == 'COMPLETED')
+        return
+    if old == new:
+        return
+
+    if old is not None and (old[0], old[1], old[3]) == (doctor_id, patient_id, date):
+        old_status = old[2]
+        if old_status not in active and status not in active:
+            return
+        # Common case: PENDING -> APPROVE -> COMPLETED only ever adds to the counters
+        if old_status not in active or (old_status == 'APPROVE' and status == 'COMPLETED'):
+            DoctorPatient.add_visit(doctor_id, patient_id, date, completed=status == 'COMPLETED')
+            return
+
+    DoctorPatient.refresh(doctor_id, patient_id)
+    if old is not None and (old[0], old[1]) != (doctor_id, patient_id) and old[0] and old[1]:
+        DoctorPatient.refresh(old[0], old[1])
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted_doctor_patient(sender, instance, **kwargs):
+    if instance.status in DoctorPatient.ACTIVE_STATUSES:
+        DoctorPatient.refresh(instance.doctor_id, instance.patient_id)
+
+
+# (10/19/2026) - Recompile the in-memory interaction index after rule or medicine edits
+@receiver(post_save, sender=DrugInteraction)
+@receiver(post_delete, sender=DrugInteraction)
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+def interaction_rules_changed(sender, **kwargs):
+    reset_interaction_index()
+
+
+# (10/19/2026) - Record a price history row whenever a medicine's list price is set or changed
+@receiver(post_init, sender=Medicine)
+def medicine_loaded(sender, instance, **kwargs):
+    instance._loaded_price = instance.__dict__.get('price')
+
+
+@receiver(post_save, sender=Medicine)
+def medicine_price_changed(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.price is None:
+        return
+    if created or instance.price != instance._loaded_price:
+        MedicinePrice.objects.create(medicine=instance, price=instance.price)
+    instance._loaded_price = instance.price
@@ -1,3 +1,251 @@
+import datetime
+import json
+from decimal import Decimal
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from login.models import CustomUser, DoctorProfile
+from secretary.models import Patient, Appointment
+from .models import Consultation, Medicine, Prescription, PrescriptionStat, DrugInteraction, StockMovement
+from .icd10 import Icd10Trie
+from .interactions import reset_interaction_index
+from .inventory import dispense_prescriptions, receive_stock, InsufficientStock
 
-# Create your tests here.
+
+# (10/19/2026) - Doctor with a profile, used by the doctor app tests
+def make_doctor(n=1):
+    user = CustomUser.objects.create_user(username=f'doctor{n}', password='x', role='DOCTOR')
+    DoctorProfile.objects.create(
+        user=user, first_name='Test', last_name='Doctor', employee_id=f'EMP{n}',
+        specialization='General', license_number=f'LIC{n}', phone='09170000000', email='doctor@example.com'
+    )
+    return user
+
+
+def make_appointment(user, status='APPROVE', patient=None):
+    if patient is None:
+        patient = Patient.objects.create(
+            first_name='Test', last_name='Patient', birth_date=datetime.date(1990, 1, 1),
+            gender='Male', contact_number='09170000000'
+        )
+    return Appointment.objects.create(
+        patient=patient, doctor=user.doctorprofile, date=timezone.now(), time=datetime.time(9), status=status
+    )
+
+
+# (10/19/2026) - Frequently prescribed counters follow prescription and diagnosis edits
+class PrescriptionStatTests(TestCase):
+    def setUp(self):
+        self.user = make_doctor()
+        self.consultation = Consultation.objects.create(
+            appointment=make_appointment(self.user, 'COMPLETED'), diagnosis='Hypertension', doctor=self.user, status='COMPLETED'
+        )
+        self.amlodipine = Medicine.objects.create(name='Amlodipine 5mg', price=Decimal('10.00'))
+        self.losartan = Medicine.objects.create(name='Losartan 50mg', price=Decimal('12.00'))
+
+    def counters(self, keyword):
+        return dict(
+            (medicine_id, (times, quantity))
+            for medicine_id, times, quantity in PrescriptionStat.objects.filter(keyword=keyword, times_prescribed__gt=0)
+            .values_list('medicine_id', 'times_prescribed', 'total_quantity')
+        )
+
+    def test_edits_move_the_counts(self):
+        prescription = Prescription.objects.create(consultation=self.consultation, medicine=self.amlodipine, quantity=30)
+        prescription = Prescription.objects.get(pk=prescription.pk)
+        prescription.quantity = 60
+        prescription.save()
+        self.assertEqual(self.counters('hypertension'), {self.amlodipine.pk: (1, 60)})
+
+        prescription.medicine = self.losartan
+        prescription.save()
+        self.assertEqual(self.counters(''), {self.losartan.pk: (1, 60)})
+
+    def test_delete_after_diagnosis_edit_uses_the_new_bucket(self):
+        prescription = Prescription.objects.create(consultation=self.consultation, medicine=self.amlodipine, quantity=30)
+        consultation = Consultation.objects.get(pk=self.consultation.pk)
+        consultation.diagnosis = 'Migraine'
+        consultation.save()
+        self.assertEqual(self.counters('hypertension'), {})
+        self.assertEqual(self.counters('migraine'), {self.amlodipine.pk: (1, 30)})
+
+        Prescription.objects.get(pk=prescription.pk).delete()
+        self.assertEqual(self.counters('migraine'), {})
+        self.assertEqual(self.counters(''), {})
+
+
+# (10/19/2026) - ICD-10 autocomplete trie
+class Icd10TrieTests(TestCase):
+    trie = Icd10Trie([
+        ('I10', 'Essential (primary) hypertension'),
+        ('I11.9', 'Hypertensive heart disease without heart failure'),
+        ('E11.9', 'Type 2 diabetes mellitus without complications'),
+        ('J06.9', 'Acute upper respiratory infection, unspecified'),
+    ])
+
+    def test_code_prefix(self):
+        self.assertEqual([code for code, _ in self.trie.search('i1')], ['I10', 'I11.9'])
+        self.assertEqual([code for code, _ in self.trie.search('E11.')], ['E11.9'])
+        self.assertEqual(self.trie.get('e119'), ('E11.9', 'Type 2 diabetes mellitus without complications'))
+
+    def test_every_word_prefix_must_match(self):
+        self.assertEqual([code for code, _ in self.trie.search('hypert heart')], ['I11.9'])
+        self.assertEqual([code for code, _ in self.trie.search('hypert')], ['I10', 'I11.9'])
+        self.assertEqual(self.trie.search('heart asthma'), [])
+        self.assertEqual(self.trie.search('  '), [])
+
+
+# (10/19/2026) - Versioned consultation draft autosave
+class AutosaveTests(TestCase):
+    def setUp(self):
+        self.user = make_doctor()
+        self.appointment = make_appointment(self.user)
+        self.url = reverse('autosave_consultation', args=[self.appointment.id])
+        self.client.force_login(self.user)
+
+    def save(self, version, **fields):
+        return self.client.post(self.url, json.dumps({'version': version, 'fields': fields}), content_type='application/json')
+
+    def test_stale_version_is_rejected(self):
+        self.assertEqual(self.save(0, diagnosis='Cough').json(), {'version': 1})
+        self.assertEqual(self.save(1, notes='Day 2').json(), {'version': 2})
+        response = self.save(1, diagnosis='Older tab')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['version'], 2)
+        consultation = Consultation.objects.get(appointment=self.appointment)
+        self.assertEqual((consultation.diagnosis, consultation.notes), ('Cough', 'Day 2'))
+
+    def test_other_doctor_cannot_save(self):
+        self.save(0, diagnosis='Cough')
+        self.client.force_login(make_doctor(2))
+        self.assertEqual(self.save(1, diagnosis='Overwritten').status_code, 409)
+        self.assertEqual(Consultation.objects.get(appointment=self.appointment).diagnosis, 'Cough')
+
+    def test_finished_consultation_is_not_editable(self):
+        # Saved before drafts existed: still ONGOING at version 0, but the appointment is done
+        Consultation.objects.create(appointment=self.appointment, diagnosis='Final', doctor=self.user)
+        self.appointment.status = 'COMPLETED'
+        self.appointment.save()
+        self.assertEqual(self.save(0, diagnosis='Overwritten').status_code, 409)
+        self.assertEqual(Consultation.objects.get(appointment=self.appointment).diagnosis, 'Final')
+
+
+    def test_draft_is_not_in_patient_history(self):
+        self.save(0, diagnosis='Draft')
+        # Saved before drafts existed: still ONGOING, its appointment is done
+        finished = make_appointment(self.user, 'COMPLETED', patient=self.appointment.patient)
+        legacy = Consultation.objects.create(appointment=finished, diagnosis='Final', doctor=self.user)
+        response = self.client.get(reverse('my_patient_detail', args=[self.appointment.patient_id]))
+        self.assertEqual(list(response.context['consultations']), [legacy])
+
+# (10/19/2026) - Drug interaction warnings and the MAJOR block on submit
+class InteractionTests(TestCase):
+    def setUp(self):
+        reset_interaction_index()
+        # The compiled index outlives the test transaction
+        self.addCleanup(reset_interaction_index)
+        DrugInteraction.objects.create(ingredient_a='warfarin', ingredient_b='aspirin', severity='MAJOR', description='Bleeding risk')
+        self.warfarin = Medicine.objects.create(name='Warfarin 5mg', price=Decimal('10.00'))
+        self.aspirin = Medicine.objects.create(name='Aspirin 80mg', price=Decimal('2.00'))
+        self.user = make_doctor()
+        self.appointment = make_appointment(self.user)
+        self.client.force_login(self.user)
+
+    def submit(self, **extra):
+        return self.client.post(reverse('add_consultation', args=[self.appointment.id]), {
+            'diagnosis': 'Atrial fibrillation',
+            'prescriptions_data': json.dumps([
+                {'medicine_id': self.warfarin.id, 'quantity': 30},
+                {'medicine_id': self.aspirin.id, 'quantity': 30},
+            ]),
+            **extra,
+        })
+
+    def test_interaction_warning(self):
+        response = self.client.get(reverse('check_interactions'), {'medicine_ids': f'{self.aspirin.id},{self.warfarin.id}'})
+        warnings = response.json()['warnings']
+        self.assertEqual([warning['severity'] for warning in warnings], ['MAJOR'])
+        self.assertEqual(warnings[0]['description'], 'Bleeding risk')
+
+    def test_major_interaction_blocks_until_acknowledged(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Major drug interactions found')
+        self.assertFalse(Prescription.objects.exists())
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.status, 'APPROVE')
+
+        self.assertRedirects(self.submit(acknowledge_interactions='1'), reverse('doctor_appt_list'), fetch_redirect_response=False)
+        self.assertEqual(Prescription.objects.count(), 2)
+
+    def test_rules_added_by_another_process_still_block(self):
+        self.client.get(reverse('check_interactions'), {'medicine_ids': f'{self.aspirin.id},{self.warfarin.id}'})
+        # bulk_create sends no signals, like a medicine and rule saved by another worker
+        clopidogrel, = Medicine.objects.bulk_create([Medicine(name='Clopidogrel 75mg', price=Decimal('15.00'))])
+        DrugInteraction.objects.bulk_create([
+            DrugInteraction(ingredient_a='clopidogrel', ingredient_b='warfarin', severity='MAJOR', description='Bleeding risk')
+        ])
+        response = self.client.post(reverse('add_consultation', args=[self.appointment.id]), {
+            'diagnosis': 'Atrial fibrillation',
+            'prescriptions_data': json.dumps([
+                {'medicine_id': self.warfarin.id, 'quantity': 30},
+                {'medicine_id': clopidogrel.id, 'quantity': 30},
+            ]),
+        })
+        self.assertContains(response, 'Major drug interactions found')
+        self.assertFalse(Prescription.objects.exists())
+
+
+# (10/19/2026) - Pharmacy stock never goes below zero
+class StockTests(TestCase):
+    def setUp(self):
+        self.user = make_doctor()
+        self.medicine = Medicine.objects.create(name='Amoxicillin 500mg', price=Decimal('8.00'), track_stock=True, stock_quantity=5)
+        self.untracked = Medicine.objects.create(name='Vitamin C', price=Decimal('5.00'))
+        self.consultation = Consultation.objects.create(
+            appointment=make_appointment(self.user, 'COMPLETED'), diagnosis='Otitis', doctor=self.user, status='COMPLETED'
+        )
+
+    def prescribe(self, medicine, quantity):
+        return Prescription.objects.create(consultation=self.consultation, medicine=medicine, quantity=quantity)
+
+    def test_dispense_and_receive(self):
+        dispense_prescriptions([self.prescribe(self.medicine, 3), self.prescribe(self.untracked, 100)])
+        receive_stock({self.medicine.id: 10}, reference='DR-1')
+        self.medicine.refresh_from_db()
+        self.assertEqual(self.medicine.stock_quantity, 12)
+        self.assertEqual(list(StockMovement.objects.order_by('id').values_list('change', 'balance_after')), [(-3, 2), (10, 12)])
+
+    def test_receive_form_skips_unknown_fields(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('pharmacy_stock'), {
+            f'receive_{self.medicine.id}': '4', 'receive_all': '9', 'reference': 'DR-2',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.medicine.refresh_from_db()
+        self.assertEqual(self.medicine.stock_quantity, 9)
+
+    def test_shortage_takes_nothing(self):
+        # Each line fits on its own, together they do not
+        lines = [self.prescribe(self.medicine, 3), self.prescribe(self.medicine, 3)]
+        with self.assertRaises(InsufficientStock) as raised:
+            dispense_prescriptions(lines)
+        self.assertEqual(raised.exception.shortages, [('Amoxicillin 500mg', 5, 6)])
+        self.medicine.refresh_from_db()
+        self.assertEqual(self.medicine.stock_quantity, 5)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_short_submit_saves_nothing(self):
+        appointment = make_appointment(self.user)
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('add_consultation', args=[appointment.id]), {
+            'diagnosis': 'Otitis',
+            'prescriptions_data': json.dumps([{'medicine_id': self.medicine.id, 'quantity': 6}]),
+        })
+        self.assertContains(response, 'Insufficient stock')
+        self.assertEqual(response.context['appointment'].status, 'APPROVE')
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'APPROVE')
+        self.assertFalse(Consultation.objects.filter(appointment=appointment).exists())
+        self.medicine.refresh_from_db()
+        self.assertEqual(self.medicine.stock_quantity, 5)
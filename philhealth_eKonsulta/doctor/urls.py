@@ -6,7 +6,17 @@ urlpatterns = [
     path('appointment/<int:appointment_id>/<str:new_status>/', views.update_appointment_status, name='update_appointment_status'),
     path('patient/<int:appointment_id>/', views.patient_appt_detail, name='patient_appt_detail'),
     path('consultation/<int:appointment_id>/', views.add_consultation, name='add_consultation'),
+    # (10/19/2026) - Consultation draft autosave
+    path('consultation/<int:appointment_id>/autosave/', views.autosave_consultation, name='autosave_consultation'),
+    # (10/19/2026) - Frequently prescribed medicines for the consultation page
+    path('consultation/suggestions/', views.prescription_suggestions, name='prescription_suggestions'),
+    # (10/19/2026) - Drug interaction warnings while prescribing
+    path('consultation/interactions/', views.check_interactions, name='check_interactions'),
+    # (10/19/2026) - ICD-10 diagnosis code autocomplete
+    path('consultation/diagnosis-codes/', views.diagnosis_code_search, name='diagnosis_code_search'),
     # (12/18/2025 - Gocotano) - My Patients URLs
     path('my-patients/', views.my_patients, name='my_patients'),
     path('my-patients/<int:patient_id>/', views.my_patient_detail, name='my_patient_detail'),
+    # (10/19/2026) - Pharmacy stock levels and receipts
+    path('pharmacy/stock/', views.pharmacy_stock, name='pharmacy_stock'),
 ]
\ No newline at end of file
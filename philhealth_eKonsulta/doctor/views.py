@@ -2,9 +2,21 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from secretary.models import Appointment, DoctorProfile, Patient, PatientDocument, PatientPicture  #[12-17-2025 - Gocotano] - Added PatientDocument, PatientPicture imports
 from .models import Consultation, Medicine, Prescription  # (12/18/2025 - Gocotano) - Updated imports for new models
+from .models import PrescriptionStat  # (10/19/2026) - Frequently prescribed suggestions
+from django.http import JsonResponse  # (10/19/2026) - For the suggestions endpoint
+from .models import DiagnosisCode  # (10/19/2026) - ICD-10 diagnosis codes
+from .models import DoctorPatient  # (10/19/2026) - Denormalized My Patients relation
+from django.core.paginator import Paginator
+from django.contrib import messages  # (10/19/2026) - Stock receipt feedback
+from .icd10 import get_trie
+from .interactions import get_interaction_index  # (10/19/2026) - Drug interaction checks
+from .signals import consultation_completed  # (10/19/2026) - Billing is created from this signal
+from .inventory import InsufficientStock, dispense_prescriptions, receive_stock, low_stock  # (10/19/2026) - Pharmacy stock
+from django.db import transaction, IntegrityError  # (10/19/2026) - For draft autosave
+from django.db.models import F
+from django.utils import timezone
 from .forms import ConsultationForm
 from django.db.models import Q  #[12-17-2025 - Gocotano] - Added Q for search filtering
-from django.db.models import Exists, OuterRef  # (12/18/2025 - Gocotano) - Added for my_patients query
 import json  # (12/18/2025 - Gocotano) - Added for parsing prescription JSON data
 
 @login_required
@@ -125,49 +137,98 @@ def add_consultation(request, appointment_id):
         status="APPROVE"
     )
 
-    # Prevent duplicate consultation
-    if hasattr(appointment, "consultation"):
+    # (Old Code) - Prevent duplicate consultation
+    # if hasattr(appointment, "consultation"):
+    #     return redirect("doctor_appt_list")
+
+    # (10/19/2026) - Prevent duplicate consultation, but resume this doctor's ONGOING draft
+    draft = Consultation.objects.filter(appointment=appointment).first()
+    if draft and (draft.status != "ONGOING" or draft.doctor_id != request.user.id):
         return redirect("doctor_appt_list")
 
     # (12/18/2025 - Gocotano) - Get all active medicines for the dropdown
-    medicines = Medicine.objects.filter(is_active=True)
+    # (10/19/2026) - Show the price currently in effect from the price history
+    medicines = Medicine.objects.filter(is_active=True).annotate(current_price=Medicine.price_at())
+
+    interaction_warnings = []
+    submitted_prescriptions = None
 
     if request.method == "POST":
-        form = ConsultationForm(request.POST)
+        form = ConsultationForm(request.POST, instance=draft)
+
+        # (10/19/2026) - Parse the prescriptions up front so they can be checked before anything is saved
+        prescription_items = parse_prescriptions(request.POST.get('prescriptions_data', '[]'))
+        # Rows to put back on the form if the submit is rejected
+        submitted_rows = [
+            {
+                'medicine_id': item['medicine'].id,
+                'quantity': item['quantity'],
+                'doctor_prescription': item['doctor_prescription'],
+            }
+            for item in prescription_items
+        ]
+        medicine_ids = [item['medicine'].id for item in prescription_items]
+        interaction_warnings = get_interaction_index(medicine_ids).check(medicine_ids)
+        has_major = any(warning['severity'] == 'MAJOR' for warning in interaction_warnings)
+        if has_major and not request.POST.get('acknowledge_interactions'):
+            form.add_error(None, "Major drug interactions found. Review them and confirm to save the consultation.")
+            submitted_prescriptions = submitted_rows
+
         if form.is_valid():
-            consultation = form.save(commit=False)
-            consultation.appointment = appointment
-            consultation.doctor = request.user
-            appointment.status = "COMPLETED"
-            consultation.save()
-
-            # (12/18/2025 - Gocotano) - Process prescription data from form
-            prescriptions_json = request.POST.get('prescriptions_data', '[]')
             try:
-                prescriptions_list = json.loads(prescriptions_json)
-                for item in prescriptions_list:
-                    medicine_id = item.get('medicine_id')
-                    quantity = item.get('quantity', 1)
-                    doctor_prescription = item.get('doctor_prescription', '')
-
-                    if medicine_id:
-                        medicine = Medicine.objects.filter(id=medicine_id).first()
-                        if medicine:
-                            Prescription.objects.create(
-                                consultation=consultation,
-                                medicine=medicine,
-                                quantity=int(quantity),
-                                doctor_prescription=doctor_prescription
-                            )
-            except json.JSONDecodeError:
-                pass  # Handle invalid JSON gracefully
-
-            appointment.status = "COMPLETED"
-            appointment.save()
-
-            return redirect("doctor_appt_list")
+                with transaction.atomic():
+                    consultation = form.save(commit=False)
+                    consultation.appointment = appointment
+                    consultation.doctor = request.user
+
+                    # (10/19/2026) - Attach the selected ICD-10 code, creating the row from the reference if needed
+                    consultation.diagnosis_code = resolve_diagnosis_code(request.POST.get('diagnosis_code', ''))
+
+                    # (10/19/2026) - Finalize the draft, the submitted form replaces whatever was autosaved
+                    consultation.status = "COMPLETED"
+                    consultation.prescriptions_draft = []
+                    consultation.version += 1
+                    if draft:
+                        consultation.date = timezone.now()
+
+                    consultation.save()
+
+                    # (10/19/2026) - Snapshot the prices in effect now onto the prescription rows
+                    prices = Medicine.prices_at([item['medicine'].id for item in prescription_items])
+
+                    # (12/18/2025 - Gocotano) - Process prescription data from form
+                    prescriptions = []
+                    for item in prescription_items:
+                        prescription = Prescription.objects.create(
+                            consultation=consultation,
+                            medicine=item['medicine'],
+                            quantity=item['quantity'],
+                            doctor_prescription=item['doctor_prescription'],
+                            unit_price=prices[item['medicine'].id]
+                        )
+                        prescriptions.append(prescription)
+
+                    # (10/19/2026) - Dispense from pharmacy stock, rolls everything back if an item ran out
+                    dispense_prescriptions(prescriptions, user=request.user)
+
+                    appointment.status = "COMPLETED"
+                    appointment.save()
+
+                    # (10/19/2026) - Let finance bill the consultation in this same transaction
+                    consultation_completed.send(sender=Consultation, consultation=consultation, prescriptions=prescriptions)
+            except InsufficientStock as error:
+                # (10/19/2026) - Nothing was saved, undo the in-memory changes to the draft and show the rows again
+                if draft:
+                    draft.refresh_from_db()
+                form.add_error(None, str(error))
+                submitted_prescriptions = submitted_rows
+            else:
+                return redirect("doctor_appt_list")
     else:
-        form = ConsultationForm()
+        form = ConsultationForm(instance=draft)
+
+    # (10/19/2026) - Doctor's most prescribed medicines, per-diagnosis ones are fetched as the diagnosis is typed
+    suggestions = PrescriptionStat.suggestions(request.user)
 
     return render(
         request,
@@ -175,34 +236,214 @@ def add_consultation(request, appointment_id):
         {
             "form": form,
             "appointment": appointment,
-            "medicines": medicines  # (12/18/2025 - Gocotano) - Pass medicines to template
+            "medicines": medicines,  # (12/18/2025 - Gocotano) - Pass medicines to template
+            "frequent_medicines": suggestions['overall'],
+            "draft": draft,  # (10/19/2026) - Autosaved draft to resume, if any
+            "interaction_warnings": interaction_warnings,  # (10/19/2026) - Shown again when submit is blocked
+            "submitted_prescriptions": submitted_prescriptions,
         }
     )
 
 
-# (12/18/2025 - Gocotano) - My Patients view - shows patients with APPROVED or COMPLETED appointments
+# (10/19/2026) - Turn the prescriptions JSON from the consultation form into validated rows
+def parse_prescriptions(prescriptions_json):
+    try:
+        prescriptions_list = json.loads(prescriptions_json)
+    except json.JSONDecodeError:
+        return []  # Handle invalid JSON gracefully
+    if not isinstance(prescriptions_list, list):
+        return []
+
+    rows = []
+    for item in prescriptions_list:
+        try:
+            rows.append({
+                'medicine_id': int(item.get('medicine_id')),
+                'quantity': max(1, int(item.get('quantity', 1) or 1)),
+                'doctor_prescription': item.get('doctor_prescription', ''),
+            })
+        except (AttributeError, TypeError, ValueError):
+            continue
+
+    medicines = Medicine.objects.in_bulk([row['medicine_id'] for row in rows])
+    items = []
+    for row in rows:
+        medicine = medicines.get(row['medicine_id'])
+        if medicine:
+            items.append({
+                'medicine': medicine,
+                'quantity': row['quantity'],
+                'doctor_prescription': row['doctor_prescription'],
+            })
+    return items
+
+
+# (10/19/2026) - Live interaction warnings while prescribing: ?medicine_ids=1,2,3
+@login_required
+def check_interactions(request):
+    medicine_ids = []
+    for value in request.GET.get('medicine_ids', '').split(','):
+        if value.strip().isdigit():
+            medicine_ids.append(int(value))
+    return JsonResponse({'warnings': get_interaction_index(medicine_ids).check(medicine_ids)})
+
+
+# (10/19/2026) - Look up an ICD-10 code in the reference trie and return its DiagnosisCode row
+def resolve_diagnosis_code(code):
+    entry = get_trie().get(code)
+    if not entry:
+        return None
+    diagnosis_code, _ = DiagnosisCode.objects.get_or_create(code=entry[0], defaults={'description': entry[1]})
+    return diagnosis_code
+
+
+MY_PATIENTS_PER_PAGE = 25
+STOCK_PER_PAGE = 50  # (10/19/2026) - Pharmacy stock page size
+
+
+# (10/19/2026) - Fields the consultation page is allowed to autosave
+AUTOSAVE_FIELDS = ['diagnosis', 'reason_notes', 'notes', 'diagnosis_code', 'prescriptions_draft']
+
+
+# (10/19/2026) - Autosave for the ONGOING consultation draft.
+# The page sends {"version": n, "fields": {...}} with only the fields that changed since the last save.
+# A save is one conditional UPDATE on the draft row; a version mismatch means another tab saved first.
+@login_required
+def autosave_consultation(request, appointment_id):
+    if request.method != "POST":
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    try:
+        payload = json.loads(request.body)
+        version = int(payload.get('version', 0))
+        fields = payload.get('fields') or {}
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Invalid draft data'}, status=400)
+
+    changes = {}
+    for name in AUTOSAVE_FIELDS:
+        if name not in fields:
+            continue
+        value = fields[name]
+        if name == 'diagnosis_code':
+            diagnosis_code = resolve_diagnosis_code(value)
+            changes['diagnosis_code_id'] = diagnosis_code.id if diagnosis_code else None
+        elif name == 'prescriptions_draft':
+            if not isinstance(value, list):
+                return JsonResponse({'error': 'Invalid prescriptions'}, status=400)
+            changes[name] = value
+        else:
+            changes[name] = str(value or '')
+
+    if not changes:
+        return JsonResponse({'version': version})
+
+    # (10/19/2026) - Only the owning doctor's draft of a still-open appointment can be saved
+    updated = Consultation.objects.filter(
+        appointment_id=appointment_id,
+        appointment__status="APPROVE",
+        doctor=request.user,
+        status="ONGOING",
+        version=version,
+    ).update(version=F('version') + 1, **changes)
+    if updated:
+        return JsonResponse({'version': version + 1})
+
+    # (10/19/2026) - Nothing matched: either this is the first save or the client is stale
+    current = Consultation.objects.filter(appointment_id=appointment_id).values(
+        'version', 'status', 'doctor_id', 'appointment__status'
+    ).first()
+    if current is None and version == 0:
+        appointment = get_object_or_404(
+            Appointment, id=appointment_id, status="APPROVE", doctor__user=request.user
+        )
+        try:
+            with transaction.atomic():
+                Consultation.objects.create(appointment=appointment, doctor=request.user, version=1, **changes)
+            return JsonResponse({'version': 1})
+        except IntegrityError:
+            current = Consultation.objects.filter(appointment_id=appointment_id).values(
+                'version', 'status', 'doctor_id', 'appointment__status'
+            ).first()
+
+    if (current is None or current['doctor_id'] != request.user.id or current['status'] != "ONGOING"
+            or current['appointment__status'] != "APPROVE"):
+        return JsonResponse({'error': 'This consultation can no longer be edited'}, status=409)
+    return JsonResponse({'error': 'Draft was saved from another window', 'version': current['version']}, status=409)
+
+
+# (10/19/2026) - ICD-10 autocomplete served from the in-memory trie (no database query)
+@login_required
+def diagnosis_code_search(request):
+    results = get_trie().search(request.GET.get('q', ''), limit=20)
+    return JsonResponse({
+        'results': [{'code': code, 'description': description} for code, description in results]
+    })
+
+
+# (10/19/2026) - JSON endpoint with the doctor's frequently prescribed medicines for a diagnosis
+@login_required
+def prescription_suggestions(request):
+    suggestions = PrescriptionStat.suggestions(request.user, request.GET.get('diagnosis', ''))
+
+    def serialize(rows):
+        return [
+            {
+                'medicine_id': row.medicine_id,
+                'name': row.medicine.name,
+                'price': str(row.medicine.price),
+                'times_prescribed': row.times_prescribed,
+            }
+            for row in rows
+        ]
+
+    return JsonResponse({
+        'overall': serialize(suggestions['overall']),
+        'by_keyword': {keyword: serialize(rows) for keyword, rows in suggestions['by_keyword'].items()},
+    })
+
+
+# (Old Code) - My Patients built from a DISTINCT join over every appointment
+# @login_required
+# def my_patients(request):
+#     doctor = get_object_or_404(DoctorProfile, user=request.user)
+#     patients = Patient.objects.filter(
+#         appointment__doctor=doctor,
+#         appointment__status__in=['APPROVE', 'COMPLETED']
+#     ).distinct()
+#     search_query = request.GET.get('search', '')
+#     if search_query:
+#         patients = patients.filter(
+#             Q(first_name__icontains=search_query) |
+#             Q(last_name__icontains=search_query)
+#         )
+#     patients = patients.order_by('last_name', 'first_name')
+#     return render(request, 'doctor/my_patients.html', {
+#         'patients': patients,
+#         'search_query': search_query
+#     })
+
+
+# (10/19/2026) - My Patients view - paginated scan of the doctor's DoctorPatient rows, most recent first
 @login_required
 def my_patients(request):
     doctor = get_object_or_404(DoctorProfile, user=request.user)
 
-    # (12/18/2025 - Gocotano) - Get unique patients with APPROVE or COMPLETED appointments for this doctor
-    patients = Patient.objects.filter(
-        appointment__doctor=doctor,
-        appointment__status__in=['APPROVE', 'COMPLETED']
-    ).distinct()
+    patient_links = DoctorPatient.objects.filter(doctor=doctor).select_related('patient')
 
     # (12/18/2025 - Gocotano) - Search filter
     search_query = request.GET.get('search', '')
     if search_query:
-        patients = patients.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query)
+        patient_links = patient_links.filter(
+            Q(patient__first_name__icontains=search_query) |
+            Q(patient__last_name__icontains=search_query)
         )
 
-    patients = patients.order_by('last_name', 'first_name')
+    patient_links = patient_links.order_by('-last_seen', '-id')
+    page_obj = Paginator(patient_links, MY_PATIENTS_PER_PAGE).get_page(request.GET.get('page'))
 
     return render(request, 'doctor/my_patients.html', {
-        'patients': patients,
+        'page_obj': page_obj,
         'search_query': search_query
     })
 
@@ -211,24 +452,36 @@ def my_patients(request):
 @login_required
 def my_patient_detail(request, patient_id):
     doctor = get_object_or_404(DoctorProfile, user=request.user)
-    patient = get_object_or_404(Patient, id=patient_id)
 
-    # (12/18/2025 - Gocotano) - Verify this patient has appointments with this doctor
-    has_appointment = Appointment.objects.filter(
-        patient=patient,
-        doctor=doctor,
-        status__in=['APPROVE', 'COMPLETED']
-    ).exists()
+    # (Old Code) - Verify this patient has appointments with this doctor
+    # patient = get_object_or_404(Patient, id=patient_id)
+    # has_appointment = Appointment.objects.filter(
+    #     patient=patient,
+    #     doctor=doctor,
+    #     status__in=['APPROVE', 'COMPLETED']
+    # ).exists()
 
-    if not has_appointment:
+    # (10/19/2026) - Access check and patient load in one unique-key lookup
+    patient_link = DoctorPatient.objects.filter(doctor=doctor, patient_id=patient_id).select_related('patient').first()
+
+    if not patient_link:
         return redirect('my_patients')
+    patient = patient_link.patient
 
     # (12/18/2025 - Gocotano) - Get patient's documents and pictures
     documents = PatientDocument.objects.filter(patient=patient)
     pictures = PatientPicture.objects.filter(patient=patient)
 
     # (12/18/2025 - Gocotano) - Get all consultations for this patient with this doctor
+    # consultations = Consultation.objects.filter(
+    #     appointment__patient=patient,
+    #     doctor=request.user
+    # ).order_by('-date')
+
+    # (10/19/2026) - Finished consultations only, an autosaved draft is not history yet. Rows saved
+    # before drafts existed are still ONGOING, their completed appointment marks them as done
     consultations = Consultation.objects.filter(
+        Q(status='COMPLETED') | Q(appointment__status='COMPLETED'),
         appointment__patient=patient,
         doctor=request.user
     ).order_by('-date')
@@ -241,8 +494,39 @@ def my_patient_detail(request, patient_id):
 
     return render(request, 'doctor/my_patient_detail.html', {
         'patient': patient,
+        'patient_link': patient_link,  # (10/19/2026) - First/last seen and visit count
         'documents': documents,
         'pictures': pictures,
         'consultations': consultations,
         'appointments': appointments
     })
+
+
+# (10/19/2026) - Pharmacy stock: low-stock report (or every stocked medicine) and bulk receipts
+@login_required
+def pharmacy_stock(request):
+    show_all = request.GET.get('all') == '1'
+
+    if request.method == 'POST':
+        quantities = {}
+        for key, value in request.POST.items():
+            medicine_id = key[len('receive_'):]
+            if key.startswith('receive_') and medicine_id.isdigit() and value.strip().isdigit() and int(value) > 0:
+                quantities[int(medicine_id)] = int(value)
+        if quantities:
+            movements = receive_stock(quantities, user=request.user, reference=request.POST.get('reference', '').strip())
+            messages.success(request, f'Received stock for {len(movements)} medicine(s).')
+        else:
+            messages.warning(request, 'Enter at least one received quantity.')
+        return redirect(request.get_full_path())
+
+    if show_all:
+        medicines = Medicine.objects.filter(track_stock=True, is_active=True).order_by('name')
+    else:
+        medicines = low_stock()
+
+    page_obj = Paginator(medicines, STOCK_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'doctor/pharmacy_stock.html', {
+        'page_obj': page_obj,
+        'show_all': show_all,
+    })
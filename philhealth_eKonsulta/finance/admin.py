@@ -1,5 +1,11 @@
-from django.contrib import admin
-from .models import Billing, BillingItem, Transaction
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+from .coverage import apply_bulk_coverage, BULK_COVERAGE_LIMIT
+from .pka import get_pka_client, PKAError, PKAUncertainError
+from .payments import PaymentError
+from .models import Billing, BillingItem, Transaction, DailyRevenueRollup, DailyBillingRollup, RollupWatermark
+from .models import LedgerEntry, LedgerCheckpoint, DrawerSession, PackageRule, ClaimTransmittal, ClaimLine
 
 # (Old Code) - Original Payment admin registration
 # from .models import Payment
@@ -16,6 +22,46 @@ class BillingAdmin(admin.ModelAdmin):
     list_display = ('consultation', 'total_amount', 'philhealth_coverage', 'amount_paid', 'status', 'created_at')
     search_fields = ('consultation__appointment__patient__first_name', 'consultation__appointment__patient__last_name')
     list_filter = ('status', 'created_at')
+    actions = ['apply_philhealth_coverage']
+
+    # (10/19/2026) - Bulk PhilHealth coverage: shows a dry-run preview first, applies on confirm
+    @admin.action(description='Apply PhilHealth coverage to selected billings')
+    def apply_philhealth_coverage(self, request, queryset):
+        billing_ids = list(queryset.values_list('pk', flat=True)[:BULK_COVERAGE_LIMIT + 1])
+        if len(billing_ids) > BULK_COVERAGE_LIMIT:
+            self.message_user(request, f'Select at most {BULK_COVERAGE_LIMIT} billings per batch.', messages.ERROR)
+            return None
+
+        if request.POST.get('apply'):
+            try:
+                result = apply_bulk_coverage(
+                    billing_ids,
+                    user=request.user,
+                    reference_number=request.POST.get('reference_number', ''),
+                    remarks=request.POST.get('remarks') or 'PhilHealth Full Coverage',
+                )
+            except (PKAUncertainError, PaymentError) as error:
+                self.message_user(request, str(error), messages.ERROR)
+                return None
+            except PKAError as error:
+                self.message_user(request, f'The claim was not submitted, nothing was applied: {error}', messages.ERROR)
+                return None
+            self.message_user(request, f'PhilHealth coverage applied to {result.count} billing(s), ₱{result.total} in total.', messages.SUCCESS)
+            if len(billing_ids) > result.count:
+                self.message_user(request, f'{len(billing_ids) - result.count} billing(s) were skipped because they are not eligible.', messages.WARNING)
+            return None
+
+        result = apply_bulk_coverage(billing_ids, dry_run=True)
+        return TemplateResponse(request, 'admin/finance/billing/apply_philhealth_coverage.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Apply PhilHealth coverage',
+            'opts': self.model._meta,
+            'result': result,
+            'skipped': len(billing_ids) - result.count,
+            'selected_ids': billing_ids,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'pka_enabled': get_pka_client() is not None,
+        })
 
 
 # (12-19-2025) Gocotano - Register BillingItem model in admin
@@ -32,3 +78,86 @@ class TransactionAdmin(admin.ModelAdmin):
     list_display = ('billing', 'amount', 'payment_method', 'reference_number', 'processed_by', 'created_at')
     search_fields = ('reference_number', 'remarks')
     list_filter = ('payment_method', 'created_at')
+
+
+# (10/19/2026) - Register the rollup models in admin for inspection, they are written by `refresh_rollups`
+@admin.register(DailyRevenueRollup)
+class DailyRevenueRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'payment_method', 'doctor', 'transaction_count', 'amount')
+    list_filter = ('payment_method', 'day')
+    date_hierarchy = 'day'
+
+
+@admin.register(DailyBillingRollup)
+class DailyBillingRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'item_type', 'doctor', 'item_count', 'quantity', 'amount')
+    list_filter = ('item_type', 'day')
+    date_hierarchy = 'day'
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('name', 'last_id', 'updated_at')
+
+
+# (10/19/2026) - The ledger is append-only, so its admin is read-only
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('posted_at', 'account', 'kind', 'amount', 'billing_id', 'transaction_id', 'journal')
+    list_filter = ('account', 'kind', 'posted_at')
+    search_fields = ('journal', 'description')
+    date_hierarchy = 'posted_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LedgerCheckpoint)
+class LedgerCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('account', 'as_of', 'balance', 'created_at')
+    list_filter = ('account',)
+    date_hierarchy = 'as_of'
+
+
+# (10/19/2026) - Closed drawer sessions are frozen snapshots, their figures are read-only here
+@admin.register(DrawerSession)
+class DrawerSessionAdmin(admin.ModelAdmin):
+    list_display = ('cashier', 'status', 'opened_at', 'closed_at', 'opening_float', 'expected_cash', 'counted_cash', 'variance')
+    list_filter = ('status', 'opened_at')
+    date_hierarchy = 'opened_at'
+    readonly_fields = (
+        'closed_at', 'cash_collected', 'expected_cash', 'counted_cash', 'variance', 'snapshot', 'closed_by',
+    )
+
+
+# (10/19/2026) - Konsulta package rules; saving one recompiles the pricing engine
+@admin.register(PackageRule)
+class PackageRuleAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'medicine', 'amount', 'max_quantity', 'is_active', 'updated_at')
+    list_filter = ('kind', 'is_active')
+    search_fields = ('medicine__name', 'notes')
+    autocomplete_fields = ('medicine',)
+
+
+# (10/19/2026) - Claims submitted through PKA, written by the coverage views
+class ClaimLineInline(admin.TabularInline):
+    model = ClaimLine
+    extra = 0
+    can_delete = False
+    readonly_fields = ('billing', 'amount')
+
+
+@admin.register(ClaimTransmittal)
+class ClaimTransmittalAdmin(admin.ModelAdmin):
+    list_display = ('transmittal_id', 'status', 'transaction_number', 'billing_count', 'total', 'submitted_by', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('transmittal_id', 'transaction_number')
+    date_hierarchy = 'created_at'
+    readonly_fields = ('transmittal_id', 'status', 'transaction_number', 'billing_count', 'total', 'submitted_by', 'idempotency_key', 'error')
+    inlines = [ClaimLineInline]
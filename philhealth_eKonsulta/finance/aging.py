@@ -0,0 +1,146 @@
+# (10/19/2026) - Accounts-receivable aging of open billings (0-30, 31-60, 61-90 and 90+ days)
+#
+# Everything is computed in SQL. Open billings (PENDING/PARTIAL with a balance) are read through
+# the partial billing_open_aging_idx index on created_at. They are grouped per doctor and
+# patient with one conditional SUM per age bucket. Window functions then add each doctor's
+# subtotal and each patient's rank within the doctor, so the page can keep the largest
+# balances per doctor without a second pass. The page result is cached for a few minutes; the
+# CSV export streams every row.
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Count, Sum, Min, Q, F, Func, Value, Window, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+from .models import Billing
+
+OPEN_STATUSES = ('PENDING', 'PARTIAL')
+# (key, label, lowest age in days, highest age in days or None)
+AGING_BUCKETS = [
+    ('days_0_30', '0-30 days', 0, 30),
+    ('days_31_60', '31-60 days', 31, 60),
+    ('days_61_90', '61-90 days', 61, 90),
+    ('days_over_90', '90+ days', 91, None),
+]
+AGING_TOP_PATIENTS = 20
+AGING_CACHE_TIMEOUT = 60 * 5
+AGING_CSV_CHUNK_SIZE = 2000
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+DOCTOR = 'consultation__appointment__doctor'
+PATIENT = 'consultation__appointment__patient'
+
+
+# SUM() of an aggregate inside a window, e.g. SUM(SUM(balance)) OVER (PARTITION BY doctor).
+# Django's Sum refuses aggregate arguments, so this is the plain SQL function.
+class WindowSum(Func):
+    function = 'SUM'
+    window_compatible = True
+    output_field = MONEY
+
+
+def _money_sum(condition=None):
+    return Coalesce(Sum('balance', filter=condition), Value(Decimal('0.00')), output_field=MONEY)
+
+
+def _bucket_aggregates(today):
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
+    aggregates = {}
+    for key, _, low, high in AGING_BUCKETS:
+        # Age in whole days: a billing created today is 0 days old
+        condition = Q(created_at__lt=day_start - timedelta(days=low - 1))
+        if high is not None:
+            condition &= Q(created_at__gte=day_start - timedelta(days=high))
+        aggregates[key] = _money_sum(condition)
+    aggregates['total'] = _money_sum()
+    aggregates['billing_count'] = Count('id')
+    aggregates['oldest'] = Min('created_at')
+    return aggregates
+
+
+def open_billings(doctor_id=None):
+    billings = Billing.objects.filter(status__in=OPEN_STATUSES).annotate(
+        balance=ExpressionWrapper(F('total_amount') - F('philhealth_coverage') - F('amount_paid'), output_field=MONEY)
+    ).filter(balance__gt=0)
+    if doctor_id:
+        billings = billings.filter(**{f'{DOCTOR}_id': doctor_id})
+    return billings
+
+
+# (10/19/2026) - Bucket totals per doctor
+def aging_by_doctor(today, doctor_id=None):
+    return list(
+        open_billings(doctor_id)
+        .values(
+            doctor_ref=F(f'{DOCTOR}_id'),
+            doctor_first_name=F(f'{DOCTOR}__first_name'),
+            doctor_last_name=F(f'{DOCTOR}__last_name'),
+        )
+        .annotate(**_bucket_aggregates(today))
+        .order_by('-total')
+    )
+
+
+# (10/19/2026) - Bucket totals per doctor and patient with the doctor subtotal and the patient's
+# rank by balance within the doctor; top keeps only the first `top` patients of each doctor
+def aging_by_patient(today, doctor_id=None, top=None):
+    rows = (
+        open_billings(doctor_id)
+        .values(
+            doctor_ref=F(f'{DOCTOR}_id'),
+            doctor_first_name=F(f'{DOCTOR}__first_name'),
+            doctor_last_name=F(f'{DOCTOR}__last_name'),
+            patient_ref=F(f'{PATIENT}_id'),
+            patient_first_name=F(f'{PATIENT}__first_name'),
+            patient_last_name=F(f'{PATIENT}__last_name'),
+        )
+        .annotate(**_bucket_aggregates(today))
+        .annotate(
+            doctor_total=Window(WindowSum('total'), partition_by=[F('doctor_ref')]),
+            rank=Window(RowNumber(), partition_by=[F('doctor_ref')], order_by=[F('total').desc(), F('patient_ref').asc()]),
+        )
+        .order_by('-doctor_total', 'doctor_ref', 'rank')
+    )
+    if top:
+        rows = rows.filter(rank__lte=top)
+    return rows
+
+
+# (10/19/2026) - The aging page data, cached per doctor filter for AGING_CACHE_TIMEOUT
+def get_aging_report(doctor_id=None, top=AGING_TOP_PATIENTS, refresh=False):
+    today = timezone.localdate()
+    key = f'ar_aging:{today}:{doctor_id or "all"}:{top}'
+    report = None if refresh else cache.get(key)
+    if report is None:
+        doctors = aging_by_doctor(today, doctor_id)
+        totals = {bucket: sum((row[bucket] for row in doctors), Decimal('0.00')) for bucket, *_ in AGING_BUCKETS}
+        totals['total'] = sum((row['total'] for row in doctors), Decimal('0.00'))
+        totals['billing_count'] = sum(row['billing_count'] for row in doctors)
+        report = {
+            'as_of': today,
+            'generated_at': timezone.now(),
+            'doctors': doctors,
+            'totals': totals,
+            'patients': list(aging_by_patient(today, doctor_id, top)),
+        }
+        cache.set(key, report, AGING_CACHE_TIMEOUT)
+    return report
+
+
+AGING_CSV_HEADER = ['Doctor', 'Patient', 'Open Billings', 'Oldest Billing'] + [label for _, label, *_ in AGING_BUCKETS] + ['Total']
+
+
+# (10/19/2026) - Every doctor/patient row for the CSV export, streamed from the database
+def aging_csv_rows(doctor_id=None):
+    yield AGING_CSV_HEADER
+    rows = aging_by_patient(timezone.localdate(), doctor_id)
+    for row in rows.iterator(chunk_size=AGING_CSV_CHUNK_SIZE):
+        yield [
+            f"Dr. {row['doctor_first_name']} {row['doctor_last_name']}",
+            f"{row['patient_first_name']} {row['patient_last_name']}",
+            row['billing_count'],
+            timezone.localtime(row['oldest']).date().isoformat(),
+            *[row[bucket] for bucket, *_ in AGING_BUCKETS],
+            row['total'],
+        ]
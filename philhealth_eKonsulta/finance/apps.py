@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class FinanceConfig(AppConfig):
     name = 'finance'
+
+    # (10/19/2026) - Register signal handlers
+    def ready(self):
+        from . import signals  # noqa: F401
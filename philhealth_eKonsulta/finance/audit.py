@@ -0,0 +1,180 @@
+# (10/19/2026) - Billing total drift detection and repair, run by `manage.py audit_billings`
+#
+# Billing.total_amount is written once when the billing is created. Billings are scanned in
+# primary key chunks; each chunk is one query that sets the stored total beside the SQL sums
+# of the consultation's prescriptions and of the billing's items (correlated subqueries on the
+# foreign key indexes). Only the current chunk is held in memory.
+#
+# Repair locks the drifted billings of a chunk, recomputes them on the locked rows and fixes
+# total_amount and status in one UPDATE per chunk. Each change is posted to the ledger as an
+# adjustment. A repair from prescriptions also brings the MEDICINE items in line, so the next
+# run finds nothing; a repair from items only touches billings whose items bill the
+# prescriptions and reports the others.
+
+import copy
+from collections import namedtuple, defaultdict
+from functools import partial
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, When, Value, F, Sum, OuterRef, Subquery, DecimalField, CharField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from doctor.models import Prescription
+from .models import Billing, BillingItem
+from .ledger import adjustment_entries, post_entries
+from .billing import billing_status, build_billing_items
+from .metrics import invalidate_billing_metrics
+from .rollups import adjust_billing_rollups
+
+AUDIT_CHUNK_SIZE = 5000
+ZERO = Decimal('0.00')
+# Which recomputed sum a repaired total is set to
+REPAIR_SOURCES = ('prescriptions', 'items')
+
+BillingDrift = namedtuple('BillingDrift', [
+    'billing_id', 'total_amount', 'prescription_total', 'item_total', 'medicine_total',
+    'amount_paid', 'philhealth_coverage', 'status',
+])
+ITEM_FIELDS = ['description', 'quantity', 'unit_price', 'total_price']
+
+
+def _money(expression):
+    return Coalesce(expression, Value(ZERO), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _with_sums(billings):
+    prescription_total = (
+        Prescription.objects.filter(consultation_id=OuterRef('consultation_id'))
+        .values('consultation_id')
+        .annotate(total=Sum(F('unit_price') * F('quantity')))
+        .values('total')
+    )
+    items = BillingItem.objects.filter(billing_id=OuterRef('pk')).values('billing_id').annotate(total=Sum('total_price'))
+    return billings.annotate(
+        prescription_total=_money(Subquery(prescription_total)),
+        item_total=_money(Subquery(items.values('total'))),
+        medicine_total=_money(Subquery(items.filter(item_type='MEDICINE').values('total'))),
+    ).values_list(
+        'pk', 'total_amount', 'prescription_total', 'item_total', 'medicine_total',
+        'amount_paid', 'philhealth_coverage', 'status',
+    )
+
+
+def _drifted(rows):
+    for row in rows:
+        drift = BillingDrift(*row)
+        if drift.item_total:
+            # Itemized: the medicine lines must bill the prescriptions and the total must be the lines
+            if drift.medicine_total != drift.prescription_total or drift.total_amount != drift.item_total:
+                yield drift
+        # Billings without items (created before itemization) are only checked against prescriptions
+        elif drift.total_amount != drift.prescription_total:
+            yield drift
+
+
+# (10/19/2026) - Update, add and remove MEDICINE items in place so they bill the prescriptions
+def _sync_medicine_items(billing_ids):
+    billing_by_consultation = dict(Billing.objects.filter(pk__in=billing_ids).values_list('consultation_id', 'pk'))
+    current = defaultdict(dict)
+    stale = []
+    for item in BillingItem.objects.filter(billing_id__in=billing_ids, item_type='MEDICINE').order_by('pk'):
+        if item.prescription_id and item.prescription_id not in current[item.billing_id]:
+            current[item.billing_id][item.prescription_id] = item
+        else:
+            # Unlinked or duplicate lines are replaced by one line per prescription
+            stale.append(item)
+
+    changed = []
+    added = []
+    prescriptions = Prescription.objects.filter(consultation_id__in=billing_by_consultation).select_related('medicine').order_by('pk')
+    for prescription in prescriptions:
+        billing_id = billing_by_consultation[prescription.consultation_id]
+        expected = build_billing_items(Billing(pk=billing_id), [prescription])[0]
+        item = current[billing_id].pop(prescription.pk, None)
+        if item is None:
+            added.append(expected)
+        elif [getattr(item, field) for field in ITEM_FIELDS] != [getattr(expected, field) for field in ITEM_FIELDS]:
+            before = copy.copy(item)
+            for field in ITEM_FIELDS:
+                setattr(item, field, getattr(expected, field))
+            changed.append((before, item))
+    stale.extend(item for items in current.values() for item in items.values())
+
+    BillingItem.objects.filter(pk__in=[item.pk for item in stale]).delete()
+    BillingItem.objects.bulk_update([item for _, item in changed], ITEM_FIELDS)
+    BillingItem.objects.bulk_create(added)
+    # Lines already in the daily rollups are taken out as they were and put back as they are
+    adjust_billing_rollups(removed=stale + [old for old, _ in changed], added=[item for _, item in changed])
+
+
+# (10/19/2026) - Lock and fix one chunk's drifted billings. Returns (drifts repaired, drifts left
+# alone because the source disagrees with the prescriptions).
+def _repair(billing_ids, source):
+    with transaction.atomic():
+        # Recomputed on the locked rows, so a payment or edit since the scan is taken into account
+        locked = Billing.objects.select_for_update().filter(pk__in=billing_ids).order_by('pk')
+        drifts = list(_drifted(_with_sums(locked)))
+        targets = {}
+        resync = []
+        skipped = []
+        for drift in drifts:
+            if source == 'prescriptions':
+                # Medicine lines are rebuilt from the prescriptions, other lines (fees) are kept
+                targets[drift.billing_id] = drift.prescription_total + drift.item_total - drift.medicine_total
+                if drift.item_total and drift.medicine_total != drift.prescription_total:
+                    resync.append(drift.billing_id)
+            elif drift.item_total and drift.medicine_total == drift.prescription_total:
+                targets[drift.billing_id] = drift.item_total
+            else:
+                # No items, or items that disagree with the prescriptions: repair from prescriptions
+                skipped.append(drift)
+        drifts = [
+            drift for drift in drifts
+            if drift.billing_id in resync or targets.get(drift.billing_id, drift.total_amount) != drift.total_amount
+        ]
+        if resync:
+            _sync_medicine_items(resync)
+        adjusted = [drift for drift in drifts if targets[drift.billing_id] != drift.total_amount]
+        if not adjusted:
+            return drifts, skipped
+
+        Billing.objects.filter(pk__in=[drift.billing_id for drift in adjusted]).update(
+            total_amount=Case(
+                *[When(pk=drift.billing_id, then=Value(targets[drift.billing_id])) for drift in adjusted],
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            status=Case(
+                *[When(pk=drift.billing_id, then=Value(billing_status(drift.status, targets[drift.billing_id], drift.amount_paid + drift.philhealth_coverage))) for drift in adjusted],
+                output_field=CharField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        post_entries([
+            entry
+            for drift in adjusted
+            for entry in adjustment_entries(
+                drift.billing_id, targets[drift.billing_id] - drift.total_amount,
+                description=f'audit_billings: total {drift.total_amount} -> {targets[drift.billing_id]}',
+            )
+        ])
+        transaction.on_commit(partial(invalidate_billing_metrics, [drift.billing_id for drift in adjusted]))
+    return drifts, skipped
+
+
+# (10/19/2026) - Scan every billing in pk chunks, yielding (chunk size, drifts in chunk, drifts
+# skipped). With repair, the drifts are the billings that were fixed and the skipped ones are
+# those the chosen source cannot fix; without repair nothing is skipped.
+def audit_billings(chunk_size=AUDIT_CHUNK_SIZE, repair=False, source='prescriptions'):
+    if source not in REPAIR_SOURCES:
+        raise ValueError(f'Unknown repair source: {source}')
+    last_pk = 0
+    while True:
+        rows = list(_with_sums(Billing.objects.filter(pk__gt=last_pk).order_by('pk')[:chunk_size]))
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        drifts = list(_drifted(rows))
+        skipped = []
+        if repair and drifts:
+            drifts, skipped = _repair([drift.billing_id for drift in drifts], source)
+        yield len(rows), drifts, skipped
@@ -0,0 +1,185 @@
+# (10/19/2026) - Billing generation for completed consultations
+#
+# Billings are created when the doctor completes a consultation (see finance/signals.py), in the
+# same transaction as the consultation itself. Consultations completed before that was in place
+# are billed by the `backfill_billings` command. Nothing creates billings while pages are viewed.
+#
+# Prescriptions added, changed or deleted after billing are applied as deltas: the matching
+# BillingItem is inserted, updated or removed and the difference is added to total_amount with
+# an F() update on the locked billing, without re-summing the rest of the bill.
+
+from decimal import Decimal
+from functools import partial
+from django.db import transaction, IntegrityError
+from django.db.models import Prefetch, F
+from django.utils import timezone
+from doctor.models import Consultation, Prescription
+from .models import Billing, BillingItem
+from .metrics import invalidate_billing_metrics
+from .ledger import charge_entries, adjustment_entries, post_entries
+from .documents import schedule_billing_documents
+from .rollups import adjust_billing_rollups
+
+BACKFILL_BATCH_SIZE = 500
+
+
+# (10/19/2026) - Billing items for the prescriptions, using the unit prices captured on them
+def build_billing_items(billing, prescriptions):
+    return [
+        BillingItem(
+            billing=billing,
+            item_type='MEDICINE',
+            description=prescription.medicine.name,
+            quantity=prescription.quantity,
+            unit_price=prescription.unit_price,
+            total_price=prescription.unit_price * prescription.quantity,  # bulk_create skips BillingItem.save()
+            prescription=prescription,
+        )
+        for prescription in prescriptions
+    ]
+
+
+def _total(items):
+    return sum((item.total_price for item in items), Decimal('0.00'))
+
+
+# (10/19/2026) - Create the billing for one consultation unless it already has one
+def create_billing(consultation, prescriptions=None):
+    return _create_billing(consultation, prescriptions)[0]
+
+
+# Returns (billing, created)
+def _create_billing(consultation, prescriptions=None):
+    if prescriptions is None:
+        prescriptions = consultation.prescriptions.select_related('medicine')
+
+    with transaction.atomic():
+        billing, created = Billing.objects.get_or_create(consultation=consultation)
+        if created:
+            items = build_billing_items(billing, prescriptions)
+            BillingItem.objects.bulk_create(items)
+            billing.total_amount = _total(items)
+            billing.save(update_fields=['total_amount', 'updated_at'])
+            post_entries(charge_entries(billing))
+    return billing, created
+
+
+# (10/19/2026) - Completed consultations that were never billed
+def unbilled_consultations():
+    return Consultation.objects.filter(appointment__status='COMPLETED', billing__isnull=True)
+
+
+# (10/19/2026) - Bill every unbilled consultation in batches, returns the number of billings created
+def backfill_billings(batch_size=BACKFILL_BATCH_SIZE):
+    created = 0
+    prescriptions = Prescription.objects.select_related('medicine')
+    while True:
+        batch = list(
+            unbilled_consultations()
+            .prefetch_related(Prefetch('prescriptions', queryset=prescriptions))
+            .order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return created
+
+        try:
+            with transaction.atomic():
+                billings = []
+                items = []
+                for consultation in batch:
+                    billing = Billing(consultation=consultation)
+                    billing_items = build_billing_items(billing, consultation.prescriptions.all())
+                    billing.total_amount = _total(billing_items)
+                    billings.append(billing)
+                    items.append(billing_items)
+                Billing.objects.bulk_create(billings)
+                for billing, billing_items in zip(billings, items):
+                    for item in billing_items:
+                        item.billing = billing  # Picks up the primary key set by bulk_create
+                BillingItem.objects.bulk_create([item for billing_items in items for item in billing_items], batch_size=1000)
+                post_entries([entry for billing in billings for entry in charge_entries(billing)])
+                # bulk_create sends no post_save
+                transaction.on_commit(partial(invalidate_billing_metrics, [billing.pk for billing in billings]))
+        except IntegrityError:
+            # A consultation in this batch was billed meanwhile, fall back to one at a time and
+            # count only the billings this run created
+            for consultation in batch:
+                created += _create_billing(consultation, consultation.prescriptions.all())[1]
+        else:
+            created += len(batch)
+
+
+# (10/19/2026) - Status of a billing once its total or the amounts settled on it changed
+def billing_status(status, total, settled):
+    if total - settled <= 0:
+        if status in ('PAID', 'PHILHEALTH'):
+            return status
+        return 'PAID' if settled else 'PENDING'
+    return 'PARTIAL' if settled else 'PENDING'
+
+
+# (10/19/2026) - (medicine id, quantity, unit price) of a prescription, None once deleted
+def prescription_state(prescription):
+    return tuple(prescription.__dict__.get(name) for name in ('medicine_id', 'quantity', 'unit_price'))
+
+
+def _billed_item(billing, prescription, old_state):
+    item = BillingItem.objects.filter(billing=billing, prescription_id=prescription.pk).first()
+    if item is None and old_state and old_state[0]:
+        # Items billed before they were linked to their prescription are matched on what was billed
+        medicine_id, quantity, unit_price = old_state
+        item = BillingItem.objects.filter(
+            billing=billing, prescription__isnull=True, item_type='MEDICINE',
+            description=prescription.medicine.name, quantity=quantity, unit_price=unit_price,
+        ).first()
+    return item
+
+
+# (10/19/2026) - Apply one prescription add/change/delete to its consultation's billing, if
+# it has one. new_state is None for a delete. Returns the change in total_amount.
+def apply_prescription_change(prescription, old_state, new_state):
+    if old_state == new_state:
+        return Decimal('0.00')
+
+    with transaction.atomic():
+        billing = Billing.objects.select_for_update().filter(consultation_id=prescription.consultation_id).first()
+        if billing is None:
+            # Not billed yet; the billing will include the prescription when it is created
+            return Decimal('0.00')
+
+        item = _billed_item(billing, prescription, old_state)
+        old_amount = item.total_price if item else Decimal('0.00')
+        if new_state is None:
+            new_amount = Decimal('0.00')
+            if item:
+                adjust_billing_rollups(removed=[item])
+                item.delete()
+        else:
+            _, quantity, unit_price = new_state
+            new_amount = unit_price * quantity
+            values = {
+                'description': prescription.medicine.name,
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'total_price': new_amount,
+                'prescription': prescription,
+            }
+            if item:
+                BillingItem.objects.filter(pk=item.pk).update(**values)
+                updated = BillingItem(pk=item.pk, billing=billing, item_type=item.item_type, created_at=item.created_at, **values)
+                adjust_billing_rollups(removed=[item], added=[updated])
+            else:
+                BillingItem.objects.create(billing=billing, item_type='MEDICINE', **values)
+
+        delta = new_amount - old_amount
+        if delta:
+            settled = billing.amount_paid + billing.philhealth_coverage
+            Billing.objects.filter(pk=billing.pk).update(
+                total_amount=F('total_amount') + delta,
+                status=billing_status(billing.status, billing.total_amount + delta, settled),
+                updated_at=timezone.now(),
+            )
+            post_entries(adjustment_entries(billing.pk, delta, description=f'Prescription #{prescription.pk} changed'))
+            transaction.on_commit(partial(invalidate_billing_metrics, [billing.pk]))
+        schedule_billing_documents(billing.pk)
+    return delta
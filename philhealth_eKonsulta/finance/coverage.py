@@ -0,0 +1,315 @@
+# (10/19/2026) - PhilHealth coverage applied to a batch of billings at once
+#
+# The month-end claim batch used to be one apply_philhealth POST per bill. Here the selected
+# billings are locked in pk order, re-checked for eligibility on the locked rows, every
+# PhilHealth transaction is inserted with one bulk_create and all billings are moved to
+# PHILHEALTH with one set-based UPDATE, all in a single transaction. A dry run runs the same
+# selection without locking or writing, so the preview shows exactly what would be applied.
+#
+# When Konsulta package rules are configured each billing is covered by its package price
+# (finance/pricing.py) instead of its whole balance; billings only partly covered stay PARTIAL.
+#
+# With PKA configured (finance/pka.py) a claim goes through three short steps so no row lock is
+# held while PhilHealth is called: the billings are locked, priced and reserved by a
+# ClaimTransmittal committed as SUBMITTING; the report is sent with no transaction open; then the
+# billings are locked again and paid with PhilHealth's transaction number as the reference. A
+# claim whose answer was lost stays SUBMITTING and one accepted but not yet posted stays ACCEPTED;
+# both keep their billings out of new claims until `manage.py reconcile_claims` settles them.
+
+import logging
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from functools import partial
+from django.db import transaction, DatabaseError
+from django.db.models import F, DecimalField, ExpressionWrapper, Case, When, Value
+from django.utils import timezone
+from .metrics import invalidate_billing_metrics
+from .ledger import payment_entries, post_entries
+from .models import Billing, Transaction, ClaimTransmittal, ClaimLine
+from .pricing import get_package_pricer, price_billings
+from .pka import get_pka_client, PKAError, PKAUncertainError
+from .payments import post_payment, PaymentError
+
+# Billings that still have a balance PhilHealth can cover
+COVERAGE_STATUSES = ('PENDING', 'PARTIAL')
+# Upper bound on billings applied by one request, larger batches are applied in several runs
+BULK_COVERAGE_LIMIT = 500
+# Claims that may still pay their billings; those billings cannot be claimed again meanwhile
+PENDING_CLAIM_STATUSES = ClaimTransmittal.PENDING_STATUSES
+
+logger = logging.getLogger(__name__)
+
+BulkCoverageResult = namedtuple('BulkCoverageResult', ['billings', 'count', 'total', 'applied'])
+
+
+def _with_balance(billings):
+    return billings.annotate(
+        balance=ExpressionWrapper(
+            F('total_amount') - F('philhealth_coverage') - F('amount_paid'),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+    )
+
+
+# (10/19/2026) - Billings eligible for coverage, narrowed by the batch filters
+def eligible_billings(status='', start=None, end=None, doctor_id=None, max_balance=None):
+    billings = _with_balance(Billing.objects.filter(status__in=COVERAGE_STATUSES)).filter(balance__gt=0).exclude(
+        claim_lines__transmittal__status__in=PENDING_CLAIM_STATUSES
+    )
+    if status in COVERAGE_STATUSES:
+        billings = billings.filter(status=status)
+    if start:
+        billings = billings.filter(created_at__date__gte=start)
+    if end:
+        billings = billings.filter(created_at__date__lte=end)
+    if doctor_id:
+        billings = billings.filter(consultation__appointment__doctor_id=doctor_id)
+    if max_balance is not None:
+        billings = billings.filter(balance__lte=max_balance)
+    return billings
+
+
+# (10/19/2026) - Sets billing.coverage: the package price left to claim when package rules are
+# configured, otherwise the whole remaining balance
+def set_coverage(billings):
+    if get_package_pricer():
+        priced = price_billings(billings)
+        for billing in billings:
+            billing.coverage = priced[billing.pk].to_apply
+    else:
+        for billing in billings:
+            billing.coverage = billing.balance
+    return billings
+
+
+# (10/19/2026) - R + accreditation number (9) + YYYYMM + 5 digits, as in the PKA specification.
+# YYYYMM is the month reported on, the month the transmittal was made unless one is given
+def transmittal_number(hospital_code, transmittal, month=None):
+    month = month or timezone.localtime(transmittal.created_at)
+    return f"R{hospital_code[-9:]:0>9}{month:%Y%m}{transmittal.pk % 100000:05d}"
+
+
+# (10/19/2026) - Claim report for billings with .coverage set, one CLAIM element per billing
+def claim_report(transmittal_id, hospital_code, billings):
+    root = ET.Element('PCB')
+    ET.SubElement(root, 'pHciAccreNo').text = hospital_code
+    ET.SubElement(root, 'pHciTransmittalNumber').text = transmittal_id
+    ET.SubElement(root, 'pClaimTotalCnt').text = str(len(billings))
+    for billing in billings:
+        patient = billing.consultation.appointment.patient
+        claim = ET.SubElement(root, 'CLAIM')
+        ET.SubElement(claim, 'pHciCaseNo').text = str(billing.pk)
+        ET.SubElement(claim, 'pPIN').text = patient.philhealth_pin
+        ET.SubElement(claim, 'pPatientLname').text = patient.last_name
+        ET.SubElement(claim, 'pPatientFname').text = patient.first_name
+        ET.SubElement(claim, 'pClaimAmount').text = f'{billing.coverage:.2f}'
+    return ET.tostring(root, encoding='unicode')
+
+
+# (10/19/2026) - Billings among billing_ids held by a claim that has not settled. Read with its own
+# query after the rows are locked, so a reservation committed while waiting for the lock is seen.
+def _claimed(billing_ids):
+    return set(ClaimLine.objects.filter(
+        billing_id__in=billing_ids, transmittal__status__in=PENDING_CLAIM_STATUSES
+    ).values_list('billing_id', flat=True))
+
+
+# (10/19/2026) - Reserve locked billings (with .coverage set) for a claim. Runs inside the
+# caller's transaction; once it commits the billings stay out of other claims while PKA is called.
+def _reserve_claim(billings, user=None, idempotency_key=None, remarks=''):
+    transmittal = ClaimTransmittal.objects.create(
+        billing_count=len(billings),
+        total=sum(billing.coverage for billing in billings),
+        submitted_by=user,
+        idempotency_key=idempotency_key or None,
+        remarks=remarks,
+    )
+    transmittal.transmittal_id = transmittal_number(get_pka_client().hospital_code, transmittal)
+    transmittal.save(update_fields=['transmittal_id'])
+    ClaimLine.objects.bulk_create([
+        ClaimLine(transmittal=transmittal, billing=billing, amount=billing.coverage) for billing in billings
+    ])
+    return transmittal
+
+
+# (10/19/2026) - Send a reserved claim through PKA and record the answer. Must run with no
+# transaction open: the answer is saved whatever happens next. Raises PKAError when the claim
+# was rejected or never sent (the billings are released) and PKAUncertainError when it was sent
+# but no answer came back (the billings stay held until the claim is reconciled).
+def submit_claim(transmittal):
+    client = get_pka_client()
+    billings = []
+    for line in transmittal.lines.select_related('billing__consultation__appointment__patient').order_by('billing_id'):
+        line.billing.coverage = line.amount
+        billings.append(line.billing)
+    report = claim_report(transmittal.transmittal_id, client.hospital_code, billings)
+    try:
+        transmittal.transaction_number = client.submit_report(transmittal.transmittal_id, report)
+    except PKAUncertainError as error:
+        transmittal.error = str(error)
+        transmittal.save(update_fields=['error'])
+        raise PKAUncertainError(
+            f'No answer from PhilHealth for claim {transmittal.transmittal_id}; its billings are held until the claim is reconciled.'
+        )
+    except PKAError as error:
+        transmittal.status = 'FAILED'
+        transmittal.error = str(error)
+        transmittal.save(update_fields=['status', 'error'])
+        raise
+    transmittal.status = 'ACCEPTED'
+    transmittal.save(update_fields=['transaction_number', 'status'])
+    return transmittal
+
+
+# (10/19/2026) - Insert the PhilHealth transactions for locked billings with .coverage set, with
+# one bulk_create and one UPDATE. Runs inside the caller's transaction; returns the transactions.
+def _post_coverage(billings, user=None, reference_number='', remarks='', idempotency_key=None):
+    now = timezone.now()
+    payments = Transaction.objects.bulk_create([
+        Transaction(
+            billing=billing,
+            amount=billing.coverage,
+            payment_method='PHILHEALTH',
+            reference_number=reference_number,
+            remarks=remarks,
+            processed_by=user,
+            idempotency_key=idempotency_key or None,
+        )
+        for billing in billings
+    ])
+    post_entries([entry for payment in payments for entry in payment_entries(payment)])
+    # (Old Code) - Every billing was covered in full
+    # Billing.objects.filter(pk__in=[billing.pk for billing in billings]).update(
+    #     philhealth_coverage=F('total_amount') - F('amount_paid'),
+    #     status='PHILHEALTH',
+    #     updated_at=now,
+    # )
+    # (10/19/2026) - Still one UPDATE, with each billing's amount from the locked rows
+    fully_covered = [billing.pk for billing in billings if billing.coverage == billing.balance]
+    Billing.objects.filter(pk__in=[billing.pk for billing in billings]).update(
+        philhealth_coverage=F('philhealth_coverage') + Case(
+            *[When(pk=billing.pk, then=Value(billing.coverage)) for billing in billings],
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        status=Case(When(pk__in=fully_covered, then=Value('PHILHEALTH')), default=Value('PARTIAL')),
+        updated_at=now,
+    )
+    # bulk_create() and update() send no signals; statements re-render on their next print
+    transaction.on_commit(partial(invalidate_billing_metrics, [billing.pk for billing in billings]))
+    return payments
+
+
+# (10/19/2026) - Pay the billings of an ACCEPTED claim and mark it COMPLETED; anything else is
+# left alone, so running it twice posts nothing twice. A billing paid in the meantime is covered
+# only up to what is left of it. Returns the transactions posted.
+def post_claim(transmittal_id):
+    with transaction.atomic():
+        transmittal = ClaimTransmittal.objects.select_for_update().get(pk=transmittal_id)
+        if transmittal.status != 'ACCEPTED':
+            return []
+        claimed = dict(transmittal.lines.values_list('billing_id', 'amount'))
+        billings = list(_with_balance(Billing.objects.filter(pk__in=claimed, status__in=COVERAGE_STATUSES)).order_by(
+            'pk'
+        ).select_for_update())
+        for billing in billings:
+            billing.coverage = min(claimed[billing.pk], billing.balance)
+        billings = [billing for billing in billings if billing.coverage > 0]
+        payments = []
+        if billings:
+            payments = _post_coverage(
+                billings,
+                user=transmittal.submitted_by,
+                reference_number=transmittal.transaction_number,
+                remarks=transmittal.remarks,
+                idempotency_key=transmittal.idempotency_key if len(billings) == 1 else None,
+            )
+        transmittal.status = 'COMPLETED'
+        transmittal.error = ''
+        transmittal.save(update_fields=['status', 'error'])
+    return payments
+
+
+# (10/19/2026) - Submit a reserved claim and post it. An accepted claim that cannot be posted
+# stays ACCEPTED with PhilHealth's number recorded, for reconcile_claims to post later.
+def _submit_and_post(transmittal):
+    submit_claim(transmittal)
+    try:
+        return post_claim(transmittal.pk)
+    except DatabaseError as error:
+        logger.exception('Accepted claim %s could not be posted', transmittal.transmittal_id)
+        ClaimTransmittal.objects.filter(pk=transmittal.pk).update(error=str(error))
+        raise PaymentError(
+            f'PhilHealth accepted claim {transmittal.transmittal_id} (transaction {transmittal.transaction_number}), '
+            'but the payment could not be saved; it will be posted when the claim is reconciled.'
+        )
+
+
+# (10/19/2026) - PhilHealth coverage for one billing, from the billing detail form. A repeated
+# idempotency key returns before anything is sent to PhilHealth. Returns (transaction, created)
+# like post_payment.
+def apply_coverage(billing_id, user=None, idempotency_key=None, reference_number='', remarks=''):
+    client = get_pka_client()
+    with transaction.atomic():
+        billing = _with_balance(Billing.objects.select_related('consultation__appointment__patient')).select_for_update(
+            of=('self',)
+        ).get(pk=billing_id)
+        existing = Transaction.objects.filter(idempotency_key=idempotency_key).first() if idempotency_key else None
+        if existing:
+            return existing, False
+        if client and idempotency_key and ClaimTransmittal.objects.filter(idempotency_key=idempotency_key).exists():
+            raise PaymentError('This claim was already sent to PhilHealth.')
+        if billing.balance <= 0:
+            raise PaymentError('This billing has no remaining balance.')
+        if _claimed([billing.pk]):
+            raise PaymentError('A PhilHealth claim for this billing is still being processed.')
+        set_coverage([billing])
+        if billing.coverage <= 0:
+            raise PaymentError('Nothing left on this bill is covered by the Konsulta package.')
+        if not client:
+            return post_payment(
+                billing.pk,
+                billing.coverage,
+                payment_method='PHILHEALTH',
+                user=user,
+                idempotency_key=idempotency_key,
+                reference_number=reference_number,
+                remarks=remarks,
+                full_coverage=billing.coverage == billing.balance,
+            )
+        claim = _reserve_claim([billing], user, idempotency_key=idempotency_key, remarks=remarks)
+
+    payments = _submit_and_post(claim)
+    if not payments:
+        raise PaymentError(f'PhilHealth accepted claim {claim.transmittal_id}, but the billing was settled in the meantime.')
+    return payments[0], True
+
+
+# (10/19/2026) - Cover every still-eligible billing in billing_ids. Ids that are no longer
+# eligible (paid or covered since the preview, already in a claim, or nothing left to claim)
+# are skipped.
+def apply_bulk_coverage(billing_ids, user=None, reference_number='', remarks='PhilHealth Full Coverage', dry_run=False):
+    billing_ids = sorted({int(billing_id) for billing_id in billing_ids})[:BULK_COVERAGE_LIMIT]
+    selected = eligible_billings().filter(pk__in=billing_ids).order_by('pk')
+
+    if dry_run:
+        billings = list(selected.select_related('consultation__appointment__patient', 'consultation__appointment__doctor'))
+        billings = [billing for billing in set_coverage(billings) if billing.coverage > 0]
+        return BulkCoverageResult(billings, len(billings), sum((billing.coverage for billing in billings), 0), False)
+
+    client = get_pka_client()
+    with transaction.atomic():
+        # Rows are locked in pk order so overlapping batches cannot deadlock, and the balance
+        # is read from the locked rows so a payment posted meanwhile is not covered twice
+        billings = list(selected.select_related('consultation__appointment__patient').select_for_update(of=('self',)))
+        claimed = _claimed([billing.pk for billing in billings])
+        billings = [billing for billing in set_coverage(billings) if billing.coverage > 0 and billing.pk not in claimed]
+        if not billings:
+            return BulkCoverageResult([], 0, 0, False)
+        if not client:
+            _post_coverage(billings, user, reference_number=reference_number, remarks=remarks)
+            return BulkCoverageResult(billings, len(billings), sum(billing.coverage for billing in billings), True)
+        claim = _reserve_claim(billings, user, remarks=remarks)
+
+    payments = _submit_and_post(claim)
+    billings = [payment.billing for payment in payments]
+    return BulkCoverageResult(billings, len(billings), sum((payment.amount for payment in payments), 0), True)
@@ -0,0 +1,236 @@
+# (10/19/2026) - PDF statements of account (per Billing) and official receipts (per Transaction)
+#
+# Each document is built from a small dict of the values printed on it. The SHA-256 of that
+# dict names the cached file, so a print only renders when something on the document changed
+# and otherwise is a file read. Billing and payment saves schedule a background render after
+# the commit, so the first print after a payment is usually already on disk.
+#
+# The background render is only a warm-up and lives in this process: renders still queued when
+# the server restarts are dropped, and the next print renders on demand instead. Saves of one
+# billing are coalesced while its render is waiting, and a render only writes documents whose
+# content changed. `render_documents` warms the cache after a deploy or restart.
+# FINANCE_DOCUMENTS_PRERENDER = False turns the warm-up off (the tests do), leaving every
+# document to render on its first print.
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import Billing
+from .pdf import PdfDocument
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so every cached document is rendered again
+DOCUMENT_VERSION = 1
+DOCUMENT_KINDS = ('statement', 'receipt')
+
+# One worker is enough for print volume and keeps renders from competing with requests
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='finance-documents')
+# Billings with a render queued and not yet started
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _person(user):
+    if user is None:
+        return '-'
+    return f'{user.first_name} {user.last_name}'.strip() or user.username
+
+
+def _local(value):
+    return timezone.localtime(value).strftime('%b %d, %Y %H:%M') if value else '-'
+
+
+# (10/19/2026) - Everything printed on a statement of account
+def statement_data(billing):
+    consultation = billing.consultation
+    patient = consultation.appointment.patient
+    doctor = consultation.appointment.doctor
+    return {
+        'billing_id': billing.id,
+        'date': _local(billing.created_at),
+        'patient': f'{patient.first_name} {patient.last_name}',
+        'doctor': f'Dr. {doctor.first_name} {doctor.last_name}',
+        'consultation_date': _local(consultation.date),
+        'diagnosis': consultation.diagnosis,
+        'items': [
+            [item.description, item.quantity, str(item.unit_price), str(item.total_price)]
+            for item in billing.items.order_by('id')
+        ],
+        'total_amount': str(billing.total_amount),
+        'philhealth_coverage': str(billing.philhealth_coverage),
+        'amount_paid': str(billing.amount_paid),
+        'balance': str(billing.get_balance()),
+        'status': billing.get_status_display(),
+        'transactions': [
+            [_local(payment.created_at), payment.get_payment_method_display(), str(payment.amount), payment.reference_number or '-']
+            for payment in billing.transactions.order_by('created_at', 'id')
+        ],
+    }
+
+
+# (10/19/2026) - Everything printed on an official receipt
+def receipt_data(payment):
+    billing = payment.billing
+    patient = billing.consultation.appointment.patient
+    return {
+        'receipt_number': f'OR-{payment.id:08d}',
+        'billing_id': billing.id,
+        'date': _local(payment.created_at),
+        'patient': f'{patient.first_name} {patient.last_name}',
+        'payment_method': payment.get_payment_method_display(),
+        'amount': str(payment.amount),
+        'reference_number': payment.reference_number or '-',
+        'remarks': payment.remarks or '-',
+        'processed_by': _person(payment.processed_by),
+        'total_amount': str(billing.total_amount),
+    }
+
+
+def content_hash(data):
+    raw = json.dumps([DOCUMENT_VERSION, data], sort_keys=True, default=str).encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _header(pdf, title):
+    pdf.heading('PhilHealth eKonsulta', size=16)
+    pdf.text(title, size=12, font='bold')
+    pdf.rule()
+
+
+def render_statement(data):
+    pdf = PdfDocument(f"Statement of Account #{data['billing_id']}")
+    _header(pdf, 'Statement of Account')
+    pdf.text(f"Billing #: {data['billing_id']}    Date: {data['date']}")
+    pdf.text(f"Patient: {data['patient']}")
+    pdf.text(f"Doctor: {data['doctor']}    Consultation: {data['consultation_date']}")
+    pdf.text(f"Diagnosis: {data['diagnosis']}")
+    pdf.space()
+
+    widths = [44, 5, -12, -12]
+    pdf.row(['Item', 'Qty', 'Unit Price', 'Total'], widths, bold=True)
+    for item in data['items']:
+        pdf.row(item, widths)
+    if not data['items']:
+        pdf.row(['No billed items.'], [80])
+    pdf.rule()
+
+    totals = [44 + 5 + 1, -25]
+    pdf.row(['Total Amount', data['total_amount']], totals)
+    pdf.row(['PhilHealth Coverage', '- ' + data['philhealth_coverage']], totals)
+    pdf.row(['Amount Paid', '- ' + data['amount_paid']], totals)
+    pdf.row(['Balance Due (PHP)', data['balance']], totals, bold=True)
+    pdf.text(f"Status: {data['status']}")
+    pdf.space()
+
+    if data['transactions']:
+        pdf.text('Payments', font='bold')
+        widths = [18, 12, -12, 30]
+        pdf.row(['Date', 'Method', 'Amount', 'Reference #'], widths, bold=True)
+        for row in data['transactions']:
+            pdf.row(row, widths)
+    return pdf.to_bytes()
+
+
+def render_receipt(data):
+    pdf = PdfDocument(f"Official Receipt {data['receipt_number']}")
+    _header(pdf, 'Official Receipt')
+    pdf.text(f"Receipt #: {data['receipt_number']}    Date: {data['date']}")
+    pdf.text(f"Billing #: {data['billing_id']}")
+    pdf.text(f"Received from: {data['patient']}")
+    pdf.space()
+
+    widths = [30, -20]
+    pdf.row(['Payment Method', data['payment_method']], widths)
+    pdf.row(['Reference #', data['reference_number']], widths)
+    pdf.row(['Bill Total (PHP)', data['total_amount']], widths)
+    pdf.row(['Amount Received (PHP)', data['amount']], widths, bold=True)
+    pdf.text(f"Remarks: {data['remarks']}")
+    pdf.space(30)
+    pdf.text(f"Processed by: {data['processed_by']}")
+    return pdf.to_bytes()
+
+
+DOCUMENTS = {
+    'statement': (statement_data, render_statement),
+    'receipt': (receipt_data, render_receipt),
+}
+
+
+def documents_dir(kind):
+    return Path(settings.FINANCE_DOCUMENTS_DIR) / kind
+
+
+# (10/19/2026) - Path of the current PDF for a billing/transaction, rendered only on a cache miss
+def get_document(kind, obj):
+    build_data, render = DOCUMENTS[kind]
+    data = build_data(obj)
+    directory = documents_dir(kind)
+    path = directory / f'{obj.pk}-{content_hash(data)}.pdf'
+    if path.exists():
+        return path
+
+    directory.mkdir(parents=True, exist_ok=True)
+    # Write next to the target and rename, so a concurrent print never reads a partial file
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            output.write(render(data))
+        # mkstemp creates the file 0600; use the mode Django gives uploaded media files
+        os.chmod(temp_path, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    # Older versions of the same document are never served again
+    for stale in directory.glob(f'{obj.pk}-*.pdf'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+
+
+def render_billing_documents(billing_id):
+    close_old_connections()
+    try:
+        billing = Billing.objects.select_related('consultation__appointment__patient', 'consultation__appointment__doctor').get(pk=billing_id)
+        get_document('statement', billing)
+        for payment in billing.transactions.select_related('processed_by'):
+            payment.billing = billing
+            get_document('receipt', payment)
+    except Billing.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception('Could not render documents for billing %s', billing_id)
+    finally:
+        close_old_connections()
+
+
+def _render_queued(billing_id):
+    # Taken off the pending set first, so a change committed during the render queues another
+    with _pending_lock:
+        _pending.discard(billing_id)
+    render_billing_documents(billing_id)
+
+
+def _queue_render(billing_id):
+    with _pending_lock:
+        if billing_id in _pending:
+            return
+        _pending.add(billing_id)
+    _executor.submit(_render_queued, billing_id)
+
+
+# (10/19/2026) - Pre-render the statement and receipts in the background once the change commits
+def schedule_billing_documents(billing_id):
+    if not settings.FINANCE_DOCUMENTS_PRERENDER:
+        return
+    transaction.on_commit(lambda: _queue_render(billing_id))
@@ -0,0 +1,212 @@
+# (10/19/2026) - Streaming exports of transactions and billings for auditors
+#
+# Rows are read with iterator(chunk_size=...) (a server-side cursor on PostgreSQL) and written
+# out as they arrive, as CSV or as an XLSX built by a small streaming writer, so memory stays
+# flat and the download starts with the first chunk no matter how many rows there are.
+#
+# Text that a spreadsheet would read as a formula (names, remarks and reference numbers are
+# typed in by users) is written with a leading apostrophe, so opening an export runs nothing.
+
+import csv
+import re
+import zipfile
+from datetime import datetime, date, time
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.db.models import F, Value, DecimalField, ExpressionWrapper
+from django.db.models.functions import Concat
+from django.utils import timezone
+from .models import Billing, Transaction
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'xlsx')
+# First characters that make Excel and LibreOffice treat a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _transactions():
+    return Transaction.objects.annotate(
+        patient_name=Concat(
+            'billing__consultation__appointment__patient__first_name', Value(' '),
+            'billing__consultation__appointment__patient__last_name'
+        ),
+        doctor_name=Concat(
+            'billing__consultation__appointment__doctor__first_name', Value(' '),
+            'billing__consultation__appointment__doctor__last_name'
+        ),
+    ).values_list(
+        'id', 'created_at', 'billing_id', 'patient_name', 'doctor_name', 'payment_method', 'amount',
+        'reference_number', 'remarks', 'processed_by__username'
+    )
+
+
+def _billings():
+    return Billing.objects.annotate(
+        patient_name=Concat(
+            'consultation__appointment__patient__first_name', Value(' '),
+            'consultation__appointment__patient__last_name'
+        ),
+        doctor_name=Concat(
+            'consultation__appointment__doctor__first_name', Value(' '),
+            'consultation__appointment__doctor__last_name'
+        ),
+        balance=ExpressionWrapper(
+            F('total_amount') - F('philhealth_coverage') - F('amount_paid'),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        ),
+    ).values_list(
+        'id', 'created_at', 'patient_name', 'doctor_name', 'status', 'total_amount', 'philhealth_coverage',
+        'amount_paid', 'balance'
+    )
+
+
+# kind -> (queryset factory, header row)
+EXPORTS = {
+    'transactions': (_transactions, [
+        'Transaction ID', 'Date', 'Billing ID', 'Patient', 'Doctor', 'Payment Method', 'Amount',
+        'Reference Number', 'Remarks', 'Processed By',
+    ]),
+    'billings': (_billings, [
+        'Billing ID', 'Date', 'Patient', 'Doctor', 'Status', 'Total Amount', 'PhilHealth Coverage',
+        'Amount Paid', 'Balance',
+    ]),
+}
+
+
+# (10/19/2026) - Rows of one export between two dates (inclusive), header first
+def export_rows(kind, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    queryset_factory, header = EXPORTS[kind]
+    queryset = queryset_factory()
+    if start:
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        queryset = queryset.filter(created_at__lte=timezone.make_aware(datetime.combine(end, time.max)))
+
+    yield header
+    for row in queryset.order_by('id').iterator(chunk_size=chunk_size):
+        yield [timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime) else value
+               for value in row]
+
+
+# (10/19/2026) - Text cells only; numbers (negative amounts included) are written as they are
+def _safe_text(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    # Pseudo-buffer for csv.writer: hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(['' if value is None else _safe_text(value) for value in row])
+
+
+class _ChunkBuffer:
+    # Unseekable file for zipfile; whatever was written is taken out by drain()
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool) or value is None:
+        value = '' if value is None else str(value)
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, date):
+        value = value.isoformat()
+    text = escape(_INVALID_XML_CHARS.sub('', _safe_text(str(value))))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+# (10/19/2026) - Constant-memory XLSX: one sheet of inline strings, zipped as the rows arrive
+def stream_xlsx(rows, sheet_name='Export', rows_per_chunk=500):
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for index, row in enumerate(rows, start=1):
+                sheet.write(('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode('utf-8'))
+                if index % rows_per_chunk == 0:
+                    chunk = buffer.drain()
+                    if chunk:
+                        yield chunk
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+# (10/19/2026) - Byte/str chunks of a whole export in the requested format
+def stream_export(kind, export_format='csv', start=None, end=None):
+    rows = export_rows(kind, start, end)
+    if export_format == 'xlsx':
+        return stream_xlsx(rows, sheet_name=kind.title())
+    return stream_csv(rows)
+
+
+def export_filename(kind, export_format, start=None, end=None):
+    period = '_'.join(value.isoformat() for value in (start, end) if value) or timezone.localdate().isoformat()
+    return f'{kind}_{period}.{export_format}'
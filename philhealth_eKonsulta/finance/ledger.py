@@ -0,0 +1,181 @@
+# (10/19/2026) - Append-only double-entry ledger behind the billing balance columns
+#
+# Every charge, payment, PhilHealth coverage and adjustment is posted as a journal of
+# LedgerEntry rows that sum to zero, in the same transaction as the change to the Billing
+# columns. Entries are never updated or deleted, so any balance at any point in time can be
+# rebuilt from them.
+#
+# `ledger_checkpoints` stores each account's balance at the end of every day that had
+# entries. A balance as of any moment is the latest checkpoint before it plus an indexed
+# scan of the entries posted after that checkpoint. Balances of one billing's receivable are
+# small enough to sum directly from the billing index.
+
+import uuid
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, Exists, OuterRef
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Billing, Transaction, LedgerEntry, LedgerCheckpoint
+
+ZERO = Decimal('0.00')
+# Days that ended less than this ago are left for the next run, so entries from a
+# transaction that commits late are never missed by a checkpoint
+CHECKPOINT_LAG = timedelta(minutes=5)
+BACKFILL_BATCH_SIZE = 1000
+
+# payment method -> (kind, debited account)
+PAYMENT_ACCOUNTS = {
+    'CASH': ('PAYMENT', 'CASH'),
+    'PHILHEALTH': ('COVERAGE', 'PHILHEALTH'),
+}
+
+
+class UnbalancedJournal(ValueError):
+    pass
+
+
+def _journal(kind, debit, credit, amount, billing_id, transaction_id=None, description='', posted_at=None):
+    journal = uuid.uuid4()
+    posted_at = posted_at or timezone.now()
+    return [
+        LedgerEntry(journal=journal, account=account, kind=kind, amount=signed, billing_id=billing_id,
+                    transaction_id=transaction_id, description=description, posted_at=posted_at)
+        for account, signed in ((debit, amount), (credit, -amount))
+    ]
+
+
+# (10/19/2026) - Billing created: the patient owes the billed amount
+def charge_entries(billing, posted_at=None):
+    return _journal('CHARGE', 'RECEIVABLE', 'REVENUE', billing.total_amount, billing.pk,
+                    description=f'Billing #{billing.pk}', posted_at=posted_at)
+
+
+# (10/19/2026) - Cash payment or PhilHealth coverage reducing what the patient owes
+def payment_entries(payment, posted_at=None):
+    kind, account = PAYMENT_ACCOUNTS[payment.payment_method]
+    return _journal(kind, account, 'RECEIVABLE', payment.amount, payment.billing_id, payment.pk,
+                    description=payment.reference_number or '', posted_at=posted_at)
+
+
+# (10/19/2026) - Billing total corrected by amount (negative when lowered)
+def adjustment_entries(billing_id, amount, description=''):
+    return _journal('ADJUSTMENT', 'RECEIVABLE', 'ADJUSTMENT', amount, billing_id, description=description)
+
+
+# (10/19/2026) - Insert journals; each one must balance and zero amounts are not posted
+def post_entries(entries):
+    totals = {}
+    for entry in entries:
+        totals[entry.journal] = totals.get(entry.journal, ZERO) + entry.amount
+    if any(totals.values()):
+        raise UnbalancedJournal('Ledger journal does not balance.')
+    entries = [entry for entry in entries if entry.amount]
+    return LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+def _as_of(when):
+    if when is None:
+        return None
+    if isinstance(when, date) and not isinstance(when, datetime):
+        # A date means the balance at the end of that day
+        return timezone.make_aware(datetime.combine(when + timedelta(days=1), time.min))
+    return when
+
+
+# (10/19/2026) - Balance of an account (or of one billing's receivable) from every entry posted
+# before `when`; a date means the end of that day and None means everything posted so far
+def account_balance(account, when=None, billing_id=None):
+    when = _as_of(when)
+    entries = LedgerEntry.objects.filter(account=account)
+    if billing_id is not None:
+        entries = entries.filter(billing_id=billing_id)
+        if when is not None:
+            entries = entries.filter(posted_at__lt=when)
+        return entries.aggregate(total=Sum('amount'))['total'] or ZERO
+
+    checkpoints = LedgerCheckpoint.objects.filter(account=account)
+    if when is not None:
+        checkpoints = checkpoints.filter(as_of__lte=when)
+    checkpoint = checkpoints.order_by('-as_of').first()
+
+    balance = ZERO
+    if checkpoint:
+        balance = checkpoint.balance
+        entries = entries.filter(posted_at__gte=checkpoint.as_of)
+    if when is not None:
+        entries = entries.filter(posted_at__lt=when)
+    return balance + (entries.aggregate(total=Sum('amount'))['total'] or ZERO)
+
+
+# (10/19/2026) - Checkpoint every account at the end of each day with entries since its last
+# checkpoint, up to the last day that has fully closed. Returns the checkpoints created.
+def create_checkpoints(now=None):
+    now = now or timezone.now()
+    cutoff = timezone.make_aware(datetime.combine(timezone.localtime(now - CHECKPOINT_LAG).date(), time.min))
+
+    created = []
+    with transaction.atomic():
+        for account, _ in LedgerEntry.ACCOUNTS:
+            last = LedgerCheckpoint.objects.filter(account=account).order_by('-as_of').first()
+            entries = LedgerEntry.objects.filter(account=account, posted_at__lt=cutoff)
+            if last:
+                entries = entries.filter(posted_at__gte=last.as_of)
+            days = (
+                entries.annotate(day=TruncDate('posted_at')).values('day')
+                .annotate(total=Sum('amount')).order_by('day')
+            )
+            balance = last.balance if last else ZERO
+            for row in days:
+                balance += row['total']
+                created.append(LedgerCheckpoint(account=account, as_of=_as_of(row['day']), balance=balance))
+        LedgerCheckpoint.objects.bulk_create(created)
+    return created
+
+
+# (10/19/2026) - Post history for billings and payments made before the ledger existed, then
+# drop checkpoints the backdated entries fall behind so the next run recomputes them.
+# Returns (billings posted, payments posted).
+def backfill_ledger(batch_size=BACKFILL_BATCH_SIZE):
+    counts = []
+    earliest = None
+    sources = [
+        (Billing, 'CHARGE', lambda billing: charge_entries(billing, posted_at=billing.created_at)),
+        (Transaction, None, lambda payment: payment_entries(payment, posted_at=payment.created_at)),
+    ]
+    for model, kind, build in sources:
+        posted = LedgerEntry.objects.filter(**{'billing_id' if kind else 'transaction_id': OuterRef('pk')})
+        if kind:
+            posted = posted.filter(kind=kind)
+        missing = model.objects.filter(~Exists(posted)).order_by('pk')
+        count = 0
+        last_pk = 0
+        while True:
+            batch = list(missing.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                post_entries([entry for obj in batch for entry in build(obj)])
+            first = min(obj.created_at for obj in batch)
+            earliest = first if earliest is None else min(earliest, first)
+            count += len(batch)
+            last_pk = batch[-1].pk
+        counts.append(count)
+
+    if earliest is not None:
+        LedgerCheckpoint.objects.filter(as_of__gt=earliest).delete()
+    return tuple(counts)
+
+
+# (10/19/2026) - Billings whose receivable in the ledger differs from the balance columns
+def receivable_mismatches(billing_ids):
+    balances = dict(
+        LedgerEntry.objects.filter(account='RECEIVABLE', billing_id__in=billing_ids)
+        .values('billing_id').annotate(total=Sum('amount')).values_list('billing_id', 'total')
+    )
+    return [
+        (billing, balances.get(billing.pk, ZERO))
+        for billing in Billing.objects.filter(pk__in=billing_ids)
+        if balances.get(billing.pk, ZERO) != billing.get_balance()
+    ]
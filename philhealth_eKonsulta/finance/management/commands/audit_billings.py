@@ -0,0 +1,40 @@
+# (10/19/2026) - Management command to find (and optionally fix) billing totals that drifted from their prescriptions/items
+
+from django.core.management.base import BaseCommand
+from finance.audit import audit_billings, AUDIT_CHUNK_SIZE, REPAIR_SOURCES
+
+
+class Command(BaseCommand):
+    help = 'Compare Billing.total_amount with the prescription and billing item sums, optionally repairing mismatches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Set drifted totals to the recomputed sum')
+        parser.add_argument('--source', choices=REPAIR_SOURCES, default='prescriptions', help='Sum a repaired total is set to')
+        parser.add_argument('--chunk-size', type=int, default=AUDIT_CHUNK_SIZE, help='Billings per query')
+        parser.add_argument('--show', type=int, default=50, help='Mismatches listed in the output (the rest are only counted)')
+
+    def handle(self, *args, **options):
+        scanned = 0
+        mismatches = 0
+        unrepaired = 0
+        shown = 0
+        for count, drifts, skipped in audit_billings(options['chunk_size'], options['repair'], options['source']):
+            scanned += count
+            mismatches += len(drifts)
+            unrepaired += len(skipped)
+            for drift, note in [(drift, '') for drift in drifts] + [(drift, ' - not repaired') for drift in skipped]:
+                shown += 1
+                if shown <= options['show']:
+                    self.stdout.write(self.style.WARNING(
+                        f'Billing #{drift.billing_id}: stored {drift.total_amount}, '
+                        f'prescriptions {drift.prescription_total}, items {drift.item_total} '
+                        f'(medicines {drift.medicine_total}){note}'
+                    ))
+            self.stdout.write(f'Scanned {scanned} billings...')
+
+        action = 'repaired' if options['repair'] else 'found'
+        self.stdout.write(self.style.SUCCESS(f'Done! {mismatches} mismatched billing(s) {action} out of {scanned}.'))
+        if unrepaired:
+            self.stdout.write(self.style.WARNING(
+                f'{unrepaired} billing(s) could not be repaired from items, run with --source prescriptions.'
+            ))
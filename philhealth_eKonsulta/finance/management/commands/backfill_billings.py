@@ -0,0 +1,16 @@
+# (10/19/2026) - Management command to create billings for completed consultations that have none
+
+from django.core.management.base import BaseCommand
+from finance.billing import backfill_billings, unbilled_consultations, BACKFILL_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Create Billing and BillingItem rows for completed consultations that were never billed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Consultations billed per transaction')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING(f'Found {unbilled_consultations().count()} unbilled consultations...'))
+        created = backfill_billings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Done! Created {created} billings.'))
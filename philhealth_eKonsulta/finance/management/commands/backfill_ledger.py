@@ -0,0 +1,34 @@
+# (10/19/2026) - Management command to post billings and payments made before the ledger existed
+
+from django.core.management.base import BaseCommand
+from finance.ledger import backfill_ledger, receivable_mismatches, BACKFILL_BATCH_SIZE
+from finance.models import Billing
+
+
+class Command(BaseCommand):
+    help = 'Post ledger entries for billings and payments that have none, then optionally compare balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Rows posted per transaction')
+        parser.add_argument('--verify', action='store_true', help='Report billings whose ledger receivable differs from their balance')
+
+    def handle(self, *args, **options):
+        billings, payments = backfill_ledger(options['batch_size'])
+        self.stdout.write(f'Posted {billings} billing(s) and {payments} payment(s)')
+
+        if options['verify']:
+            mismatches = 0
+            last_pk = 0
+            while True:
+                ids = list(Billing.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                for billing, receivable in receivable_mismatches(ids):
+                    mismatches += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'Billing #{billing.pk}: balance {billing.get_balance()}, ledger receivable {receivable}'
+                    ))
+                last_pk = ids[-1]
+            self.stdout.write(f'{mismatches} mismatch(es) found')
+
+        self.stdout.write(self.style.SUCCESS('Done! Ledger backfilled'))
@@ -0,0 +1,30 @@
+# (10/19/2026) - Management command to export transactions or billings to a CSV/XLSX file
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from finance.exports import EXPORTS, EXPORT_FORMATS, stream_export, export_filename
+
+
+class Command(BaseCommand):
+    help = 'Export transactions or billings for a date range, streamed to a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--start', help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--output', help='Output file, defaults to <kind>_<period>.<format>')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_date(options['start']) if options['start'] else None
+            end = parse_date(options['end']) if options['end'] else None
+        except ValueError as error:
+            raise CommandError(error)
+
+        output = options['output'] or export_filename(options['kind'], options['format'], start, end)
+        with open(output, 'wb') as handle:
+            for chunk in stream_export(options['kind'], options['format'], start, end):
+                handle.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Done! Exported {options["kind"]} to {output}'))
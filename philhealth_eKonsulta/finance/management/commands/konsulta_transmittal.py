@@ -0,0 +1,89 @@
+# (10/19/2026) - Management command to write (and optionally submit) the monthly Konsulta transmittal XML
+
+import calendar
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from finance.coverage import transmittal_number
+from finance.models import ClaimTransmittal
+from finance.pka import get_pka_client, PKAError, PKAUncertainError
+from finance.transmittal import TransmittalReport
+
+
+class Command(BaseCommand):
+    help = 'Stream one month of completed consultations into a Konsulta transmittal XML file, validating each record'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Report month (YYYY-MM), defaults to last month')
+        parser.add_argument('--output', help='Output file, defaults to <transmittal number>.xml')
+        parser.add_argument('--submit', action='store_true', help='Submit the report through PKA submitReport')
+        parser.add_argument('--show', type=int, default=20, help='Invalid records listed in the output')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                year, month = map(int, options['month'].split('-'))
+                start = date(year, month, 1)
+            except ValueError:
+                raise CommandError('Use --month YYYY-MM.')
+        else:
+            start = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+        end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+        client = get_pka_client() if options['submit'] else None
+        if options['submit'] and client is None:
+            raise CommandError('Set PKA_BASE_URL to submit reports.')
+
+        hospital_code = settings.PKA_HOSPITAL_CODE
+        transmittal = None
+        if client:
+            # The row numbers the transmittal and is committed before the report is sent
+            transmittal = ClaimTransmittal.objects.create()
+            transmittal_id = transmittal_number(hospital_code, transmittal, month=start)
+        else:
+            transmittal_id = f'R{hospital_code[-9:]:0>9}{start:%Y%m}00000'
+
+        output = options['output'] or f'{transmittal_id}.xml'
+        report = TransmittalReport(start, end, hospital_code, transmittal_id)
+        with open(output, 'wb') as handle:
+            report.write(handle)
+
+        for issue in report.errors[:options['show']]:
+            self.stdout.write(self.style.WARNING(f"{issue.element} #{issue.record_id}: {'; '.join(issue.messages)}"))
+        written = ', '.join(f'{count} {element}' for element, count in report.written.items())
+        self.stdout.write(f'Wrote {written} to {output}; {report.error_count} invalid record(s) left out.')
+        if report.error_count:
+            # Includes the consultations and medicines of the patients left out
+            skipped = ', '.join(f'{count} {element}' for element, count in report.skipped.items() if count)
+            self.stdout.write(self.style.WARNING(f'Left out: {skipped}.'))
+
+        if transmittal is None:
+            self.stdout.write(self.style.SUCCESS(f'Done! Transmittal {transmittal_id} for {start:%B %Y}.'))
+            return
+        if not report.is_valid:
+            transmittal.delete()
+            raise CommandError('Fix the invalid records before submitting; nothing was sent.')
+        transmittal.transmittal_id = transmittal_id
+        transmittal.billing_count = report.billing_count
+        transmittal.total = report.coverage_total
+        transmittal.save()
+        try:
+            with open(output, encoding='utf-8') as handle:
+                transaction_number = client.submit_report(transmittal_id, handle.read(), report_tagging='1')
+        except PKAUncertainError as error:
+            # May have been received; kept as SUBMITTING for reconcile_claims
+            transmittal.error = str(error)
+            transmittal.save(update_fields=['error'])
+            raise CommandError(f'No answer from PhilHealth for {transmittal_id}; check it with reconcile_claims before sending it again.')
+        except PKAError as error:
+            transmittal.status = 'FAILED'
+            transmittal.error = str(error)
+            transmittal.save(update_fields=['status', 'error'])
+            raise CommandError(f'PhilHealth did not accept the report: {error}')
+
+        # A report pays nothing itself, so there is no coverage left to post
+        transmittal.transaction_number = transaction_number
+        transmittal.status = 'COMPLETED'
+        transmittal.save(update_fields=['transaction_number', 'status'])
+        self.stdout.write(self.style.SUCCESS(f'Done! Transmittal {transmittal_id} submitted, PhilHealth transaction {transaction_number}.'))
@@ -0,0 +1,12 @@
+# (10/19/2026) - Management command to checkpoint ledger account balances at the end of each closed day
+
+from django.core.management.base import BaseCommand
+from finance.ledger import create_checkpoints
+
+
+class Command(BaseCommand):
+    help = 'Store the balance of every ledger account at the end of each closed day (run from cron, e.g. nightly)'
+
+    def handle(self, *args, **options):
+        created = create_checkpoints()
+        self.stdout.write(self.style.SUCCESS(f'Done! {len(created)} checkpoint(s) created'))
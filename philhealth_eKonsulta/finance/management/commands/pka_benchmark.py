@@ -0,0 +1,53 @@
+# (10/19/2026) - Management command to benchmark the PKA client against the mock PhilHealth API
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from finance.pka import PKAClient, PKAError
+from finance.pka_mock import MockPKAServer
+
+
+class Command(BaseCommand):
+    help = 'Send isMemberRegistered calls through the pooled PKA client to a local mock server and report throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent callers')
+        parser.add_argument('--connections', type=int, default=4, help='Client pool size (calls in flight)')
+        parser.add_argument('--latency', type=float, default=0.005, help='Mock server seconds per answer')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of calls the mock answers with 503')
+
+    def handle(self, *args, **options):
+        with MockPKAServer(registered_pins={'000000000001'}, latency=options['latency'], fail_rate=options['fail_rate']) as server:
+            client = PKAClient(server.url, max_connections=options['connections'])
+            latencies = []
+            errors = 0
+
+            def call(n):
+                started = time.perf_counter()
+                client.is_member_registered(f'{n % 2:012d}')
+                return time.perf_counter() - started
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                futures = [executor.submit(call, n) for n in range(options['calls'])]
+                for future in futures:
+                    try:
+                        latencies.append(future.result())
+                    except PKAError:
+                        errors += 1
+            elapsed = time.perf_counter() - started
+            client.close()
+
+        latencies.sort()
+        if latencies:
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            self.stdout.write(f'Latency p50 {p50:.1f} ms, p99 {p99:.1f} ms')
+        self.stdout.write(
+            f"Connections opened {server.stats['connections']}, tokens issued {server.stats['getToken']}, "
+            f"503s retried {server.stats['failures']}, calls failed {errors}"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Done! {options['calls']} calls in {elapsed:.2f}s ({options['calls'] / elapsed:.0f} calls/s)."
+        ))
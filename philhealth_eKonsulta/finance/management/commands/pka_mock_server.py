@@ -0,0 +1,35 @@
+# (10/19/2026) - Management command to run the mock PhilHealth Konsulta API locally
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from finance.pka_mock import MockPKAServer
+
+
+class Command(BaseCommand):
+    help = 'Serve a local mock of the PhilHealth Konsulta API; point PKA_BASE_URL at it to work offline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--pin', action='append', default=[], help='PhilHealth PIN reported as registered (repeatable)')
+        parser.add_argument('--token-lifetime', type=int, default=3600, help='Seconds before an issued token expires')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every answer')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of calls answered with 503 (0-1)')
+
+    def handle(self, *args, **options):
+        server = MockPKAServer(
+            port=options['port'],
+            username=settings.PKA_USERNAME,
+            password=settings.PKA_PASSWORD,
+            registered_pins=options['pin'],
+            token_lifetime=options['token_lifetime'],
+            latency=options['latency'],
+            fail_rate=options['fail_rate'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Mock PKA serving on {server.url} (Ctrl+C to stop)'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        self.stdout.write(self.style.SUCCESS(f'Done! Calls served: {dict(server.stats)}'))
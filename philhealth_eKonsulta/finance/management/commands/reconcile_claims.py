@@ -0,0 +1,53 @@
+# (10/19/2026) - Management command to settle PhilHealth claims left SUBMITTING or ACCEPTED
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from finance.coverage import post_claim
+from finance.models import ClaimTransmittal
+
+
+class Command(BaseCommand):
+    help = 'Post accepted PhilHealth claims and list the claims still waiting for an answer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accepted', metavar='TRANSMITTAL_ID', help='PhilHealth has this claim: record its number and post it')
+        parser.add_argument('--transaction-number', help="PhilHealth's transaction number, with --accepted")
+        parser.add_argument('--rejected', metavar='TRANSMITTAL_ID', help='PhilHealth never received this claim: release its billings')
+        parser.add_argument('--minutes', type=int, default=10, help='List unanswered claims older than this')
+
+    def pending(self, transmittal_id):
+        try:
+            return ClaimTransmittal.objects.get(transmittal_id=transmittal_id, status='SUBMITTING')
+        except ClaimTransmittal.DoesNotExist:
+            raise CommandError(f'No unanswered claim {transmittal_id}.')
+
+    def handle(self, *args, **options):
+        # Answers checked by hand against PhilHealth's records
+        if options['accepted']:
+            if not options['transaction_number']:
+                raise CommandError('Give the PhilHealth --transaction-number of the accepted claim.')
+            transmittal = self.pending(options['accepted'])
+            transmittal.transaction_number = options['transaction_number']
+            transmittal.status = 'ACCEPTED'
+            transmittal.save(update_fields=['transaction_number', 'status'])
+        if options['rejected']:
+            transmittal = self.pending(options['rejected'])
+            transmittal.status = 'FAILED'
+            transmittal.save(update_fields=['status'])
+            self.stdout.write(f'Claim {transmittal.transmittal_id} released.')
+
+        accepted = list(ClaimTransmittal.objects.filter(status='ACCEPTED').order_by('pk').values_list('pk', flat=True))
+        posted = 0
+        for transmittal_id in accepted:
+            posted += len(post_claim(transmittal_id))
+
+        waiting = ClaimTransmittal.objects.filter(
+            status='SUBMITTING', created_at__lt=timezone.now() - timedelta(minutes=options['minutes'])
+        ).order_by('created_at')
+        for transmittal in waiting:
+            self.stdout.write(self.style.WARNING(
+                f'{transmittal.transmittal_id}: {transmittal.billing_count} billing(s), ₱{transmittal.total}, '
+                f'sent {timezone.localtime(transmittal.created_at):%Y-%m-%d %H:%M}; check with PhilHealth, then use --accepted or --rejected'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Done! {len(accepted)} accepted claim(s) posted, {posted} payment(s).'))
@@ -0,0 +1,22 @@
+# (10/19/2026) - Management command to fold new transactions and billing items into the daily rollups
+
+from django.core.management.base import BaseCommand
+from finance.rollups import refresh_rollups, rebuild_rollups, ROLLUP_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Incrementally refresh the daily revenue rollups (run from cron, e.g. every 15 minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Delete the rollups and rebuild them from scratch')
+        parser.add_argument('--batch-size', type=int, default=ROLLUP_BATCH_SIZE, help='Source rows per transaction')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write(self.style.WARNING('Rebuilding rollups from scratch...'))
+            processed = rebuild_rollups(options['batch_size'])
+        else:
+            processed = refresh_rollups(options['batch_size'])
+
+        summary = ', '.join(f'{name}: {count}' for name, count in processed.items())
+        self.stdout.write(self.style.SUCCESS(f'Done! Rows processed - {summary}'))
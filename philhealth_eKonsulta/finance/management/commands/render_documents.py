@@ -0,0 +1,23 @@
+# (10/19/2026) - Management command to warm the PDF statement and receipt cache, e.g. after a restart
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from finance.documents import render_billing_documents
+from finance.models import Billing
+
+
+class Command(BaseCommand):
+    help = 'Render the cached statements and receipts of recently changed billings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=1, help='Billings updated in the last N days')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        # Read up front: each render closes the database connection when it is done
+        billing_ids = list(Billing.objects.filter(updated_at__gte=since).order_by('pk').values_list('pk', flat=True))
+        for billing_id in billing_ids:
+            # Documents whose content did not change are only checked, not rendered again
+            render_billing_documents(billing_id)
+        self.stdout.write(self.style.SUCCESS(f'Done! Documents checked for {len(billing_ids)} billing(s).'))
@@ -0,0 +1,68 @@
+# (10/19/2026) - Finance dashboard metrics, one aggregate per table, cached until billing data changes
+
+from datetime import datetime, time
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum, F, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from doctor.metrics import metrics_cache_key
+from .models import Billing, Transaction
+
+FINANCE_METRICS_KEY = 'finance_metrics'
+FINANCE_METRICS_TIMEOUT = 60 * 10
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _money_sum(expression, condition=None):
+    return Coalesce(Sum(expression, filter=condition), Value(Decimal('0.00')), output_field=MONEY)
+
+
+# (10/19/2026) - Billing counts by status, collections and outstanding balances for today, this month and all time
+def get_finance_metrics():
+    today = timezone.localdate()
+
+    metrics = cache.get(FINANCE_METRICS_KEY)
+    if metrics is not None and metrics['day'] == today:
+        return metrics
+
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
+    month_start = timezone.make_aware(datetime.combine(today.replace(day=1), time.min))
+    periods = {'today': day_start, 'month': month_start, 'all': None}
+
+    balance = F('total_amount') - F('philhealth_coverage') - F('amount_paid')
+    billing_aggregates = {
+        'total_billings': Count('id'),
+        'pending_count': Count('id', filter=Q(status='PENDING')),
+        'partial_count': Count('id', filter=Q(status='PARTIAL')),
+        'paid_count': Count('id', filter=Q(status='PAID')),
+        'philhealth_count': Count('id', filter=Q(status='PHILHEALTH')),
+    }
+    transaction_aggregates = {}
+    for period, start in periods.items():
+        billed = Q(created_at__gte=start) if start else Q()
+        billing_aggregates[f'billed_{period}'] = _money_sum('total_amount', billed)
+        billing_aggregates[f'outstanding_{period}'] = _money_sum(balance, billed & Q(status__in=['PENDING', 'PARTIAL']))
+        transaction_aggregates[f'cash_{period}'] = _money_sum('amount', billed & Q(payment_method='CASH'))
+        transaction_aggregates[f'philhealth_{period}'] = _money_sum('amount', billed & Q(payment_method='PHILHEALTH'))
+
+    # Transactions are summed on their own so the join never multiplies billing rows
+    metrics = Billing.objects.aggregate(**billing_aggregates)
+    metrics.update(Transaction.objects.aggregate(**transaction_aggregates))
+    metrics['day'] = today
+    cache.set(FINANCE_METRICS_KEY, metrics, FINANCE_METRICS_TIMEOUT)
+    return metrics
+
+
+def invalidate_finance_metrics():
+    cache.delete(FINANCE_METRICS_KEY)
+
+
+# (10/19/2026) - For billing writes made with queryset .update()/bulk_create(), which send no
+# signals: drop the finance numbers and the dashboards of the doctors whose billings changed
+def invalidate_billing_metrics(billing_ids):
+    doctor_ids = Billing.objects.filter(pk__in=billing_ids).values_list(
+        'consultation__appointment__doctor_id', flat=True
+    ).distinct()
+    cache.delete_many([FINANCE_METRICS_KEY] + [metrics_cache_key(doctor_id) for doctor_id in doctor_ids])
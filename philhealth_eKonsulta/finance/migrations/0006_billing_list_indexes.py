@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0015_pharmacy_stock'),
+        ('finance', '0005_alter_billing_id_alter_billingitem_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['-created_at', '-id'], name='billing_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='billing_status_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_revenue_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(choices=[('RECEIVABLE', 'Patient Receivable'), ('CASH', 'Cash'), ('PHILHEALTH', 'PhilHealth Receivable'), ('REVENUE', 'Revenue'), ('ADJUSTMENT', 'Billing Adjustments')], max_length=20)),
+                ('as_of', models.DateTimeField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'as_of'), name='unique_ledger_checkpoint')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('journal', models.UUIDField()),
+                ('account', models.CharField(choices=[('RECEIVABLE', 'Patient Receivable'), ('CASH', 'Cash'), ('PHILHEALTH', 'PhilHealth Receivable'), ('REVENUE', 'Revenue'), ('ADJUSTMENT', 'Billing Adjustments')], max_length=20)),
+                ('kind', models.CharField(choices=[('CHARGE', 'Charge'), ('PAYMENT', 'Payment'), ('COVERAGE', 'PhilHealth Coverage'), ('ADJUSTMENT', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('posted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('billing', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ledger_entries', to='finance.billing')),
+                ('transaction', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ledger_entries', to='finance.transaction')),
+            ],
+            options={
+                'verbose_name_plural': 'ledger entries',
+                'indexes': [models.Index(fields=['account', 'posted_at'], name='ledger_account_posted_idx'), models.Index(fields=['billing', 'account', 'posted_at'], name='ledger_billing_posted_idx'), models.Index(fields=['journal'], name='ledger_journal_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawerSession',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('CLOSED', 'Closed')], default='OPEN', max_length=10)),
+                ('opening_float', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('opened_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('cash_collected', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('expected_cash', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('counted_cash', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('variance', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('snapshot', models.JSONField(blank=True, default=dict)),
+                ('notes', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-opened_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['processed_by', 'created_at'], name='transaction_cashier_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='drawersession',
+            name='cashier',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='drawer_sessions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='drawersession',
+            name='closed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='drawersession',
+            index=models.Index(fields=['opened_at'], name='drawer_session_opened_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='drawersession',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'OPEN')), fields=('cashier',), name='one_open_drawer_per_cashier'),
+        ),
+    ]
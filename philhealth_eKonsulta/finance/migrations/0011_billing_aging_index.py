@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0015_pharmacy_stock'),
+        ('finance', '0010_cash_reconciliation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'PARTIAL'])), fields=['created_at'], include=('total_amount', 'philhealth_coverage', 'amount_paid', 'consultation'), name='billing_open_aging_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0015_pharmacy_stock'),
+        ('finance', '0011_billing_aging_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billingitem',
+            name='prescription',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='billing_items', to='doctor.prescription'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0015_pharmacy_stock'),
+        ('finance', '0012_billingitem_prescription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageRule',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('MEDICINE', 'Covered Medicine'), ('CONSULTATION', 'Consultation Fee'), ('ANNUAL_CAP', 'Annual Cap per Member')], default='MEDICINE', max_length=20)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_quantity', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('notes', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('medicine', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='package_rules', to='doctor.medicine')),
+            ],
+            options={
+                'ordering': ['kind', 'medicine__name'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True), ('kind', 'MEDICINE')), fields=('medicine',), name='one_active_rule_per_medicine'), models.UniqueConstraint(condition=models.Q(('is_active', True), ('kind__in', ['CONSULTATION', 'ANNUAL_CAP'])), fields=('kind',), name='one_active_package_limit')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0014_claim_transmittals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claimtransmittal',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='claimtransmittal',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='claimtransmittal',
+            name='remarks',
+            field=models.TextField(blank=True),
+        ),
+        # Transmittals saved so far were only kept once accepted and posted
+        migrations.AddField(
+            model_name='claimtransmittal',
+            name='status',
+            field=models.CharField(choices=[('SUBMITTING', 'Submitting'), ('ACCEPTED', 'Accepted'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='COMPLETED', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='claimtransmittal',
+            name='status',
+            field=models.CharField(choices=[('SUBMITTING', 'Submitting'), ('ACCEPTED', 'Accepted'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='SUBMITTING', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ClaimLine',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('billing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claim_lines', to='finance.billing')),
+                ('transmittal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='finance.claimtransmittal')),
+            ],
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
 from django.conf import settings
-from doctor.models import Consultation
+from doctor.models import Consultation, Prescription
+from login.models import DoctorProfile
 from decimal import Decimal
+from django.utils import timezone
+from django.core.exceptions import ValidationError
 
 
 # (Old Code) - Original Payment model
@@ -50,6 +53,19 @@ class Billing(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # (10/19/2026) - Billing list order and keyset pagination, with and without a status filter
+            models.Index(fields=['-created_at', '-id'], name='billing_recent_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='billing_status_recent_idx'),
+            # (10/19/2026) - AR aging only reads open billings; the amounts ride along for index-only scans
+            models.Index(
+                fields=['created_at'], name='billing_open_aging_idx',
+                include=['total_amount', 'philhealth_coverage', 'amount_paid', 'consultation'],
+                condition=models.Q(status__in=['PENDING', 'PARTIAL']),
+            ),
+        ]
+
     def __str__(self):
         return f"Billing for {self.consultation.appointment.patient} - {self.status}"
 
@@ -79,6 +95,10 @@ class BillingItem(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
+    # (10/19/2026) - Prescription this item bills, so prescription edits update the item in place
+    prescription = models.ForeignKey(
+        Prescription, on_delete=models.SET_NULL, null=True, blank=True, related_name="billing_items"
+    )
 
     def __str__(self):
         return f"{self.description} - ₱{self.total_price}"
@@ -103,9 +123,268 @@ class Transaction(models.Model):
     remarks = models.TextField(blank=True, null=True)
     processed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # (10/19/2026) - Key sent with each payment form submission, a repeated submit is not posted twice
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     def __str__(self):
         return f"Transaction ₱{self.amount} for {self.billing.consultation.appointment.patient}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # (10/19/2026) - Cash drawer reconciliation sums one cashier's payments over a time window
+            models.Index(fields=['processed_by', 'created_at'], name='transaction_cashier_time_idx'),
+        ]
+
+
+# (10/19/2026) - Daily collections per payment method and doctor, maintained by `refresh_rollups`
+class DailyRevenueRollup(models.Model):
+    day = models.DateField()
+    payment_method = models.CharField(max_length=20, choices=Transaction.PAYMENT_METHOD)
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name="revenue_rollups")
+    transaction_count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'payment_method', 'doctor'], name='unique_daily_revenue_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.payment_method} {self.doctor} - ₱{self.amount}"
+
+
+# (10/19/2026) - Daily billed amounts per item type and doctor, maintained by `refresh_rollups`
+class DailyBillingRollup(models.Model):
+    day = models.DateField()
+    item_type = models.CharField(max_length=20, choices=BillingItem.ITEM_TYPE)
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name="billing_rollups")
+    item_count = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'item_type', 'doctor'], name='unique_daily_billing_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.item_type} {self.doctor} - ₱{self.amount}"
+
+
+# (10/19/2026) - Highest source row id already folded into the rollups, one row per source
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} up to #{self.last_id}"
+
+
+# (10/19/2026) - Ledger rows are never changed or deleted, corrections are new entries
+class LedgerEntryQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise TypeError('Ledger entries are append-only.')
+
+    def delete(self):
+        raise TypeError('Ledger entries are append-only.')
+
+
+# (10/19/2026) - One side of a double-entry posting; the entries of a journal sum to zero.
+# Amounts are signed: debits are positive, credits negative.
+class LedgerEntry(models.Model):
+    ACCOUNTS = [
+        ('RECEIVABLE', 'Patient Receivable'),
+        ('CASH', 'Cash'),
+        ('PHILHEALTH', 'PhilHealth Receivable'),
+        ('REVENUE', 'Revenue'),
+        ('ADJUSTMENT', 'Billing Adjustments'),
+    ]
+    KINDS = [
+        ('CHARGE', 'Charge'),
+        ('PAYMENT', 'Payment'),
+        ('COVERAGE', 'PhilHealth Coverage'),
+        ('ADJUSTMENT', 'Adjustment'),
+    ]
+
+    journal = models.UUIDField()
+    account = models.CharField(max_length=20, choices=ACCOUNTS)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # No database constraint: the history stays even if the billing or payment is deleted
+    billing = models.ForeignKey(
+        Billing, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="ledger_entries"
+    )
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="ledger_entries"
+    )
+    description = models.CharField(max_length=255, blank=True)
+    posted_at = models.DateTimeField(default=timezone.now)
+
+    objects = LedgerEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'ledger entries'
+        indexes = [
+            # Balance tail scans after a checkpoint, per account and per billing receivable
+            models.Index(fields=['account', 'posted_at'], name='ledger_account_posted_idx'),
+            models.Index(fields=['billing', 'account', 'posted_at'], name='ledger_billing_posted_idx'),
+            models.Index(fields=['journal'], name='ledger_journal_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.posted_at:%Y-%m-%d} {self.account} {self.amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError('Ledger entries are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('Ledger entries are append-only.')
+
+
+# (10/19/2026) - Balance of an account from every entry posted before as_of, written by `ledger_checkpoints`
+class LedgerCheckpoint(models.Model):
+    account = models.CharField(max_length=20, choices=LedgerEntry.ACCOUNTS)
+    as_of = models.DateTimeField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'as_of'], name='unique_ledger_checkpoint'),
+        ]
+
+    def __str__(self):
+        return f"{self.account} as of {self.as_of:%Y-%m-%d %H:%M} - {self.balance}"
+
+
+# (10/19/2026) - A cashier's drawer from opening float to end-of-day count. Closing freezes the
+# expected cash, count and variance on the row, so closed sessions are never recomputed.
+class DrawerSession(models.Model):
+    SESSION_STATUS = [
+        ('OPEN', 'Open'),
+        ('CLOSED', 'Closed'),
+    ]
+
+    cashier = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="drawer_sessions")
+    status = models.CharField(max_length=10, choices=SESSION_STATUS, default='OPEN')
+    opening_float = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    opened_at = models.DateTimeField(default=timezone.now)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    # Frozen when the session is closed
+    cash_collected = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    expected_cash = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    counted_cash = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    variance = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # Per payment method totals at closing: {"CASH": {"count": 3, "amount": "150.00"}, ...}
+    snapshot = models.JSONField(default=dict, blank=True)
+    notes = models.TextField(blank=True)
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    class Meta:
+        ordering = ['-opened_at']
+        constraints = [
+            models.UniqueConstraint(fields=['cashier'], condition=models.Q(status='OPEN'), name='one_open_drawer_per_cashier'),
+        ]
+        indexes = [
+            models.Index(fields=['opened_at'], name='drawer_session_opened_idx'),
+        ]
+
+    def __str__(self):
+        return f"Drawer of {self.cashier} opened {self.opened_at:%Y-%m-%d %H:%M} - {self.status}"
+
+
+# (10/19/2026) - PhilHealth Konsulta package rules, compiled into the pricing engine (finance/pricing.py).
+# MEDICINE rules list a covered medicine, optionally limited to max_quantity units per bill and
+# to amount per unit. The CONSULTATION rule covers consultation fee items up to amount per bill,
+# and the ANNUAL_CAP rule limits the coverage of one member (patient) per calendar year to amount.
+class PackageRule(models.Model):
+    RULE_KINDS = [
+        ('MEDICINE', 'Covered Medicine'),
+        ('CONSULTATION', 'Consultation Fee'),
+        ('ANNUAL_CAP', 'Annual Cap per Member'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=RULE_KINDS, default='MEDICINE')
+    medicine = models.ForeignKey(
+        'doctor.Medicine', on_delete=models.CASCADE, null=True, blank=True, related_name="package_rules"
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_quantity = models.PositiveIntegerField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    notes = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['kind', 'medicine__name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['medicine'], condition=models.Q(kind='MEDICINE', is_active=True),
+                name='one_active_rule_per_medicine',
+            ),
+            models.UniqueConstraint(
+                fields=['kind'], condition=models.Q(kind__in=['CONSULTATION', 'ANNUAL_CAP'], is_active=True),
+                name='one_active_package_limit',
+            ),
+        ]
+
+    def clean(self):
+        if self.kind == 'MEDICINE' and not self.medicine_id:
+            raise ValidationError({'medicine': 'Select the covered medicine.'})
+        if self.kind != 'MEDICINE' and self.amount is None:
+            raise ValidationError({'amount': 'Enter the amount for this rule.'})
+
+    def __str__(self):
+        if self.kind == 'MEDICINE':
+            return f"{self.get_kind_display()}: {self.medicine.name}"
+        return f"{self.get_kind_display()}: ₱{self.amount}"
+
+
+# (10/19/2026) - One PhilHealth coverage claim submitted through PKA submitReport. The pk numbers
+# the transmittal within the month; transaction_number is PhilHealth's reference for the claim
+# and becomes the reference_number of the coverage transactions it paid.
+#
+# The row is committed as SUBMITTING before the report is sent, so a claim PhilHealth may have
+# received is never lost; its lines keep the billings out of other claims until it settles.
+class ClaimTransmittal(models.Model):
+    STATUS_CHOICES = [
+        ('SUBMITTING', 'Submitting'),  # Sent, or about to be sent; no answer recorded yet
+        ('ACCEPTED', 'Accepted'),  # PhilHealth's transaction number recorded, coverage not posted yet
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),  # Rejected or never sent; the billings can be claimed again
+    ]
+    # Claims that may still pay their billings
+    PENDING_STATUSES = ('SUBMITTING', 'ACCEPTED')
+
+    transmittal_id = models.CharField(max_length=30, unique=True, null=True, blank=True)
+    transaction_number = models.CharField(max_length=100, blank=True)
+    billing_count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    submitted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SUBMITTING')
+    # Payment form key of a single-billing claim, so a repeated submit is not claimed twice
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    remarks = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.transmittal_id} - {self.transaction_number or 'not accepted'}"
+
+
+# (10/19/2026) - Amount claimed for one billing in a transmittal
+class ClaimLine(models.Model):
+    transmittal = models.ForeignKey(ClaimTransmittal, on_delete=models.CASCADE, related_name='lines')
+    billing = models.ForeignKey(Billing, on_delete=models.CASCADE, related_name='claim_lines')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.transmittal} - Billing #{self.billing_id}: ₱{self.amount}"
@@ -0,0 +1,95 @@
+# (10/19/2026) - Payment posting for billings
+#
+# The billing row is locked with select_for_update before the balance is checked, so two
+# cashiers (or a double-clicked submit) are applied one after the other against the real
+# balance. Totals are moved with F() updates and every submission carries an idempotency key
+# that is stored on its Transaction; a repeated key returns the transaction already posted.
+
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+from .models import Billing, Transaction
+from .metrics import invalidate_billing_metrics
+from .ledger import payment_entries, post_entries
+
+CENT = Decimal('0.01')
+
+
+class PaymentError(Exception):
+    pass
+
+
+# (10/19/2026) - Parse a submitted amount into a positive two-decimal Decimal
+def parse_payment_amount(value):
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise PaymentError('Enter a valid amount.')
+    if not amount.is_finite() or amount <= 0:
+        raise PaymentError('The amount must be greater than zero.')
+    if amount != amount.quantize(CENT):
+        raise PaymentError('The amount cannot have more than two decimal places.')
+    return amount
+
+
+# (10/19/2026) - Post a payment against a billing. Returns (transaction, created); created is
+# False when the idempotency key was already used and nothing new was posted.
+def post_payment(billing_id, amount, payment_method='CASH', user=None, idempotency_key=None,
+                 reference_number='', remarks='', full_coverage=False):
+    if payment_method not in dict(Transaction.PAYMENT_METHOD):
+        raise PaymentError('Unknown payment method.')
+    idempotency_key = idempotency_key or None
+
+    try:
+        with transaction.atomic():
+            billing = Billing.objects.select_for_update().get(pk=billing_id)
+
+            if idempotency_key:
+                existing = Transaction.objects.filter(idempotency_key=idempotency_key).first()
+                if existing:
+                    return existing, False
+
+            balance = billing.get_balance()
+            if balance <= 0:
+                raise PaymentError('This billing has no remaining balance.')
+            if full_coverage:
+                amount = balance
+            amount = parse_payment_amount(amount)
+            if amount > balance:
+                raise PaymentError(f'The amount exceeds the remaining balance of ₱{balance}.')
+
+            payment = Transaction.objects.create(
+                billing=billing,
+                amount=amount,
+                payment_method=payment_method,
+                reference_number=reference_number,
+                remarks=remarks,
+                processed_by=user,
+                idempotency_key=idempotency_key,
+            )
+            post_entries(payment_entries(payment))
+
+            # (10/19/2026) - Same status rules as before, decided on the locked balance
+            if full_coverage:
+                status = 'PHILHEALTH'
+            elif amount == balance:
+                status = 'PAID'
+            else:
+                status = 'PARTIAL'
+            paid_field = 'philhealth_coverage' if payment_method == 'PHILHEALTH' else 'amount_paid'
+            Billing.objects.filter(pk=billing.pk).update(
+                **{paid_field: F(paid_field) + amount},
+                status=status,
+                updated_at=timezone.now(),
+            )
+            # update() sends no post_save, so clear the dashboard cache once this commits
+            transaction.on_commit(partial(invalidate_billing_metrics, [billing.pk]))
+            return payment, True
+    except IntegrityError:
+        # Same key posted by a request that committed between our lookup and insert
+        existing = Transaction.objects.filter(idempotency_key=idempotency_key).first() if idempotency_key else None
+        if existing is None:
+            raise
+        return existing, False
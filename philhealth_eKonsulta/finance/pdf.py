@@ -0,0 +1,100 @@
+# (10/19/2026) - Minimal PDF writer for receipts and statements
+#
+# Only what the finance documents need: text in the standard Helvetica and Courier fonts,
+# horizontal rules and automatic page breaks on US Letter pages. Courier is monospaced, so
+# table rows are laid out as padded strings and line up without measuring glyph widths.
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 54
+FONTS = {'regular': 'F1', 'bold': 'F2', 'mono': 'F3', 'mono-bold': 'F4'}
+
+
+def _escape(text):
+    # Standard fonts use WinAnsi, characters outside Latin-1 are replaced
+    text = str(text).replace('₱', 'PHP ')
+    text = text.encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+class PdfDocument:
+    def __init__(self, title=''):
+        self.title = title
+        self.pages = [[]]
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def _ensure_space(self, height):
+        if self.y - height < MARGIN:
+            self.pages.append([])
+            self.y = PAGE_HEIGHT - MARGIN
+
+    def text(self, text, size=10, font='regular', x=MARGIN, leading=1.4):
+        self._ensure_space(size * leading)
+        self.y -= size * leading
+        self.pages[-1].append(f'BT /{FONTS[font]} {size} Tf {x} {self.y:.2f} Td ({_escape(text)}) Tj ET')
+
+    def heading(self, text, size=14):
+        self.text(text, size=size, font='bold')
+
+    # (10/19/2026) - Monospaced row; widths are in characters, negative means right-aligned
+    def row(self, columns, widths, size=9, bold=False):
+        cells = []
+        for value, width in zip(columns, widths):
+            value = str(value)[:abs(width)]
+            cells.append(value.rjust(-width) if width < 0 else value.ljust(width))
+        self.text(' '.join(cells), size=size, font='mono-bold' if bold else 'mono')
+
+    def rule(self, gap=6):
+        self._ensure_space(gap * 2)
+        self.y -= gap
+        self.pages[-1].append(f'0.5 w {MARGIN} {self.y:.2f} m {PAGE_WIDTH - MARGIN} {self.y:.2f} l S')
+        self.y -= gap
+
+    def space(self, height=10):
+        self.y -= height
+
+    def to_bytes(self):
+        objects = []
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        catalog = add(None)
+        pages = add(None)
+        fonts = {
+            'F1': add('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'),
+            'F2': add('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>'),
+            'F3': add('<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>'),
+            'F4': add('<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>'),
+        }
+        font_resources = ' '.join(f'/{name} {number} 0 R' for name, number in fonts.items())
+
+        page_numbers = []
+        for operations in self.pages:
+            stream = '\n'.join(operations).encode('latin-1')
+            content = add(f'<< /Length {len(stream)} >>\nstream\n'.encode('latin-1') + stream + b'\nendstream')
+            page_numbers.append(add(
+                f'<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+                f'/Resources << /Font << {font_resources} >> >> /Contents {content} 0 R >>'
+            ))
+        objects[catalog - 1] = f'<< /Type /Catalog /Pages {pages} 0 R >>'
+        kids = ' '.join(f'{number} 0 R' for number in page_numbers)
+        objects[pages - 1] = f'<< /Type /Pages /Kids [{kids}] /Count {len(page_numbers)} >>'
+        info = add(f'<< /Title ({_escape(self.title)}) /Producer (PhilHealth eKonsulta) >>')
+
+        output = bytearray(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            body = body.encode('latin-1') if isinstance(body, str) else body
+            output += f'{number} 0 obj\n'.encode('latin-1') + body + b'\nendobj\n'
+        xref = len(output)
+        output += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+        for offset in offsets:
+            output += f'{offset:010d} 00000 n \n'.encode('latin-1')
+        output += (
+            f'trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R /Info {info} 0 R >>\n'
+            f'startxref\n{xref}\n%%EOF\n'
+        ).encode('latin-1')
+        return bytes(output)
@@ -0,0 +1,279 @@
+# (10/19/2026) - PhilHealth Konsulta API (PKA) client
+#
+# One client per process (get_pka_client) shares a small pool of keep-alive HTTP connections,
+# so calls after the first skip the TCP/TLS handshake. A semaphore caps the calls in flight to
+# the pool size; callers wait up to PKA_TIMEOUT for a free connection before giving up. The
+# getToken (GTM) token is cached until shortly before it expires and refreshed by one thread
+# while the others wait. Connection errors, timeouts and 429/5xx answers are retried with
+# full-jitter exponential backoff; calls that create something on the PhilHealth side
+# (submitReport) go out on a fresh connection, are only retried when the connection could not
+# be made, and raise PKAUncertainError whenever the request was written but no clear answer
+# came back (lost connection, unreadable body, or a 502/504 from a gateway that may have
+# forwarded it).
+#
+# Only the standard library is used (http.client), the project has no HTTP client dependency.
+# The payloads follow the Phase 4 PKA notes; report encryption is left to the PKA gateway
+# configuration and is not done here.
+
+import http.client
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Refresh the token this many seconds before PhilHealth says it expires
+TOKEN_REFRESH_MARGIN = 300
+# Backoff between retries: random between 0 and min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt)
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 5.0
+RETRY_STATUSES = {429, 502, 503, 504}
+# Gateway answers that do not say whether the request was passed on
+UNCERTAIN_STATUSES = {502, 504}
+
+
+class PKAError(Exception):
+    pass
+
+
+class PKAAuthenticationError(PKAError):
+    pass
+
+
+# (10/19/2026) - A non-idempotent call reached PhilHealth but no answer came back, so whether it
+# was acted on is unknown until it is checked against PhilHealth's records
+class PKAUncertainError(PKAError):
+    pass
+
+
+# The request failed before the server could have acted on it, so it is always safe to retry
+class _NotSent(Exception):
+    pass
+
+
+class _ConnectionPool:
+    def __init__(self, base_url, size, timeout):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+
+    # fresh skips the idle connections, which the server may have closed without notice;
+    # timeout overrides the pool timeout for this call
+    def acquire(self, fresh=False, timeout=None):
+        timeout = timeout or self.timeout
+        if not self.slots.acquire(timeout=timeout):
+            raise PKAError('Too many PhilHealth calls in progress, try again shortly.')
+        connection = None
+        if not fresh:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                pass
+        if connection is None:
+            self.opened += 1
+            connection = self.connection_class(self.host, self.port, timeout=timeout)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    # A connection that failed mid-request is closed instead of going back to the pool
+    def release(self, connection, reusable=True):
+        if reusable:
+            self.idle.put(connection)
+        else:
+            connection.close()
+        self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PKAClient:
+    def __init__(self, base_url, username='', password='', certification_id='', hospital_code='',
+                 timeout=30, max_connections=4, max_retries=3):
+        self.credentials = {
+            'pUserName': username,
+            'pUserPassword': password,
+            'pSoftwareCertificationId': certification_id,
+            'pHospitalCode': hospital_code,
+        }
+        self.hospital_code = hospital_code
+        self.max_retries = max_retries
+        self.pool = _ConnectionPool(base_url, max_connections, timeout)
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+
+    # (10/19/2026) - One HTTP exchange on a pooled connection. Returns (status, parsed JSON body).
+    # A request that is not idempotent gets a new connection, so a failure after request()
+    # always means it may have been received.
+    def _send(self, endpoint, payload, token=None, idempotent=True, timeout=None):
+        body = json.dumps(payload).encode()
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if token:
+            headers['Token'] = token
+        connection = self.pool.acquire(fresh=not idempotent, timeout=timeout)
+        reused = connection.sock is not None
+        reusable = False
+        try:
+            try:
+                connection.request('POST', f'{self.pool.path}/{endpoint}', body=body, headers=headers)
+            except (OSError, http.client.HTTPException) as error:
+                raise _NotSent(error)
+            response = connection.getresponse()
+            data = response.read()
+            reusable = not response.will_close
+        except http.client.RemoteDisconnected as error:
+            # A kept-alive connection the server closed while it sat idle in the pool
+            if reused:
+                raise _NotSent(error)
+            raise
+        finally:
+            self.pool.release(connection, reusable)
+        try:
+            return response.status, json.loads(data or b'{}')
+        except ValueError:
+            error_class = PKAError if idempotent else PKAUncertainError
+            raise error_class(f'PhilHealth returned an unreadable response to {endpoint}.')
+
+    # (10/19/2026) - Send with retries. Without idempotent, only requests that were never sent are retried.
+    # A call with its own timeout is made for someone waiting on it and is not retried.
+    def _call(self, endpoint, payload, token=None, idempotent=True, timeout=None):
+        retries = 0 if timeout else self.max_retries
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            try:
+                status, data = self._send(endpoint, payload, token, idempotent, timeout)
+            except _NotSent as error:
+                if last:
+                    raise PKAError(f'PhilHealth could not be reached: {error.args[0]}')
+            except (OSError, http.client.HTTPException) as error:
+                if not idempotent:
+                    raise PKAUncertainError(f'PhilHealth did not answer {endpoint}: {error}')
+                if last:
+                    raise PKAError(f'PhilHealth call {endpoint} failed: {error}')
+            else:
+                if not idempotent and status in UNCERTAIN_STATUSES:
+                    raise PKAUncertainError(f"PhilHealth did not answer {endpoint}: gateway error {status}")
+                if status not in RETRY_STATUSES or last or not idempotent:
+                    return status, data
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            logger.warning('PKA %s failed, retry %s in %.2fs', endpoint, attempt + 1, delay)
+            time.sleep(delay)
+
+    # (10/19/2026) - getToken (GTM); the cached token is returned until it is about to expire
+    def get_token(self, force_refresh=False, timeout=None):
+        token = self._token
+        if token and not force_refresh and time.monotonic() < self._token_expires:
+            return token
+        if not self._token_lock.acquire(timeout=timeout or -1):
+            raise PKAError('PhilHealth token is being refreshed, try again shortly.')
+        try:
+            # Another thread may have refreshed it while this one waited for the lock
+            if self._token and self._token is not token and time.monotonic() < self._token_expires:
+                return self._token
+            status, data = self._call('getToken', self.credentials, timeout=timeout)
+            if status != 200 or not data.get('accessToken'):
+                raise PKAAuthenticationError(f"PhilHealth token request failed: {data.get('message', status)}")
+            expires_in = int(data.get('expiresIn', 3600))
+            self._token_expires = time.monotonic() + max(expires_in - TOKEN_REFRESH_MARGIN, expires_in / 2)
+            self._token = data['accessToken']
+            return self._token
+        finally:
+            self._token_lock.release()
+
+    # (10/19/2026) - Authenticated call; a token PhilHealth no longer accepts is refreshed once
+    def _authorized(self, endpoint, payload, idempotent=True, timeout=None):
+        token = self.get_token(timeout=timeout)
+        status, data = self._call(endpoint, payload, token, idempotent, timeout)
+        if status == 401:
+            status, data = self._call(endpoint, payload, self.get_token(force_refresh=True, timeout=timeout), idempotent, timeout)
+        if status != 200:
+            raise PKAError(f"PhilHealth call {endpoint} failed: {data.get('message', status)}")
+        if data.get('error'):
+            raise PKAError(data['error'])
+        return data
+
+    # (10/19/2026) - isMemberRegistered (MDRC): member_type is MM (member) or DD (dependent).
+    # With timeout, each step waits at most that long and nothing is retried.
+    def is_member_registered(self, pin, member_type='MM', effectivity_year=None, timeout=None):
+        return self._authorized('isMemberRegistered', {
+            'pPIN': pin,
+            'pMemberType': member_type,
+            'pEffectivityYear': str(effectivity_year or timezone.localdate().year),
+        }, timeout=timeout)
+
+    # (10/19/2026) - isATCValid (ATCV); walk-in patients have no ATC to check
+    def is_atc_valid(self, pin, atc, effectivity_date):
+        if (atc or '').upper() == 'WALKEDIN':
+            return True
+        data = self._authorized('isATCValid', {
+            'pPIN': pin,
+            'pATC': atc,
+            'pEffectivityDate': effectivity_date.strftime('%m/%d/%Y'),
+        })
+        return bool(data.get('valid'))
+
+    # (10/19/2026) - submitReport (SKR); returns PhilHealth's transaction number. Not retried once
+    # sent, a duplicate submission would be a second claim.
+    def submit_report(self, transmittal_id, report, report_tagging='1'):
+        data = self._authorized('submitReport', {
+            'pTransmittalId': transmittal_id,
+            'pReport': report,
+            'pReportTagging': report_tagging,
+        }, idempotent=False)
+        if not data.get('transactionNumber'):
+            raise PKAError(f"PhilHealth did not accept the report: {data.get('message', 'no transaction number')}")
+        return data['transactionNumber']
+
+    def close(self):
+        self.pool.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# (10/19/2026) - Process-wide client built from the PKA_* settings, None while PKA_BASE_URL is unset
+def get_pka_client():
+    global _client
+    if not settings.PKA_BASE_URL:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PKAClient(
+                    settings.PKA_BASE_URL,
+                    username=settings.PKA_USERNAME,
+                    password=settings.PKA_PASSWORD,
+                    certification_id=settings.PKA_CERTIFICATION_ID,
+                    hospital_code=settings.PKA_HOSPITAL_CODE,
+                    timeout=settings.PKA_TIMEOUT,
+                    max_connections=settings.PKA_MAX_CONNECTIONS,
+                    max_retries=settings.PKA_MAX_RETRIES,
+                )
+    return _client
+
+
+def reset_pka_client():
+    global _client
+    if _client is not None:
+        _client.close()
+    _client = None
@@ -0,0 +1,144 @@
+# (10/19/2026) - Local stand-in for the PhilHealth Konsulta API, for offline testing and benchmarks
+#
+# Serves getToken, isMemberRegistered, isATCValid, validateReport and submitReport over
+# HTTP/1.1 keep-alive on a background thread. Tokens expire after token_lifetime seconds,
+# every answer can be delayed by latency seconds, and fail_rate answers a share of the calls
+# with fail_status (503 by default) so the client's retries can be exercised. Counters on the server (connections,
+# tokens issued, calls per endpoint) let tests and `pka_benchmark` check the pooling and caching.
+#
+#     with MockPKAServer(registered_pins={'123456789012'}) as server:
+#         client = PKAClient(server.url)
+
+import json
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this Nagle holds the body for the delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        endpoint = self.path.rstrip('/').rsplit('/', 1)[-1]
+        server.count(endpoint)
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail_rate and random.random() < server.fail_rate:
+            server.count('failures')
+            return self._reply(server.fail_status, {'message': 'Service temporarily unavailable'})
+
+        if endpoint == 'getToken':
+            if payload.get('pUserName') != server.username or payload.get('pUserPassword') != server.password:
+                return self._reply(200, {'message': 'Invalid username or password'})
+            token = secrets.token_hex(16)
+            with server.lock:
+                server.tokens[token] = time.monotonic() + server.token_lifetime
+            return self._reply(200, {'accessToken': token, 'expiresIn': server.token_lifetime})
+
+        handler = getattr(self, f'_{endpoint}', None)
+        if handler is None:
+            return self._reply(404, {'message': f'Unknown method {endpoint}'})
+        with server.lock:
+            expires = server.tokens.get(self.headers.get('Token'))
+        if expires is None or expires < time.monotonic():
+            return self._reply(401, {'message': 'Invalid or expired token'})
+        return self._reply(200, handler(payload))
+
+    def _isMemberRegistered(self, payload):
+        pin = payload.get('pPIN', '')
+        return {
+            'pin': pin,
+            'registered': pin in self.server.registered_pins,
+            'effectivityYear': payload.get('pEffectivityYear'),
+        }
+
+    def _isATCValid(self, payload):
+        return {'valid': bool(payload.get('pATC')) and payload.get('pPIN') in self.server.registered_pins}
+
+    def _validateReport(self, payload):
+        return {'success': bool(payload.get('pReport')), 'report': payload.get('pReport', '')}
+
+    def _submitReport(self, payload):
+        if not payload.get('pReport') or not payload.get('pTransmittalId'):
+            return {'message': 'Missing transmittal ID or report'}
+        with self.server.lock:
+            self.server.reports.append(payload)
+            number = len(self.server.reports)
+        return {'transactionNumber': f'PKA{time.strftime("%Y%m%d")}{number:06d}'}
+
+
+class MockPKAServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, username='', password='', registered_pins=(),
+                 token_lifetime=3600, latency=0.0, fail_rate=0.0, fail_status=503):
+        super().__init__((host, port), _Handler)
+        self.username = username
+        self.password = password
+        self.registered_pins = set(registered_pins)
+        self.token_lifetime = token_lifetime
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.reports = []
+        self.stats = Counter()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/api'
+
+    # A client that timed out has hung up before the slow answer is written; that is expected here
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    # Drop every issued token, as if PhilHealth had revoked them
+    def expire_tokens(self):
+        with self.lock:
+            self.tokens.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
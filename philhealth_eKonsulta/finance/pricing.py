@@ -0,0 +1,199 @@
+# (10/19/2026) - PhilHealth Konsulta package pricing
+#
+# The active PackageRule rows are compiled once per process into a PackagePricer: covered
+# medicines become a dict keyed by medicine id (and by name, for items billed before they were
+# linked to a prescription), the consultation fee and the annual cap become plain Decimals.
+# Pricing a bill is then only dictionary lookups over its items. Batches are priced with a
+# fixed number of queries: the items of every billing in one query, and the coverage each
+# member already used in the year in grouped queries (coverage posted, plus amounts held by
+# claims still waiting on PhilHealth). The annual cap is applied in billing order, so two bills
+# of the same member in one batch cannot both use the same allowance.
+#
+# Saving a rule or a medicine resets the pricer of the process that saved it; every other
+# process (gunicorn worker) recompiles once its copy is PACKAGE_RULES_TTL seconds old.
+
+import threading
+import time
+from collections import namedtuple, defaultdict
+from decimal import Decimal
+from django.db.models import Sum
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+from .models import Billing, BillingItem, PackageRule, ClaimLine, ClaimTransmittal
+
+ZERO = Decimal('0.00')
+# Longest time another process keeps pricing with rules that were changed
+PACKAGE_RULES_TTL = 60
+
+# covered is the package amount for the bill after the annual cap, to_apply is what is left
+# to claim once coverage already on the bill and its balance are taken into account
+PricedBilling = namedtuple('PricedBilling', ['billing_id', 'lines', 'package_total', 'covered', 'to_apply', 'cap_remaining'])
+PricedLine = namedtuple('PricedLine', ['item_id', 'description', 'billed', 'covered', 'rule'])
+
+# (item_id, item_type, medicine_id, description, quantity, unit_price, total_price)
+ITEM_FIELDS = ('id', 'item_type', 'prescription__medicine_id', 'description', 'quantity', 'unit_price', 'total_price')
+
+
+def _name_key(name):
+    return ' '.join((name or '').lower().split())
+
+
+class PackagePricer:
+    def __init__(self, rules):
+        # medicine id -> (max_quantity or None, max unit price or None)
+        self.medicines = {}
+        # normalized medicine name -> medicine id
+        self.medicine_names = {}
+        self.consultation_fee = None
+        self.annual_cap = None
+        for kind, medicine_id, medicine_name, amount, max_quantity in rules:
+            if kind == 'MEDICINE':
+                self.medicines[medicine_id] = (max_quantity, amount)
+                self.medicine_names[_name_key(medicine_name)] = medicine_id
+            elif kind == 'CONSULTATION':
+                self.consultation_fee = amount
+            elif kind == 'ANNUAL_CAP':
+                self.annual_cap = amount
+
+    # True when bills are priced item by item; with only an annual cap the whole bill is covered
+    @property
+    def prices_items(self):
+        return bool(self.medicines) or self.consultation_fee is not None
+
+    # (10/19/2026) - False when no rules are configured; callers then keep full coverage
+    def __bool__(self):
+        return self.prices_items or self.annual_cap is not None
+
+    def _price_item(self, item_type, medicine_id, description, quantity, unit_price, total_price, fee_left):
+        if item_type == 'MEDICINE':
+            rule = self.medicines.get(medicine_id)
+            if rule is None and medicine_id is None:
+                rule = self.medicines.get(self.medicine_names.get(_name_key(description)))
+            if rule is None:
+                return ZERO, 'Not in the package'
+            max_quantity, max_unit_price = rule
+            if max_quantity is not None:
+                quantity = min(quantity, max_quantity)
+            if max_unit_price is not None:
+                unit_price = min(unit_price, max_unit_price)
+            return min(unit_price * quantity, total_price), 'Covered medicine'
+        if item_type == 'CONSULTATION' and fee_left is not None:
+            return min(total_price, fee_left), 'Consultation fee'
+        return ZERO, 'Not in the package'
+
+    # (10/19/2026) - Package lines and total for one bill's items, before the annual cap
+    def price_items(self, items):
+        lines = []
+        total = ZERO
+        fee_left = self.consultation_fee
+        for item_id, item_type, medicine_id, description, quantity, unit_price, total_price in items:
+            covered, rule = self._price_item(item_type, medicine_id, description, quantity, unit_price, total_price, fee_left)
+            if rule == 'Consultation fee':
+                fee_left -= covered
+            lines.append(PricedLine(item_id, description, total_price, covered, rule))
+            total += covered
+        return lines, total
+
+    # (10/19/2026) - Price one bill. used is the member's coverage in the bill's year, including
+    # the coverage already on this bill.
+    def price(self, billing_id, items, balance, existing_coverage=ZERO, used=ZERO):
+        if self.prices_items:
+            lines, package_total = self.price_items(items)
+        else:
+            lines, package_total = [], existing_coverage + balance
+        covered = package_total
+        cap_remaining = None
+        if self.annual_cap is not None:
+            # Coverage already on this bill counts towards this bill, not against it
+            cap_remaining = max(self.annual_cap - (used - existing_coverage), ZERO)
+            covered = min(covered, cap_remaining)
+            cap_remaining -= covered
+        to_apply = max(min(covered - existing_coverage, balance), ZERO)
+        return PricedBilling(billing_id, lines, package_total, covered, to_apply, cap_remaining)
+
+
+_pricer = None
+_pricer_expires = 0.0
+# Bumped by every reset, so a compile that started before a reset is not kept
+_generation = 0
+_pricer_lock = threading.Lock()
+
+
+# (10/19/2026) - Process-wide pricer, compiled from the active rules on first use and again
+# once it is PACKAGE_RULES_TTL seconds old
+def get_package_pricer():
+    global _pricer, _pricer_expires
+    pricer = _pricer
+    if pricer is not None and time.monotonic() < _pricer_expires:
+        return pricer
+    with _pricer_lock:
+        if _pricer is not None and _pricer is not pricer and time.monotonic() < _pricer_expires:
+            return _pricer
+        generation = _generation
+        compiled = PackagePricer(PackageRule.objects.filter(is_active=True).values_list(
+            'kind', 'medicine_id', 'medicine__name', 'amount', 'max_quantity'
+        ))
+        if generation == _generation:
+            _pricer = compiled
+            _pricer_expires = time.monotonic() + PACKAGE_RULES_TTL
+    return compiled
+
+
+# (10/19/2026) - Called from the PackageRule/Medicine signals; the next bill priced recompiles
+def reset_package_pricer():
+    global _pricer, _generation
+    _generation += 1
+    _pricer = None
+
+
+# (10/19/2026) - Price a batch of billings for a claim. Returns {billing_id: PricedBilling}.
+# Billings are priced in (created_at, id) order so the annual cap is used up oldest bill first.
+def price_billings(billings):
+    pricer = get_package_pricer()
+    billings = sorted(billings, key=lambda billing: (billing.created_at, billing.pk))
+    if not billings:
+        return {}
+    billing_ids = [billing.pk for billing in billings]
+
+    members = dict(Billing.objects.filter(pk__in=billing_ids).values_list('pk', 'consultation__appointment__patient_id'))
+    items = defaultdict(list)
+    for billing_id, *item in BillingItem.objects.filter(billing_id__in=billing_ids).order_by('id').values_list('billing_id', *ITEM_FIELDS):
+        items[billing_id].append(item)
+
+    used = defaultdict(lambda: ZERO)
+    if pricer.annual_cap is not None:
+        years = {timezone.localtime(billing.created_at).year for billing in billings}
+        coverage = Billing.objects.filter(
+            consultation__appointment__patient_id__in=set(members.values()),
+            created_at__year__in=years,
+        ).values('consultation__appointment__patient_id', year=ExtractYear('created_at')).annotate(
+            total=Sum('philhealth_coverage')
+        )
+        for row in coverage:
+            used[(row['consultation__appointment__patient_id'], row['year'])] = row['total']
+        # Sent or accepted but not posted yet: not in philhealth_coverage, but already claimed
+        pending = ClaimLine.objects.filter(
+            transmittal__status__in=ClaimTransmittal.PENDING_STATUSES,
+            billing__consultation__appointment__patient_id__in=set(members.values()),
+            billing__created_at__year__in=years,
+        ).values('billing__consultation__appointment__patient_id', year=ExtractYear('billing__created_at')).annotate(
+            total=Sum('amount')
+        )
+        for row in pending:
+            used[(row['billing__consultation__appointment__patient_id'], row['year'])] += row['total']
+
+    results = {}
+    for billing in billings:
+        key = (members.get(billing.pk), timezone.localtime(billing.created_at).year)
+        priced = pricer.price(
+            billing.pk, items[billing.pk], billing.get_balance(),
+            existing_coverage=billing.philhealth_coverage, used=used[key],
+        )
+        # Later bills of the same member see this bill's claim as used
+        used[key] += priced.to_apply
+        results[billing.pk] = priced
+    return results
+
+
+def price_billing(billing):
+    return price_billings([billing])[billing.pk]
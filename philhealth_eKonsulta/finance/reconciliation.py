@@ -0,0 +1,132 @@
+# (10/19/2026) - End-of-day cash reconciliation per cashier drawer session
+#
+# A cashier opens a drawer session with an opening float and closes it with the counted
+# cash. The cash collected is summed from the Transaction rows they processed during the
+# session with one grouped query on the (processed_by, created_at) index. Closing writes the
+# expected cash, count, variance and per-method totals onto the session, so a closed day is
+# read back as stored and never recomputed from transactions.
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+from django.contrib.auth import get_user_model
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+from .models import Transaction, DrawerSession
+
+ZERO = Decimal('0.00')
+
+
+class ReconciliationError(Exception):
+    pass
+
+
+def parse_cash_amount(value):
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ReconciliationError('Enter a valid amount.')
+    if not amount.is_finite() or amount < 0 or amount != amount.quantize(Decimal('0.01')):
+        raise ReconciliationError('Enter an amount of zero or more with at most two decimal places.')
+    return amount
+
+
+# (10/19/2026) - {cashier id: {payment method: {'count': n, 'amount': Decimal}}} for payments in [start, end)
+def collected_by_cashier(start, end, cashier_id=None):
+    payments = Transaction.objects.filter(created_at__gte=start, created_at__lt=end)
+    if cashier_id is not None:
+        payments = payments.filter(processed_by_id=cashier_id)
+    groups = (
+        payments.values('processed_by_id', 'payment_method')
+        .annotate(count=Count('id'), amount=Sum('amount'))
+        .order_by()
+    )
+    totals = {}
+    for group in groups:
+        totals.setdefault(group['processed_by_id'], {})[group['payment_method']] = {
+            'count': group['count'],
+            'amount': group['amount'],
+        }
+    return totals
+
+
+def open_session(cashier, opening_float=ZERO):
+    opening_float = parse_cash_amount(opening_float)
+    try:
+        with transaction.atomic():
+            return DrawerSession.objects.create(cashier=cashier, opening_float=opening_float)
+    except IntegrityError:
+        raise ReconciliationError('You already have an open cash drawer.')
+
+
+# (10/19/2026) - Count the drawer and freeze the session's figures
+def close_session(session_id, counted_cash, user=None, notes=''):
+    counted_cash = parse_cash_amount(counted_cash)
+    with transaction.atomic():
+        session = DrawerSession.objects.select_for_update().get(pk=session_id)
+        if session.status == 'CLOSED':
+            raise ReconciliationError('This cash drawer is already closed.')
+
+        now = timezone.now()
+        totals = collected_by_cashier(session.opened_at, now, session.cashier_id).get(session.cashier_id, {})
+        cash = totals.get('CASH', {}).get('amount') or ZERO
+
+        session.status = 'CLOSED'
+        session.closed_at = now
+        session.closed_by = user
+        session.cash_collected = cash
+        session.expected_cash = session.opening_float + cash
+        session.counted_cash = counted_cash
+        session.variance = counted_cash - session.expected_cash
+        session.snapshot = {
+            method: {'count': values['count'], 'amount': str(values['amount'])}
+            for method, values in totals.items()
+        }
+        session.notes = notes
+        session.save()
+    return session
+
+
+# (10/19/2026) - One row per cashier for a day: payments from one grouped query, closed sessions
+# as frozen, and each open session's expected cash from the cash taken since it opened, which may
+# be before this day
+def day_reconciliation(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = start + timedelta(days=1)
+    totals = collected_by_cashier(start, end)
+    sessions = (
+        DrawerSession.objects.filter(opened_at__lt=end)
+        .filter(Q(closed_at__gte=start) | Q(closed_at__isnull=True))
+        .select_related('cashier')
+        .order_by('opened_at')
+    )
+
+    rows = {}
+    for session in sessions:
+        row = rows.setdefault(session.cashier_id, {'cashier': session.cashier, 'sessions': []})
+        row['sessions'].append(session)
+    # Cashiers who took payments without opening a drawer
+    missing = [cashier_id for cashier_id in totals if cashier_id not in rows]
+    users = get_user_model().objects.in_bulk([cashier_id for cashier_id in missing if cashier_id is not None])
+    for cashier_id in missing:
+        rows[cashier_id] = {'cashier': users.get(cashier_id), 'sessions': []}
+
+    for cashier_id, row in rows.items():
+        methods = totals.get(cashier_id, {})
+        row['cash'] = methods.get('CASH', {}).get('amount') or ZERO
+        row['philhealth'] = methods.get('PHILHEALTH', {}).get('amount') or ZERO
+        row['count'] = sum(values['count'] for values in methods.values())
+        # (Old Code) - The day's cash less the closed sessions opened that day, which was wrong
+        # for sessions that span midnight
+        # unaccounted = row['cash'] - sum(
+        #     (session.cash_collected for session in row['sessions'] if session.status == 'CLOSED' and session.opened_at >= start),
+        #     ZERO
+        # )
+        for session in row['sessions']:
+            if session.status == 'OPEN':
+                collected = collected_by_cashier(session.opened_at, timezone.now(), cashier_id).get(cashier_id, {})
+                session.live_expected_cash = session.opening_float + (collected.get('CASH', {}).get('amount') or ZERO)
+        row['variance'] = sum((session.variance for session in row['sessions'] if session.status == 'CLOSED'), ZERO)
+        row['unreconciled'] = any(session.status == 'OPEN' for session in row['sessions']) or not row['sessions']
+
+    return sorted(rows.values(), key=lambda row: row['cashier'].username if row['cashier'] else '')
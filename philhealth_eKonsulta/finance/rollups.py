@@ -0,0 +1,147 @@
+# (10/19/2026) - Daily revenue rollups, refreshed incrementally by `manage.py refresh_rollups`
+#
+# Each source (transactions, billing items) has a RollupWatermark holding the highest row id
+# already counted. A refresh locks the watermark, groups the rows after it by day/doctor/type,
+# adds the sums onto the rollup rows with F() and moves the watermark, all in one transaction,
+# so an interrupted or overlapping run can never count a row twice.
+#
+# Rows newer than ROLLUP_LAG are left for the next run so a transaction that commits late with
+# a lower id is not skipped. Billing items changed or deleted in place (prescription edits,
+# audit_billings repairs) are taken back out of the rollups with adjust_billing_rollups in the
+# same transaction; other edits and deletes of old rows need `refresh_rollups --rebuild`.
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Sum, F
+from django.db.models.functions import TruncDate, TruncMonth, TruncYear
+from django.utils import timezone
+from .models import Billing, Transaction, BillingItem, DailyRevenueRollup, DailyBillingRollup, RollupWatermark
+
+ROLLUP_LAG = timedelta(minutes=5)
+ROLLUP_BATCH_SIZE = 5000
+DOCTOR_PATH = 'billing__consultation__appointment__doctor'
+
+# name -> (source model, rollup model, type field, {rollup field: aggregate})
+ROLLUP_SOURCES = {
+    'transactions': (Transaction, DailyRevenueRollup, 'payment_method', {
+        'transaction_count': Count('id'),
+        'amount': Sum('amount'),
+    }),
+    'billing_items': (BillingItem, DailyBillingRollup, 'item_type', {
+        'item_count': Count('id'),
+        'quantity': Sum('quantity'),
+        'amount': Sum('total_price'),
+    }),
+}
+
+
+def _add_to_rollup(rollup_model, key, values):
+    lookup = rollup_model.objects.filter(**key)
+    if not lookup.update(**{field: F(field) + value for field, value in values.items()}):
+        rollup_model.objects.create(**key, **values)
+
+
+# (10/19/2026) - Fold one batch of new source rows into the rollups, returns the rows processed
+def _refresh_batch(name, batch_size):
+    source, rollup_model, type_field, aggregates = ROLLUP_SOURCES[name]
+
+    with transaction.atomic():
+        RollupWatermark.objects.get_or_create(name=name)
+        watermark = RollupWatermark.objects.select_for_update().get(name=name)
+
+        ids = list(
+            source.objects.filter(id__gt=watermark.last_id, created_at__lt=timezone.now() - ROLLUP_LAG)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        groups = (
+            source.objects.filter(id__gt=watermark.last_id, id__lte=ids[-1])
+            .annotate(day=TruncDate('created_at'), doctor_ref=F(f'{DOCTOR_PATH}_id'))
+            .values('day', 'doctor_ref', type_field)
+            .annotate(**aggregates)
+            .order_by()
+        )
+        for group in groups:
+            key = {'day': group['day'], 'doctor_id': group['doctor_ref'], type_field: group[type_field]}
+            _add_to_rollup(rollup_model, key, {field: group[field] for field in aggregates})
+
+        watermark.last_id = ids[-1]
+        watermark.save()
+        return len(ids)
+
+
+# (10/19/2026) - Move billing items changed in place within the caller's transaction: removed
+# are the items as they were (changed or deleted), added the same items as they are now. Only
+# items at or below the watermark were counted; the watermark row is locked, so a refresh
+# running meanwhile waits and then counts newer items as they are after this change.
+def adjust_billing_rollups(removed=(), added=()):
+    items = [(item, -1) for item in removed] + [(item, 1) for item in added]
+    if not items:
+        return
+    RollupWatermark.objects.get_or_create(name='billing_items')
+    watermark = RollupWatermark.objects.select_for_update().get(name='billing_items')
+    items = [(item, sign) for item, sign in items if item.pk and item.pk <= watermark.last_id]
+    if not items:
+        return
+    doctors = dict(Billing.objects.filter(pk__in={item.billing_id for item, _ in items}).values_list(
+        'pk', 'consultation__appointment__doctor_id'
+    ))
+    deltas = defaultdict(lambda: {'item_count': 0, 'quantity': 0, 'amount': Decimal('0.00')})
+    for item, sign in items:
+        delta = deltas[(timezone.localdate(item.created_at), doctors[item.billing_id], item.item_type)]
+        delta['item_count'] += sign
+        delta['quantity'] += sign * item.quantity
+        delta['amount'] += sign * item.total_price
+    for (day, doctor_id, item_type), values in deltas.items():
+        if any(values.values()):
+            _add_to_rollup(DailyBillingRollup, {'day': day, 'doctor_id': doctor_id, 'item_type': item_type}, values)
+
+
+# (10/19/2026) - Process everything after the watermarks, returns {source name: rows processed}
+def refresh_rollups(batch_size=ROLLUP_BATCH_SIZE):
+    processed = {}
+    for name in ROLLUP_SOURCES:
+        processed[name] = 0
+        while True:
+            count = _refresh_batch(name, batch_size)
+            if not count:
+                break
+            processed[name] += count
+    return processed
+
+
+# (10/19/2026) - Throw the rollups away and rebuild them from the source tables
+def rebuild_rollups(batch_size=ROLLUP_BATCH_SIZE):
+    with transaction.atomic():
+        DailyRevenueRollup.objects.all().delete()
+        DailyBillingRollup.objects.all().delete()
+        RollupWatermark.objects.all().delete()
+    return refresh_rollups(batch_size)
+
+
+# (10/19/2026) - Collections and billed amounts per month of a year (or per year), from the rollups only
+def revenue_summary(year=None):
+    trunc = TruncMonth('day') if year else TruncYear('day')
+    revenue = DailyRevenueRollup.objects.all()
+    billing = DailyBillingRollup.objects.all()
+    if year:
+        revenue = revenue.filter(day__year=year)
+        billing = billing.filter(day__year=year)
+
+    periods = {}
+
+    def row(period):
+        return periods.setdefault(period, {
+            'period': period,
+            **{column: Decimal('0.00') for column in ('CASH', 'PHILHEALTH', 'CONSULTATION', 'MEDICINE', 'OTHER')},
+        })
+
+    for group in revenue.annotate(period=trunc).values('period', 'payment_method').annotate(total=Sum('amount')).order_by():
+        row(group['period'])[group['payment_method']] = group['total']
+    for group in billing.annotate(period=trunc).values('period', 'item_type').annotate(total=Sum('amount')).order_by():
+        row(group['period'])[group['item_type']] = group['total']
+    return [periods[period] for period in sorted(periods)]
@@ -0,0 +1,73 @@
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.db.models import QuerySet
+from django.db import transaction
+from django.dispatch import receiver
+from doctor.models import Prescription, Medicine
+from doctor.signals import consultation_completed
+from .billing import create_billing, apply_prescription_change, prescription_state
+from .metrics import invalidate_finance_metrics
+from .documents import schedule_billing_documents
+from .models import Billing, BillingItem, Transaction, PackageRule
+from .pricing import reset_package_pricer
+
+
+# (10/19/2026) - Bill the consultation as soon as the doctor completes it
+@receiver(consultation_completed)
+def bill_completed_consultation(sender, consultation, prescriptions, **kwargs):
+    create_billing(consultation, prescriptions)
+
+
+# (10/19/2026) - Drop the cached finance dashboard numbers on any billing or payment change
+@receiver(post_save, sender=Billing)
+@receiver(post_delete, sender=Billing)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def billing_data_changed(sender, **kwargs):
+    invalidate_finance_metrics()
+
+
+# (10/19/2026) - Re-render the statement and receipts after anything printed on them changes
+@receiver(post_save, sender=Billing)
+def billing_saved(sender, instance, **kwargs):
+    schedule_billing_documents(instance.pk)
+
+
+@receiver(post_save, sender=BillingItem)
+@receiver(post_delete, sender=BillingItem)
+@receiver(post_save, sender=Transaction)
+def billing_line_changed(sender, instance, **kwargs):
+    schedule_billing_documents(instance.billing_id)
+
+
+# (10/19/2026) - Carry prescription edits made after billing onto the bill as deltas
+@receiver(post_init, sender=Prescription)
+def prescription_loaded(sender, instance, **kwargs):
+    instance._billed_state = prescription_state(instance)
+
+
+@receiver(post_save, sender=Prescription)
+def prescription_saved_billing(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_state = prescription_state(instance)
+    apply_prescription_change(instance, None if created else instance._billed_state, new_state)
+    instance._billed_state = new_state
+
+
+@receiver(pre_delete, sender=Prescription)
+def prescription_deleted_billing(sender, instance, origin=None, **kwargs):
+    # Deleting a consultation (or its appointment/patient) takes the billing with it
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and origin_model is not Prescription:
+        return
+    apply_prescription_change(instance, prescription_state(instance), None)
+
+
+# (10/19/2026) - Recompile the Konsulta package rules after they (or a covered medicine's name) change
+@receiver(post_save, sender=PackageRule)
+@receiver(post_delete, sender=PackageRule)
+@receiver(post_save, sender=Medicine)
+def package_rules_changed(sender, **kwargs):
+    reset_package_pricer()
+    # Again once committed, in case another thread compiled before the change was visible
+    transaction.on_commit(reset_package_pricer)
@@ -0,0 +1,298 @@
+# (10/19/2026) - Konsulta transmittal report, streamed from the database into an XML file
+#
+# A month of consultations is too big to build as an ElementTree in memory. Instead two
+# queries are read with iterator(): completed consultations (with their patient and billing)
+# and their prescriptions, both ordered by (patient, consultation), and merged like a sorted
+# join. Each record is checked against TRANSMITTAL_SCHEMA before it is written with the SAX
+# XMLGenerator, so memory holds one consultation at a time whatever the size of the report.
+# The header counts are only known once every record is checked, so the records go to a
+# temporary file (on disk past TRANSMITTAL_SPOOL_SIZE) that is copied in after the header.
+#
+# Records that fail the schema are left out of the file and listed in report.errors (the first
+# MAX_REPORTED_ERRORS of them, all are counted); a report with errors must not be submitted.
+# The consultations and medicines of a patient left out are counted as errors too, and the
+# header counts only what was written.
+#
+#     <PCB>
+#       <pHciAccreNo/> <pHciTransmittalNumber/> <pReportPeriodFrom/> <pReportPeriodTo/>
+#       <pEnlistTotalCnt/> <pSoapTotalCnt/> <pMedTotalCnt/>
+#       <ENLISTMENT> patient
+#         <SOAP> consultation and its billing
+#           <ESSENTIALMED> prescription
+
+import re
+import shutil
+import tempfile
+from collections import namedtuple
+from datetime import datetime, date, time
+from decimal import Decimal, InvalidOperation
+from xml.sax.saxutils import XMLGenerator
+from django.db.models import Q
+from django.utils import timezone
+from doctor.models import Consultation, Prescription
+
+TRANSMITTAL_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+TRANSMITTAL_SPOOL_SIZE = 8 * 1024 * 1024
+# Header tag -> element it counts
+TRANSMITTAL_COUNTS = {'pEnlistTotalCnt': 'ENLISTMENT', 'pSoapTotalCnt': 'SOAP', 'pMedTotalCnt': 'ESSENTIALMED'}
+
+TransmittalIssue = namedtuple('TransmittalIssue', ['element', 'record_id', 'messages'])
+
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+# (10/19/2026) - Field checks, each returns an error message or None
+def _pin(value):
+    return None if re.fullmatch(r'\d{12}', value) else 'must be a 12-digit PhilHealth PIN'
+
+
+def _date(value):
+    return None if re.fullmatch(r'\d{4}-\d{2}-\d{2}', value) else 'must be a YYYY-MM-DD date'
+
+
+def _sex(value):
+    return None if value in ('M', 'F') else 'must be M or F'
+
+
+def _icd10(value):
+    return None if re.fullmatch(r'[A-Z]\d{2}(\.[0-9A-Z]{1,4})?', value) else 'must be an ICD-10 code'
+
+
+def _amount(value):
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        return 'must be an amount'
+    return None if amount >= 0 and amount == amount.quantize(Decimal('0.01')) else 'must be a positive amount in centavos'
+
+
+def _count(value):
+    return None if value.isdigit() and int(value) > 0 else 'must be a whole number above zero'
+
+
+# element -> [(tag, required, max_length, check)], in the order the tags are written
+TRANSMITTAL_SCHEMA = {
+    'ENLISTMENT': [
+        ('pHciCaseNo', True, 20, None),
+        ('pMemPin', True, 12, _pin),
+        ('pMemLname', True, 60, None),
+        ('pMemFname', True, 60, None),
+        ('pMemBdate', True, 10, _date),
+        ('pMemSex', True, 1, _sex),
+    ],
+    'SOAP': [
+        ('pHciTransNo', True, 20, None),
+        ('pConsultDate', True, 10, _date),
+        ('pDiagnosisCode', False, 10, _icd10),
+        ('pAssessment', True, 2000, None),
+        ('pBillAmount', False, 12, _amount),
+        ('pPhilHealthCoverage', False, 12, _amount),
+        ('pBillStatus', False, 20, None),
+    ],
+    'ESSENTIALMED': [
+        ('pGenericName', True, 200, None),
+        ('pQuantity', True, 6, _count),
+        ('pUnitPrice', True, 12, _amount),
+    ],
+}
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return f'{value:.2f}'
+    return _INVALID_XML_CHARS.sub('', str(value)).strip()
+
+
+# (10/19/2026) - Check one record against the schema; returns the list of problems
+def validate_record(element, values):
+    errors = []
+    for tag, required, max_length, check in TRANSMITTAL_SCHEMA[element]:
+        value = values.get(tag, '')
+        if not value:
+            if required:
+                errors.append(f'{tag} is required')
+            continue
+        if len(value) > max_length:
+            errors.append(f'{tag} is longer than {max_length} characters')
+        elif check and (message := check(value)):
+            errors.append(f'{tag} {message}')
+    return errors
+
+
+class TransmittalReport:
+    def __init__(self, start, end, hospital_code, transmittal_id, chunk_size=TRANSMITTAL_CHUNK_SIZE):
+        self.start = start
+        self.end = end
+        self.hospital_code = hospital_code
+        self.transmittal_id = transmittal_id
+        self.chunk_size = chunk_size
+        self.errors = []
+        self.error_count = 0
+        # Records written and left out per element, and the PhilHealth coverage on the billings written
+        self.written = {element: 0 for element in TRANSMITTAL_SCHEMA}
+        self.skipped = {element: 0 for element in TRANSMITTAL_SCHEMA}
+        self.billing_count = 0
+        self.coverage_total = Decimal('0.00')
+
+    @property
+    def is_valid(self):
+        return self.error_count == 0
+
+    # Consultations saved before drafts existed may still say ONGOING; a completed appointment
+    # or a billing marks them finished the same way the status backfill does
+    def consultations(self):
+        return Consultation.objects.filter(
+            Q(status='COMPLETED') | Q(appointment__status='COMPLETED') | Q(billing__isnull=False),
+            date__gte=timezone.make_aware(datetime.combine(self.start, time.min)),
+            date__lte=timezone.make_aware(datetime.combine(self.end, time.max)),
+        )
+
+    def _consultation_rows(self):
+        return self.consultations().order_by('appointment__patient_id', 'id').values_list(
+            'appointment__patient_id', 'appointment__patient__philhealth_pin', 'appointment__patient__last_name',
+            'appointment__patient__first_name', 'appointment__patient__birth_date', 'appointment__patient__gender',
+            'id', 'date', 'diagnosis_code__code', 'diagnosis',
+            'billing__id', 'billing__total_amount', 'billing__philhealth_coverage', 'billing__status',
+        ).iterator(chunk_size=self.chunk_size)
+
+    def _prescription_rows(self):
+        return Prescription.objects.filter(consultation__in=self.consultations()).order_by(
+            'consultation__appointment__patient_id', 'consultation_id', 'id'
+        ).values_list(
+            'consultation__appointment__patient_id', 'consultation_id', 'id', 'medicine__name', 'quantity', 'unit_price'
+        ).iterator(chunk_size=self.chunk_size)
+
+    def _issue(self, element, record_id, messages):
+        self._skip(element)
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(TransmittalIssue(element, record_id, messages))
+
+    # Records left out with a parent that failed its checks
+    def _skip(self, element, count=1):
+        self.error_count += count
+        self.skipped[element] += count
+
+    def _element(self, xml, tag, value):
+        xml.startElement(tag, {})
+        xml.characters(value)
+        xml.endElement(tag)
+
+    # The caller closes the element once its children are written
+    def _open_record(self, xml, element, values):
+        xml.startElement(element, {})
+        for tag, _, _, _ in TRANSMITTAL_SCHEMA[element]:
+            if values.get(tag):
+                self._element(xml, tag, values[tag])
+        self.written[element] += 1
+
+    # (10/19/2026) - Write the report to a binary file object
+    def write(self, out):
+        # (Old Code) - Header counts queried up front, including records later left out
+        # consultations = self.consultations()
+        # counts = {
+        #     'pEnlistTotalCnt': consultations.values('appointment__patient_id').distinct().count(),
+        #     'pSoapTotalCnt': consultations.count(),
+        #     'pMedTotalCnt': Prescription.objects.filter(consultation__in=consultations).count(),
+        # }
+        with tempfile.SpooledTemporaryFile(max_size=TRANSMITTAL_SPOOL_SIZE) as records:
+            self._write_records(XMLGenerator(records, encoding='utf-8', short_empty_elements=True))
+
+            xml = XMLGenerator(out, encoding='utf-8', short_empty_elements=True)
+            xml.startDocument()
+            xml.startElement('PCB', {})
+            self._element(xml, 'pHciAccreNo', _text(self.hospital_code))
+            self._element(xml, 'pHciTransmittalNumber', _text(self.transmittal_id))
+            self._element(xml, 'pReportPeriodFrom', _text(self.start))
+            self._element(xml, 'pReportPeriodTo', _text(self.end))
+            for tag, element in TRANSMITTAL_COUNTS.items():
+                self._element(xml, tag, str(self.written[element]))
+            # The generator writes straight through to out, so the records land after the header
+            records.seek(0)
+            shutil.copyfileobj(records, out)
+            xml.endElement('PCB')
+            xml.endDocument()
+        return self
+
+    # (10/19/2026) - The ENLISTMENT elements, without the PCB wrapper and header
+    def _write_records(self, xml):
+        prescriptions = self._prescription_rows()
+        pending = next(prescriptions, None)
+        patient_id = None
+        patient_open = False
+        for row in self._consultation_rows():
+            (row_patient_id, pin, last_name, first_name, birth_date, gender,
+             consultation_id, consult_date, diagnosis_code, diagnosis,
+             billing_id, total_amount, coverage, billing_status) = row
+
+            if row_patient_id != patient_id:
+                if patient_open:
+                    xml.endElement('ENLISTMENT')
+                patient_id = row_patient_id
+                enlistment = {
+                    'pHciCaseNo': str(patient_id),
+                    'pMemPin': _text(pin),
+                    'pMemLname': _text(last_name),
+                    'pMemFname': _text(first_name),
+                    'pMemBdate': _text(birth_date),
+                    'pMemSex': _text(gender)[:1].upper(),
+                }
+                problems = validate_record('ENLISTMENT', enlistment)
+                patient_open = not problems
+                if problems:
+                    self._issue('ENLISTMENT', patient_id, problems)
+                else:
+                    self._open_record(xml, 'ENLISTMENT', enlistment)
+
+            # Prescriptions come in the same (patient, consultation) order; skip past any before this one
+            medicines = []
+            while pending is not None and (pending[0], pending[1]) < (row_patient_id, consultation_id):
+                pending = next(prescriptions, None)
+            while pending is not None and (pending[0], pending[1]) == (row_patient_id, consultation_id):
+                medicines.append(pending)
+                pending = next(prescriptions, None)
+
+            if not patient_open:
+                self._skip('SOAP')
+                self._skip('ESSENTIALMED', len(medicines))
+                continue
+            soap = {
+                'pHciTransNo': str(consultation_id),
+                'pConsultDate': _text(consult_date),
+                'pDiagnosisCode': _text(diagnosis_code),
+                'pAssessment': _text(diagnosis),
+                'pBillAmount': _text(total_amount),
+                'pPhilHealthCoverage': _text(coverage),
+                'pBillStatus': _text(billing_status),
+            }
+            problems = validate_record('SOAP', soap)
+            if problems:
+                self._issue('SOAP', consultation_id, problems)
+                self._skip('ESSENTIALMED', len(medicines))
+                continue
+            self._open_record(xml, 'SOAP', soap)
+            if billing_id is not None:
+                self.billing_count += 1
+                self.coverage_total += coverage
+            for _, _, prescription_id, medicine_name, quantity, unit_price in medicines:
+                medicine = {
+                    'pGenericName': _text(medicine_name),
+                    'pQuantity': _text(quantity),
+                    'pUnitPrice': _text(unit_price),
+                }
+                problems = validate_record('ESSENTIALMED', medicine)
+                if problems:
+                    self._issue('ESSENTIALMED', prescription_id, problems)
+                else:
+                    self._open_record(xml, 'ESSENTIALMED', medicine)
+                    xml.endElement('ESSENTIALMED')
+            xml.endElement('SOAP')
+
+        if patient_open:
+            xml.endElement('ENLISTMENT')
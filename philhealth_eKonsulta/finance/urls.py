@@ -11,7 +11,14 @@ from . import views
 urlpatterns = [
     path("dashboard/", views.finance_dashboard, name="finance_dashboard"),
     path("billing/", views.billing_list, name="billing_list"),  # (12-20-2025) Gocotano - Added billing list
+    path("billing/philhealth/bulk/", views.bulk_philhealth, name="bulk_philhealth"),  # (10/19/2026) - Batch coverage
     path("billing/<int:billing_id>/", views.billing_detail, name="billing_detail"),
     path("billing/<int:billing_id>/pay/", views.process_payment, name="process_payment"),
     path("billing/<int:billing_id>/philhealth/", views.apply_philhealth, name="apply_philhealth"),
+    path("billing/<int:billing_id>/statement.pdf", views.billing_statement_pdf, name="billing_statement_pdf"),  # (10/19/2026) - Cached PDFs
+    path("transactions/<int:transaction_id>/receipt.pdf", views.transaction_receipt_pdf, name="transaction_receipt_pdf"),
+    path("reports/revenue/", views.revenue_report, name="revenue_report"),  # (10/19/2026) - From the daily rollups
+    path("reports/aging/", views.aging_report, name="aging_report"),  # (10/19/2026) - AR aging
+    path("reconciliation/", views.cash_reconciliation, name="cash_reconciliation"),  # (10/19/2026) - Cash drawers
+    path("exports/<str:kind>/", views.export_records, name="export_records"),  # (10/19/2026) - Streaming CSV/XLSX
 ]
@@ -1,10 +1,29 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
+from django.db.models import F, DecimalField, ExpressionWrapper  # (10/19/2026) - Billing list annotations
+from datetime import datetime
 from django.contrib import messages
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from doctor.models import Consultation, Prescription
 from .models import Billing, BillingItem, Transaction
+from .metrics import get_finance_metrics  # (10/19/2026) - Cached dashboard aggregate
+from .payments import post_payment, PaymentError  # (10/19/2026) - Locked, idempotent payment posting
+from .rollups import revenue_summary  # (10/19/2026) - Reports read from the daily rollups
+from .exports import EXPORTS, EXPORT_FORMATS, stream_export, export_filename  # (10/19/2026) - Auditor exports
+from .documents import get_document  # (10/19/2026) - Cached PDF statements and receipts
+from .coverage import eligible_billings, apply_coverage, apply_bulk_coverage, set_coverage, BULK_COVERAGE_LIMIT  # (10/19/2026) - Batch PhilHealth coverage
+from login.models import DoctorProfile
+from .reconciliation import open_session, close_session, day_reconciliation, collected_by_cashier, ReconciliationError  # (10/19/2026) - Cash drawers
+from .models import DrawerSession
+from .aging import get_aging_report, aging_csv_rows, AGING_BUCKETS  # (10/19/2026) - AR aging
+from .pricing import get_package_pricer, price_billing  # (10/19/2026) - Konsulta package pricing
+from .pka import get_pka_client, PKAError, PKAUncertainError  # (10/19/2026) - PhilHealth Konsulta API
+from .exports import stream_csv
+from django.utils import timezone
+from django.http import StreamingHttpResponse, Http404, FileResponse
+from django.utils.dateparse import parse_date
+import uuid
 
 
 # (Old Code) - Original finance_dashboard view
@@ -37,85 +56,179 @@ from .models import Billing, BillingItem, Transaction
 # (12-19-2025) Gocotano - Finance dashboard view showing summary cards
 @login_required
 def finance_dashboard(request):
-    # (12-20-2025) Gocotano - Get counts for summary cards
-    total_billings = Billing.objects.count()
-    pending_count = Billing.objects.filter(status='PENDING').count()
-    partial_count = Billing.objects.filter(status='PARTIAL').count()
-    paid_count = Billing.objects.filter(status='PAID').count()
-    philhealth_count = Billing.objects.filter(status='PHILHEALTH').count()
-
-    return render(request, 'finance/finance_dashboard.html', {
-        'total_billings': total_billings,
-        'pending_count': pending_count,
-        'partial_count': partial_count,
-        'paid_count': paid_count,
-        'philhealth_count': philhealth_count
-    })
+    # (Old Code) - Five separate COUNT queries
+    # total_billings = Billing.objects.count()
+    # pending_count = Billing.objects.filter(status='PENDING').count()
+    # partial_count = Billing.objects.filter(status='PARTIAL').count()
+    # paid_count = Billing.objects.filter(status='PAID').count()
+    # philhealth_count = Billing.objects.filter(status='PHILHEALTH').count()
+
+    # (10/19/2026) - Counts and revenue figures from one cached aggregate
+    metrics = get_finance_metrics()
+
+    return render(request, 'finance/finance_dashboard.html', metrics)
+
+
+# (Old Code) - Billing list built in Python, one get_balance()/total query per consultation
+# (12-20-2025) Gocotano - Billing list view showing all billing records with filters
+# @login_required
+# def billing_list(request):
+#     # (12-19-2025) Gocotano - Get all consultations where appointment is COMPLETED (not consultation status)
+#     consultations = Consultation.objects.filter(appointment__status="COMPLETED").select_related(
+#         'appointment__patient',
+#         'appointment__doctor',
+#         'appointment__doctor__user',
+#         'doctor'
+#     ).order_by('-date')
+#
+#     # (12-19-2025) Gocotano - Search filter
+#     search_query = request.GET.get('search', '')
+#     if search_query:
+#         consultations = consultations.filter(
+#             Q(appointment__patient__first_name__icontains=search_query) |
+#             Q(appointment__patient__last_name__icontains=search_query)
+#         )
+#
+#     # (12-19-2025) Gocotano - Status filter
+#     status_filter = request.GET.get('status', '')
+#     if status_filter:
+#         if status_filter == 'NO_BILLING':
+#             consultations = consultations.filter(billing__isnull=True)
+#         else:
+#             consultations = consultations.filter(billing__status=status_filter)
+#
+#     # (Old Code) - Create billing records for consultations that don't have one
+#     # billing_list = []
+#     # for consultation in consultations:
+#     #     if not hasattr(consultation, 'billing'):
+#     #         billing = Billing.objects.create(
+#     #             consultation=consultation,
+#     #             total_amount=consultation.get_total_amount()
+#     #         )
+#     #         for prescription in consultation.prescriptions.all():
+#     #             BillingItem.objects.create(
+#     #                 billing=billing,
+#     #                 item_type='MEDICINE',
+#     #                 description=prescription.medicine.name,
+#     #                 quantity=prescription.quantity,
+#     #                 unit_price=prescription.unit_price,
+#     #                 total_price=prescription.get_total_price()
+#     #             )
+#     #     else:
+#     #         billing = consultation.billing
+#
+#     # (10/19/2026) - Read-only: billings are created when the consultation is completed
+#     # (finance/signals.py), older consultations are billed with `backfill_billings`
+#     consultations = consultations.filter(billing__isnull=False).select_related('billing')
+#
+#     billing_list = []
+#     for consultation in consultations:
+#         billing = consultation.billing
+#
+#         assigned_doctor = consultation.appointment.doctor
+#         billing_list.append({
+#             'consultation': consultation,
+#             'billing': billing,
+#             'patient': consultation.appointment.patient,
+#             'doctor': consultation.doctor,
+#             'assigned_doctor': assigned_doctor,
+#             'amount': billing.total_amount,
+#             'balance': billing.get_balance(),
+#             'status': billing.status
+#         })
+#
+#     return render(request, 'finance/billing_list.html', {
+#         'billing_list': billing_list,
+#         'search_query': search_query,
+#         'status_filter': status_filter
+#     })
+
+
+BILLINGS_PER_PAGE = 50
+
+
+# (10/19/2026) - "<created_at>|<id>" of the last row on a page, for keyset pagination
+def encode_billing_cursor(billing):
+    return f"{billing.created_at.isoformat()}|{billing.id}"
+
+
+def decode_billing_cursor(cursor):
+    try:
+        created_at, billing_id = cursor.split('|')
+        return datetime.fromisoformat(created_at), int(billing_id)
+    except ValueError:
+        return None
+
+
+def parse_amount(value):
+    try:
+        return Decimal(value) if value else None
+    except InvalidOperation:
+        return None
 
 
 # (12-20-2025) Gocotano - Billing list view showing all billing records with filters
+# (10/19/2026) - Rewritten around one annotated Billing query, newest first, keyset paginated
 @login_required
 def billing_list(request):
-    # (12-19-2025) Gocotano - Get all consultations where appointment is COMPLETED (not consultation status)
-    consultations = Consultation.objects.filter(appointment__status="COMPLETED").select_related(
-        'appointment__patient',
-        'appointment__doctor',
-        'appointment__doctor__user',
-        'doctor'
-    ).order_by('-date')
+    billings = Billing.objects.select_related(
+        'consultation__appointment__patient',
+        'consultation__appointment__doctor',
+    ).annotate(
+        balance=ExpressionWrapper(
+            F('total_amount') - F('philhealth_coverage') - F('amount_paid'),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+    )
 
     # (12-19-2025) Gocotano - Search filter
     search_query = request.GET.get('search', '')
     if search_query:
-        consultations = consultations.filter(
-            Q(appointment__patient__first_name__icontains=search_query) |
-            Q(appointment__patient__last_name__icontains=search_query)
+        billings = billings.filter(
+            Q(consultation__appointment__patient__first_name__icontains=search_query) |
+            Q(consultation__appointment__patient__last_name__icontains=search_query)
         )
 
     # (12-19-2025) Gocotano - Status filter
     status_filter = request.GET.get('status', '')
     if status_filter:
-        if status_filter == 'NO_BILLING':
-            consultations = consultations.filter(billing__isnull=True)
-        else:
-            consultations = consultations.filter(billing__status=status_filter)
-
-    # (12-19-2025) Gocotano - Create billing records for consultations that don't have one
-    billing_list = []
-    for consultation in consultations:
-        if not hasattr(consultation, 'billing'):
-            billing = Billing.objects.create(
-                consultation=consultation,
-                total_amount=consultation.get_total_amount()
-            )
-            for prescription in consultation.prescriptions.all():
-                BillingItem.objects.create(
-                    billing=billing,
-                    item_type='MEDICINE',
-                    description=prescription.medicine.name,
-                    quantity=prescription.quantity,
-                    unit_price=prescription.medicine.price,
-                    total_price=prescription.get_total_price()
-                )
-        else:
-            billing = consultation.billing
-
-        assigned_doctor = consultation.appointment.doctor
-        billing_list.append({
-            'consultation': consultation,
-            'billing': billing,
-            'patient': consultation.appointment.patient,
-            'doctor': consultation.doctor,
-            'assigned_doctor': assigned_doctor,
-            'amount': billing.total_amount,
-            'balance': billing.get_balance(),
-            'status': billing.status
-        })
+        billings = billings.filter(status=status_filter)
+
+    # (10/19/2026) - Balance range filter
+    min_balance = parse_amount(request.GET.get('min_balance', ''))
+    max_balance = parse_amount(request.GET.get('max_balance', ''))
+    if min_balance is not None:
+        billings = billings.filter(balance__gte=min_balance)
+    if max_balance is not None:
+        billings = billings.filter(balance__lte=max_balance)
+
+    # (10/19/2026) - Keyset pagination: rows strictly after the last one of the previous page
+    cursor = decode_billing_cursor(request.GET.get('after', ''))
+    if cursor:
+        created_at, billing_id = cursor
+        billings = billings.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=billing_id)
+        )
+
+    page = list(billings.order_by('-created_at', '-id')[:BILLINGS_PER_PAGE + 1])
+    next_cursor = None
+    if len(page) > BILLINGS_PER_PAGE:
+        page = page[:BILLINGS_PER_PAGE]
+        next_cursor = encode_billing_cursor(page[-1])
+
+    # Filters carried over to the next page link
+    filters = request.GET.copy()
+    filters.pop('after', None)
 
     return render(request, 'finance/billing_list.html', {
-        'billing_list': billing_list,
+        'billings': page,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
+        'filter_query': filters.urlencode(),
         'search_query': search_query,
-        'status_filter': status_filter
+        'status_filter': status_filter,
+        'min_balance': request.GET.get('min_balance', ''),
+        'max_balance': request.GET.get('max_balance', ''),
     })
 
 
@@ -138,6 +251,9 @@ def billing_detail(request, billing_id):
     # (12-19-2025) Gocotano - Get transaction history
     transactions = billing.transactions.all()
 
+    # (10/19/2026) - Konsulta package price of this bill, None when no package rules are set
+    package = price_billing(billing) if get_package_pricer() else None
+
     return render(request, 'finance/billing_detail.html', {
         'billing': billing,
         'consultation': consultation,
@@ -147,48 +263,193 @@ def billing_detail(request, billing_id):
         'prescriptions': prescriptions,
         'billing_items': billing_items,
         'transactions': transactions,
-        'balance': billing.get_balance()
+        'balance': billing.get_balance(),
+        'package': package,
+        'pka_enabled': get_pka_client() is not None,
+        # (10/19/2026) - One key per rendered form, resubmitting the same form is not posted twice
+        'cash_payment_key': uuid.uuid4().hex,
+        'philhealth_payment_key': uuid.uuid4().hex,
+    })
+
+
+# (10/19/2026) - Statement of account PDF, served from the document cache
+@login_required
+def billing_statement_pdf(request, billing_id):
+    billing = get_object_or_404(
+        Billing.objects.select_related('consultation__appointment__patient', 'consultation__appointment__doctor'),
+        id=billing_id,
+    )
+    path = get_document('statement', billing)
+    return FileResponse(open(path, 'rb'), content_type='application/pdf', filename=f'statement-{billing.id}.pdf')
+
+
+# (10/19/2026) - Official receipt PDF for one payment, served from the document cache
+@login_required
+def transaction_receipt_pdf(request, transaction_id):
+    payment = get_object_or_404(
+        Transaction.objects.select_related('billing__consultation__appointment__patient', 'processed_by'),
+        id=transaction_id,
+    )
+    path = get_document('receipt', payment)
+    return FileResponse(open(path, 'rb'), content_type='application/pdf', filename=f'receipt-{payment.id}.pdf')
+
+
+# (10/19/2026) - Revenue report per year, or per month of ?year=, read from the daily rollups
+@login_required
+def revenue_report(request):
+    year = request.GET.get('year', '')
+    year = int(year) if year.isdigit() else None
+
+    return render(request, 'finance/revenue_report.html', {
+        'rows': revenue_summary(year),
+        'year': year,
+    })
+
+
+def parse_export_date(value):
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+
+# (10/19/2026) - Accounts-receivable aging by doctor and patient; ?format=csv streams every row
+@login_required
+def aging_report(request):
+    doctor = request.GET.get('doctor', '')
+    doctor_id = int(doctor) if doctor.isdigit() else None
+
+    if request.GET.get('format') == 'csv':
+        response = StreamingHttpResponse(stream_csv(aging_csv_rows(doctor_id)), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="ar_aging_{timezone.localdate():%Y%m%d}.csv"'
+        return response
+
+    report = get_aging_report(doctor_id, refresh=bool(request.GET.get('refresh')))
+    return render(request, 'finance/aging_report.html', {
+        **report,
+        'buckets': [(key, label) for key, label, *_ in AGING_BUCKETS],
+        'doctor_filter': doctor,
+        'doctor_options': DoctorProfile.objects.order_by('last_name', 'first_name'),
     })
 
 
+# (10/19/2026) - Streaming CSV/XLSX export: ?format=csv|xlsx&start=YYYY-MM-DD&end=YYYY-MM-DD
+@login_required
+def export_records(request, kind):
+    if kind not in EXPORTS:
+        raise Http404("Unknown export")
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+    start = parse_export_date(request.GET.get('start', ''))
+    end = parse_export_date(request.GET.get('end', ''))
+
+    content_types = {
+        'csv': 'text/csv',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+    response = StreamingHttpResponse(stream_export(kind, export_format, start, end), content_type=content_types[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(kind, export_format, start, end)}"'
+    return response
+
+
+# (Old Code) - Read-modify-write payment views without locking or duplicate protection
+# # (12-19-2025) Gocotano - Process payment (Cash or PhilHealth)
+# @login_required
+# def process_payment(request, billing_id):
+#     billing = get_object_or_404(Billing, id=billing_id)
+#
+#     if request.method == 'POST':
+#         payment_method = request.POST.get('payment_method', 'CASH')
+#         amount = Decimal(request.POST.get('amount', '0'))
+#         reference_number = request.POST.get('reference_number', '')
+#         remarks = request.POST.get('remarks', '')
+#
+#         # (12-19-2025) Gocotano - Create transaction record
+#         transaction = Transaction.objects.create(
+#             billing=billing,
+#             amount=amount,
+#             payment_method=payment_method,
+#             reference_number=reference_number,
+#             remarks=remarks,
+#             processed_by=request.user
+#         )
+#
+#         # (12-19-2025) Gocotano - Update billing based on payment method
+#         if payment_method == 'PHILHEALTH':
+#             billing.philhealth_coverage += amount
+#         else:
+#             billing.amount_paid += amount
+#
+#         # (12-19-2025) Gocotano - Update billing status
+#         balance = billing.get_balance()
+#         if balance <= 0:
+#             billing.status = 'PAID'
+#         elif billing.amount_paid > 0 or billing.philhealth_coverage > 0:
+#             billing.status = 'PARTIAL'
+#
+#         billing.save()
+#
+#         messages.success(request, f'Payment of ₱{amount} processed successfully!')
+#         return redirect('billing_detail', billing_id=billing.id)
+#
+#     return redirect('billing_detail', billing_id=billing.id)
+#
+#
+# # (12-19-2025) Gocotano - Apply full PhilHealth coverage
+# @login_required
+# def apply_philhealth(request, billing_id):
+#     billing = get_object_or_404(Billing, id=billing_id)
+#
+#     if request.method == 'POST':
+#         # (12-19-2025) Gocotano - Apply full PhilHealth coverage to remaining balance
+#         balance = billing.get_balance()
+#         reference_number = request.POST.get('reference_number', '')
+#         remarks = request.POST.get('remarks', 'PhilHealth Full Coverage')
+#
+#         # (12-19-2025) Gocotano - Create transaction for PhilHealth
+#         Transaction.objects.create(
+#             billing=billing,
+#             amount=balance,
+#             payment_method='PHILHEALTH',
+#             reference_number=reference_number,
+#             remarks=remarks,
+#             processed_by=request.user
+#         )
+#
+#         billing.philhealth_coverage = billing.total_amount
+#         billing.status = 'PHILHEALTH'
+#         billing.save()
+#
+#         messages.success(request, 'PhilHealth coverage applied successfully!')
+#
+#     return redirect('billing_detail', billing_id=billing.id)
+
+
 # (12-19-2025) Gocotano - Process payment (Cash or PhilHealth)
+# (10/19/2026) - Posted through finance/payments.py: row lock, F() update, idempotency key
 @login_required
 def process_payment(request, billing_id):
     billing = get_object_or_404(Billing, id=billing_id)
 
     if request.method == 'POST':
-        payment_method = request.POST.get('payment_method', 'CASH')
-        amount = Decimal(request.POST.get('amount', '0'))
-        reference_number = request.POST.get('reference_number', '')
-        remarks = request.POST.get('remarks', '')
-
-        # (12-19-2025) Gocotano - Create transaction record
-        transaction = Transaction.objects.create(
-            billing=billing,
-            amount=amount,
-            payment_method=payment_method,
-            reference_number=reference_number,
-            remarks=remarks,
-            processed_by=request.user
-        )
-
-        # (12-19-2025) Gocotano - Update billing based on payment method
-        if payment_method == 'PHILHEALTH':
-            billing.philhealth_coverage += amount
+        try:
+            payment, created = post_payment(
+                billing.id,
+                request.POST.get('amount', ''),
+                payment_method=request.POST.get('payment_method', 'CASH'),
+                user=request.user,
+                idempotency_key=request.POST.get('idempotency_key', ''),
+                reference_number=request.POST.get('reference_number', ''),
+                remarks=request.POST.get('remarks', ''),
+            )
+        except PaymentError as error:
+            messages.error(request, str(error))
         else:
-            billing.amount_paid += amount
-
-        # (12-19-2025) Gocotano - Update billing status
-        balance = billing.get_balance()
-        if balance <= 0:
-            billing.status = 'PAID'
-        elif billing.amount_paid > 0 or billing.philhealth_coverage > 0:
-            billing.status = 'PARTIAL'
-
-        billing.save()
-
-        messages.success(request, f'Payment of ₱{amount} processed successfully!')
-        return redirect('billing_detail', billing_id=billing.id)
+            if created:
+                messages.success(request, f'Payment of ₱{payment.amount} processed successfully!')
+            else:
+                messages.info(request, 'This payment was already processed.')
 
     return redirect('billing_detail', billing_id=billing.id)
 
@@ -199,25 +460,126 @@ def apply_philhealth(request, billing_id):
     billing = get_object_or_404(Billing, id=billing_id)
 
     if request.method == 'POST':
-        # (12-19-2025) Gocotano - Apply full PhilHealth coverage to remaining balance
-        balance = billing.get_balance()
-        reference_number = request.POST.get('reference_number', '')
-        remarks = request.POST.get('remarks', 'PhilHealth Full Coverage')
-
-        # (12-19-2025) Gocotano - Create transaction for PhilHealth
-        Transaction.objects.create(
-            billing=billing,
-            amount=balance,
-            payment_method='PHILHEALTH',
-            reference_number=reference_number,
-            remarks=remarks,
-            processed_by=request.user
-        )
+        # (10/19/2026) - Covers whatever balance remains at the time the billing row is locked,
+        # or only the Konsulta package price when package rules are configured. With PKA set up
+        # the claim number comes from PhilHealth instead of the form.
+        try:
+            payment, created = apply_coverage(
+                billing.id,
+                user=request.user,
+                idempotency_key=request.POST.get('idempotency_key', ''),
+                reference_number=request.POST.get('reference_number', ''),
+                remarks=request.POST.get('remarks', 'PhilHealth Full Coverage'),
+            )
+        except (PaymentError, PKAError) as error:
+            messages.error(request, str(error))
+        else:
+            if created:
+                messages.success(request, 'PhilHealth coverage applied successfully!')
+            else:
+                messages.info(request, 'PhilHealth coverage was already applied.')
 
-        billing.philhealth_coverage = billing.total_amount
-        billing.status = 'PHILHEALTH'
-        billing.save()
+    return redirect('billing_detail', billing_id=billing.id)
 
-        messages.success(request, 'PhilHealth coverage applied successfully!')
 
-    return redirect('billing_detail', billing_id=billing.id)
+# (10/19/2026) - Month-end PhilHealth coverage for a batch of billings. GET lists the eligible
+# billings for the filters; POST either previews the checked billings (dry run) or applies them.
+@login_required
+def bulk_philhealth(request):
+    params = request.POST if request.method == 'POST' else request.GET
+    filters = {
+        'status': params.get('status', ''),
+        'start': parse_export_date(params.get('start', '')),
+        'end': parse_export_date(params.get('end', '')),
+        'doctor_id': params.get('doctor', '') if params.get('doctor', '').isdigit() else None,
+        'max_balance': parse_amount(params.get('max_balance', '')),
+    }
+    reference_number = params.get('reference_number', '')
+    remarks = params.get('remarks', 'PhilHealth Full Coverage')
+    dry_run = True
+
+    if request.method == 'POST':
+        billing_ids = [value for value in request.POST.getlist('billing_ids') if value.isdigit()]
+        dry_run = 'apply' not in request.POST
+        try:
+            result = apply_bulk_coverage(
+                billing_ids, user=request.user, reference_number=reference_number, remarks=remarks, dry_run=dry_run
+            )
+        except (PKAUncertainError, PaymentError) as error:
+            # Sent, or accepted but not posted: the claim is kept for reconcile_claims
+            messages.error(request, str(error))
+            return redirect('bulk_philhealth')
+        except PKAError as error:
+            messages.error(request, f'The claim was not submitted, nothing was applied: {error}')
+            return redirect('bulk_philhealth')
+        skipped = len(set(billing_ids)) - result.count
+        if not dry_run:
+            if result.applied:
+                messages.success(request, f'PhilHealth coverage applied to {result.count} billing(s), ₱{result.total} in total.')
+            if skipped:
+                messages.warning(request, f'{skipped} billing(s) were skipped because they are no longer eligible.')
+            if not result.applied and not skipped:
+                messages.info(request, 'No billings were selected.')
+            return redirect('bulk_philhealth')
+        if skipped:
+            messages.warning(request, f'{skipped} selected billing(s) are no longer eligible and would be skipped.')
+        billings, truncated = result.billings, False
+    else:
+        billings = list(eligible_billings(**filters).select_related(
+            'consultation__appointment__patient',
+            'consultation__appointment__doctor',
+        ).order_by('created_at', 'id')[:BULK_COVERAGE_LIMIT + 1])
+        truncated = len(billings) > BULK_COVERAGE_LIMIT
+        billings = [billing for billing in set_coverage(billings[:BULK_COVERAGE_LIMIT]) if billing.coverage > 0]
+
+    return render(request, 'finance/bulk_philhealth.html', {
+        'billings': billings,
+        'total': sum((billing.coverage for billing in billings), Decimal('0.00')),
+        'truncated': truncated,
+        'is_preview': request.method == 'POST' and dry_run,
+        'limit': BULK_COVERAGE_LIMIT,
+        'doctors': DoctorProfile.objects.order_by('last_name', 'first_name'),
+        'status_filter': filters['status'],
+        'start': params.get('start', ''),
+        'end': params.get('end', ''),
+        'doctor_filter': params.get('doctor', ''),
+        'max_balance': params.get('max_balance', ''),
+        'reference_number': reference_number,
+        'remarks': remarks,
+        'pka_enabled': get_pka_client() is not None,
+    })
+
+
+# (10/19/2026) - Cash drawer: the signed-in cashier opens and closes their drawer session, and
+# the day's reconciliation across cashiers is shown below (?date=YYYY-MM-DD for past days)
+@login_required
+def cash_reconciliation(request):
+    session = DrawerSession.objects.filter(cashier=request.user, status='OPEN').first()
+
+    if request.method == 'POST':
+        try:
+            if request.POST.get('action') == 'open':
+                open_session(request.user, request.POST.get('opening_float', '0') or '0')
+                messages.success(request, 'Cash drawer opened.')
+            elif request.POST.get('action') == 'close' and session:
+                closed = close_session(
+                    session.id, request.POST.get('counted_cash', ''), user=request.user, notes=request.POST.get('notes', '')
+                )
+                messages.success(request, f'Cash drawer closed. Expected ₱{closed.expected_cash}, counted ₱{closed.counted_cash}, variance ₱{closed.variance}.')
+        except ReconciliationError as error:
+            messages.error(request, str(error))
+        return redirect('cash_reconciliation')
+
+    day = parse_export_date(request.GET.get('date', '')) or timezone.localdate()
+    session_totals = None
+    if session:
+        session_totals = collected_by_cashier(session.opened_at, timezone.now(), request.user.id).get(request.user.id, {})
+        session.cash_collected = session_totals.get('CASH', {}).get('amount') or Decimal('0.00')
+        session.expected_cash = session.opening_float + session.cash_collected
+
+    return render(request, 'finance/cash_reconciliation.html', {
+        'session': session,
+        'session_totals': session_totals,
+        'day': day,
+        'rows': day_reconciliation(day),
+    })
@@ -8,6 +8,7 @@ from django.contrib import messages
 from django.db import IntegrityError
 from django.db.models import Q, Count
 from secretary.models import Appointment
+from doctor.metrics import get_doctor_metrics
 
 from .models import DoctorProfile, SecretaryProfile, FinanceProfile
 
@@ -474,9 +475,10 @@ def superadmin_dashboard(request):
 # (12/15/2025) - END NEW CODE by Gocotano ---------------------------------------------------------
 
 
-@login_required
-def doctor_dashboard(request):
-    return render(request, "landing_pages/doctor.html")
+# (Old Code) - Shadowed by the doctor_dashboard defined further down
+# @login_required
+# def doctor_dashboard(request):
+#     return render(request, "landing_pages/doctor.html")
 
 
 @login_required
@@ -505,21 +507,26 @@ def admin_logout(request):
 #     get inforamtion for the users
 #-------------------------------------
 
+@login_required
 def doctor_dashboard(request):
     if request.user.role != "DOCTOR":
         return render(request, "login/error.html", {"message": "Access denied."})
     
     doctor_profile = get_object_or_404(DoctorProfile, user = request.user)
 
-    today = now().date()
-    today_appointments = doctor_profile.appointments.filter(date__date = today, status = "PENDING").count()
-    summary_counts = doctor_profile.appointments.aggregate(
-        total_pending = Count("id", filter=Q(status = "PENDING")),
-        total_completed = Count("id", filter=Q(status = "COMPLETED"))
-    )
+    # (Old Code) - separate count and aggregate queries
+    # today = now().date()
+    # today_appointments = doctor_profile.appointments.filter(date__date = today, status = "PENDING").count()
+    # summary_counts = doctor_profile.appointments.aggregate(
+    #     total_pending = Count("id", filter=Q(status = "PENDING")),
+    #     total_completed = Count("id", filter=Q(status = "COMPLETED"))
+    # )
+
+    # (10/19/2026) - All dashboard numbers come from one cached aggregate
+    summary_counts = get_doctor_metrics(doctor_profile)
     context = {
         "doctor": doctor_profile,
-        "today_appointments": today_appointments,
+        "today_appointments": summary_counts["today_appointments"],
         "summary_counts" : summary_counts,
     }
 
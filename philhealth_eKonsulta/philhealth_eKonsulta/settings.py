@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
+import os  # (10/19/2026) - PKA credentials come from the environment
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -122,6 +123,16 @@ else:
     }
 
 
+# (10/19/2026) - Cache used for dashboard metrics. LocMem is per process, switch to a shared
+# backend (Redis/Memcached) when running several workers so invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ekonsulta',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -162,3 +173,28 @@ STATIC_URL = 'static/'
 # Media files (Uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# (10/19/2026) - ICD-10 reference file used for diagnosis code autocomplete
+ICD10_CODES_FILE = BASE_DIR / 'doctor' / 'data' / 'icd10_codes.csv'
+
+# (10/19/2026) - Drug interaction reference file loaded with `load_drug_interactions`
+DRUG_INTERACTIONS_FILE = BASE_DIR / 'doctor' / 'data' / 'drug_interactions.csv'
+
+# (10/19/2026) - Cached PDF statements and receipts, named by content hash
+FINANCE_DOCUMENTS_DIR = MEDIA_ROOT / 'finance_documents'
+# Render them in a background thread after billing and payment saves
+FINANCE_DOCUMENTS_PRERENDER = True
+
+# (10/19/2026) - PhilHealth Konsulta API (PKA). Leave PKA_BASE_URL empty to keep claim numbers
+# typed in by hand; `py manage.py pka_mock_server` serves a local mock at http://127.0.0.1:8765/api
+PKA_BASE_URL = os.environ.get('PKA_BASE_URL', '')
+PKA_USERNAME = os.environ.get('PKA_USERNAME', '')
+PKA_PASSWORD = os.environ.get('PKA_PASSWORD', '')
+PKA_CERTIFICATION_ID = os.environ.get('PKA_CERTIFICATION_ID', '')
+PKA_HOSPITAL_CODE = os.environ.get('PKA_HOSPITAL_CODE', '')
+PKA_TIMEOUT = 30
+# Pooled keep-alive connections, which is also the number of PhilHealth calls in flight at once
+PKA_MAX_CONNECTIONS = 4
+PKA_MAX_RETRIES = 3
+# Registration checks made while a patient is being saved: no retries, at most this long per step
+PKA_CHECK_TIMEOUT = 5
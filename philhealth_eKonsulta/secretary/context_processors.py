@@ -3,8 +3,16 @@ from .models import Appointment, Patient
 #   global counts for the sectary
 #-------------------------------------
 
+# (Old Code) - counted on every page render
+# def global_counts(request):
+#     return{
+#         'patients_count': Patient.objects.count(),
+#         'appointments_count': Appointment.objects.count(),
+#     }
+
+# (10/19/2026) - Pass the count methods so templates only query when they actually show the numbers
 def global_counts(request):
     return{
-        'patients_count': Patient.objects.count(),
-        'appointments_count': Appointment.objects.count(),
-    }
\ No newline at end of file
+        'patients_count': Patient.objects.count,
+        'appointments_count': Appointment.objects.count,
+    }
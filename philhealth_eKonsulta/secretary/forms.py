@@ -4,6 +4,9 @@ from .models import Patient, Appointment
 # Update by Gocotano - as of 2025-12-13
 # Added calendar widget for birth_date
 class PatientForm(forms.ModelForm):
+    # (10/19/2026) - Room for the dashes printed on PhilHealth IDs, they are stripped below
+    philhealth_pin = forms.CharField(max_length=14, required=False)
+
     class Meta:
         model = Patient
         fields = '__all__'
@@ -11,6 +14,13 @@ class PatientForm(forms.ModelForm):
             'birth_date': forms.DateInput(attrs={'type': 'date'}),
         }
 
+    # (10/19/2026) - PhilHealth PINs are 12 digits; dashes as printed on the ID are dropped
+    def clean_philhealth_pin(self):
+        pin = self.cleaned_data.get('philhealth_pin', '').replace('-', '').strip()
+        if pin and (len(pin) != 12 or not pin.isdigit()):
+            raise forms.ValidationError('Enter the 12-digit PhilHealth PIN.')
+        return pin
+
 # Add by Gocotano - as of 2025-12-13
 # Form for single document upload
 class SingleDocumentForm(forms.Form):
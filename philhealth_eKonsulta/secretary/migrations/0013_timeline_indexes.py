@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('login', '0011_alter_customuser_id_alter_doctorprofile_id_and_more'),
+        ('secretary', '0012_alter_appointment_id_alter_patient_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', '-date'], name='appointment_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdocument',
+            index=models.Index(fields=['patient', '-uploaded_at'], name='document_patient_uploaded_idx'),
+        ),
+    ]
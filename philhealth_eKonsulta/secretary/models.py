@@ -34,6 +34,11 @@ class Patient(models.Model):
     address = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     medical_history = models.TextField(blank=True, null=True)
+    # (10/19/2026) - PhilHealth Identification Number, checked against PKA isMemberRegistered on save.
+    # konsulta_registered stays None until PhilHealth has answered.
+    philhealth_pin = models.CharField(max_length=12, blank=True, default='')
+    konsulta_registered = models.BooleanField(null=True, blank=True, editable=False)
+    konsulta_checked_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -58,6 +63,13 @@ class Appointment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     time = models.TimeField()
     notes = models.TextField (blank = True)
+
+    class Meta:
+        indexes = [
+            # (10/19/2026) - Patient timeline reads a patient's appointments newest first
+            models.Index(fields=['patient', '-date'], name='appointment_patient_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.patient} -  {self.date} ({self.status})"
 
@@ -72,6 +84,12 @@ class PatientDocument(models.Model):
     description = models.CharField(max_length=255, blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # (10/19/2026) - Patient timeline reads a patient's documents newest first
+            models.Index(fields=['patient', '-uploaded_at'], name='document_patient_uploaded_idx'),
+        ]
+
     def __str__(self):
         return f"Document for {self.patient} - {self.description or 'No description'}"
 
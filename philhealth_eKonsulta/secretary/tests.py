@@ -1,3 +1,81 @@
-from django.test import TestCase
+import datetime
+import time
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from login.models import CustomUser, DoctorProfile
+from .models import Patient, Appointment
+from .timeline import patient_timeline, InvalidCursor
+from .views import check_konsulta_registration
+from finance.pka import reset_pka_client
+from finance.pka_mock import MockPKAServer
 
-# Create your tests here.
+
+# (10/19/2026) - Cursor pagination over the merged patient timeline
+class PatientTimelineTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='doctor1', password='x', role='DOCTOR')
+        doctor = DoctorProfile.objects.create(
+            user=user, first_name='Test', last_name='Doctor', employee_id='EMP1',
+            specialization='General', license_number='LIC1', phone='09170000000', email='doctor@example.com'
+        )
+        self.patient = Patient.objects.create(
+            first_name='Test', last_name='Patient', birth_date=datetime.date(1990, 1, 1),
+            gender='Male', contact_number='09170000000'
+        )
+        # Pairs share a timestamp so page breaks fall between rows that tie on it
+        start = timezone.now().replace(microsecond=0)
+        for n in range(7):
+            Appointment.objects.create(
+                patient=self.patient, doctor=doctor, date=start - datetime.timedelta(days=n // 2),
+                time=datetime.time(9), status='PENDING'
+            )
+
+    def test_pages_cover_everything_once(self):
+        everything, cursor = patient_timeline(self.patient, limit=100)
+        self.assertIsNone(cursor)
+        self.assertEqual(len(everything), 7)
+
+        pages = []
+        cursor = None
+        while True:
+            items, cursor = patient_timeline(self.patient, cursor=cursor, limit=2)
+            pages.append(items)
+            if cursor is None:
+                break
+        self.assertEqual([len(items) for items in pages], [2, 2, 2, 1])
+        self.assertEqual([item['id'] for items in pages for item in items], [item['id'] for item in everything])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            patient_timeline(self.patient, cursor='not-a-cursor')
+
+
+# (10/19/2026) - A slow PhilHealth only delays the patient save by PKA_CHECK_TIMEOUT
+class KonsultaRegistrationTests(TestCase):
+    def setUp(self):
+        self.server = MockPKAServer(username='hci', password='secret', registered_pins={'123456789012'}).start()
+        self.addCleanup(self.server.stop)
+        reset_pka_client()
+        self.addCleanup(reset_pka_client)
+        self.patient = Patient.objects.create(
+            first_name='Test', last_name='Patient', birth_date=datetime.date(1990, 1, 1),
+            gender='Male', contact_number='09170000000', philhealth_pin='123456789012'
+        )
+
+    def check(self):
+        with override_settings(PKA_BASE_URL=self.server.url, PKA_USERNAME='hci', PKA_PASSWORD='secret', PKA_CHECK_TIMEOUT=0.2):
+            check_konsulta_registration(self.patient)
+        self.patient.refresh_from_db()
+
+    def test_registered(self):
+        self.check()
+        self.assertIs(self.patient.konsulta_registered, True)
+
+    def test_slow_answer_is_not_waited_for(self):
+        self.server.latency = 1.0
+        started = time.monotonic()
+        with self.assertLogs('secretary.views', 'WARNING'):
+            self.check()
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertIsNone(self.patient.konsulta_registered)
+        self.assertEqual(self.server.stats['getToken'], 1)
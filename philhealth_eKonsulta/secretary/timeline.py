@@ -0,0 +1,154 @@
+# (10/19/2026) - Unified patient timeline: appointments, consultations, prescriptions,
+# documents, billings and transactions merged newest-first with cursor pagination.
+#
+# Every source runs its own indexed query limited to one page, then heapq.merge does a
+# k-way merge of the already-sorted streams. The cursor is the (timestamp, source, id) of
+# the last item returned, so the next page starts exactly where the previous one ended.
+
+import base64
+import heapq
+import json
+from datetime import datetime
+from django.db.models import Q
+from doctor.models import Consultation, Prescription
+from finance.models import Billing, Transaction
+from .models import Appointment, PatientDocument
+
+TIMELINE_PAGE_SIZE = 25
+TIMELINE_MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _appointments(patient):
+    return Appointment.objects.filter(patient=patient).values(
+        'id', 'date', 'status', 'notes', 'doctor__first_name', 'doctor__last_name'
+    ), 'date', lambda row: {
+        'title': f"Appointment with Dr. {row['doctor__first_name']} {row['doctor__last_name']}",
+        'status': row['status'],
+        'notes': row['notes'],
+    }
+
+
+def _consultations(patient):
+    return Consultation.objects.filter(appointment__patient=patient).values(
+        'id', 'date', 'status', 'diagnosis', 'diagnosis_code__code', 'appointment_id'
+    ), 'date', lambda row: {
+        'title': 'Consultation',
+        'status': row['status'],
+        'diagnosis': row['diagnosis'],
+        'diagnosis_code': row['diagnosis_code__code'],
+        'appointment_id': row['appointment_id'],
+    }
+
+
+def _prescriptions(patient):
+    return Prescription.objects.filter(consultation__appointment__patient=patient).values(
+        'id', 'created_at', 'quantity', 'doctor_prescription', 'medicine__name', 'consultation_id'
+    ), 'created_at', lambda row: {
+        'title': f"Prescribed {row['medicine__name']} x{row['quantity']}",
+        'instructions': row['doctor_prescription'],
+        'consultation_id': row['consultation_id'],
+    }
+
+
+def _documents(patient):
+    return PatientDocument.objects.filter(patient=patient).values(
+        'id', 'uploaded_at', 'original_filename', 'description'
+    ), 'uploaded_at', lambda row: {
+        'title': f"Document uploaded: {row['original_filename'] or 'file'}",
+        'description': row['description'],
+    }
+
+
+def _billings(patient):
+    return Billing.objects.filter(consultation__appointment__patient=patient).values(
+        'id', 'created_at', 'status', 'total_amount'
+    ), 'created_at', lambda row: {
+        'title': f"Billing of ₱{row['total_amount']}",
+        'status': row['status'],
+        'total_amount': str(row['total_amount']),
+    }
+
+
+def _transactions(patient):
+    return Transaction.objects.filter(billing__consultation__appointment__patient=patient).values(
+        'id', 'created_at', 'amount', 'payment_method', 'reference_number', 'billing_id'
+    ), 'created_at', lambda row: {
+        'title': f"{row['payment_method'].title()} payment of ₱{row['amount']}",
+        'amount': str(row['amount']),
+        'payment_method': row['payment_method'],
+        'reference_number': row['reference_number'],
+        'billing_id': row['billing_id'],
+    }
+
+
+# Order matters: it is the tie-breaker between sources for events with the same timestamp
+TIMELINE_SOURCES = [
+    ('appointment', _appointments),
+    ('consultation', _consultations),
+    ('prescription', _prescriptions),
+    ('document', _documents),
+    ('billing', _billings),
+    ('transaction', _transactions),
+]
+
+
+def encode_cursor(timestamp, source_rank, pk):
+    raw = json.dumps([timestamp.isoformat(), source_rank, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, source_rank, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(source_rank), int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid timeline cursor')
+
+
+# (10/19/2026) - Keyset filter: everything strictly "older" than the cursor in (timestamp, source, id) order
+def _before_cursor(field, source_rank, cursor):
+    timestamp, cursor_rank, cursor_pk = cursor
+    if source_rank < cursor_rank:
+        return Q(**{f'{field}__lte': timestamp})
+    if source_rank > cursor_rank:
+        return Q(**{f'{field}__lt': timestamp})
+    return Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'id__lt': cursor_pk})
+
+
+def _source_stream(rank, kind, rows, field, describe):
+    for row in rows:
+        item = {'type': kind, 'id': row['id'], 'timestamp': row[field].isoformat()}
+        item.update(describe(row))
+        yield (row[field], rank, row['id']), item
+
+
+# (10/19/2026) - One page of the patient's history, newest first, plus the cursor for the next page
+def patient_timeline(patient, cursor=None, limit=TIMELINE_PAGE_SIZE):
+    limit = max(1, min(int(limit), TIMELINE_MAX_PAGE_SIZE))
+    position = decode_cursor(cursor) if cursor else None
+
+    streams = []
+    for rank, (kind, source) in enumerate(TIMELINE_SOURCES):
+        rows, field, describe = source(patient)
+        if position:
+            rows = rows.filter(_before_cursor(field, rank, position))
+        # No source can contribute more than a page, so one bounded query per source is enough
+        rows = rows.order_by(f'-{field}', '-id')[:limit]
+        streams.append(_source_stream(rank, kind, rows, field, describe))
+
+    merged = heapq.merge(*streams, key=lambda entry: entry[0], reverse=True)
+    page = []
+    for sort_key, item in merged:
+        page.append((sort_key, item))
+        if len(page) == limit:
+            break
+
+    next_cursor = None
+    if len(page) == limit:
+        timestamp, rank, pk = page[-1][0]
+        next_cursor = encode_cursor(timestamp, rank, pk)
+    return [item for _, item in page], next_cursor
@@ -10,6 +10,8 @@ urlpatterns = [
     path('patients/<int:pk>/delete/', views.patient_delete, name='patient_delete'),
     # Add by Gocotano - as of 2025-12-13
     path('patients/<int:pk>/', views.patient_detail, name='patient_detail'),
+    # (10/19/2026) - Unified patient history, cursor paginated
+    path('patients/<int:pk>/timeline/', views.patient_timeline_api, name='patient_timeline'),
     path('documents/<int:pk>/delete/', views.delete_patient_document, name='delete_patient_document'),
     path('pictures/<int:pk>/delete/', views.delete_patient_picture, name='delete_patient_picture'),
 
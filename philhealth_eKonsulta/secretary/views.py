@@ -4,6 +4,40 @@ from .models import Appointment, Patient, PatientDocument, PatientPicture
 from .forms import AppointmentForm, PatientForm, SingleDocumentForm, SinglePictureForm
 # Add by Gocotano - as of 2025-12-13
 from django.db.models import Q
+# (10/19/2026) - Patient timeline API
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from .timeline import patient_timeline, TIMELINE_PAGE_SIZE
+# (10/19/2026) - Konsulta registration check through the PhilHealth Konsulta API
+import logging
+from django.conf import settings
+from finance.pka import get_pka_client, PKAError
+
+logger = logging.getLogger(__name__)
+
+
+# (10/19/2026) - Ask PhilHealth (isMemberRegistered) whether the patient is registered for
+# Konsulta. A PKA outage keeps the previous answer and never stops the patient from being saved;
+# the check runs with PKA_CHECK_TIMEOUT and no retries so an outage only delays the save briefly.
+def check_konsulta_registration(patient):
+    if not patient.philhealth_pin:
+        # A removed PIN also removes the answer given for it
+        if patient.konsulta_registered is not None:
+            Patient.objects.filter(pk=patient.pk).update(konsulta_registered=None, konsulta_checked_at=None)
+        return
+    client = get_pka_client()
+    if client is None:
+        return
+    try:
+        data = client.is_member_registered(patient.philhealth_pin, timeout=settings.PKA_CHECK_TIMEOUT)
+    except PKAError as error:
+        logger.warning('Konsulta registration check failed for patient %s: %s', patient.pk, error)
+        return
+    patient.konsulta_registered = bool(data.get('registered'))
+    patient.konsulta_checked_at = timezone.now()
+    Patient.objects.filter(pk=patient.pk).update(
+        konsulta_registered=patient.konsulta_registered, konsulta_checked_at=patient.konsulta_checked_at
+    )
 
 
 
@@ -34,6 +68,7 @@ def patient_create(request):
 
         if form.is_valid():
             patient = form.save()
+            check_konsulta_registration(patient)
 
             # Handle single document upload
             if 'document' in request.FILES:
@@ -79,6 +114,9 @@ def patient_update(request, pk):
 
         if form.is_valid():
             form.save()
+            # (10/19/2026) - Only ask PhilHealth again when the PIN changed or was never answered
+            if 'philhealth_pin' in form.changed_data or patient.konsulta_registered is None:
+                check_konsulta_registration(patient)
 
             # Handle single document upload
             if 'document' in request.FILES:
@@ -127,6 +165,20 @@ def patient_detail(request, pk):
     patient = get_object_or_404(Patient, pk=pk)
     return render(request, 'patient/patient_detail.html', {'patient': patient})
 
+# (10/19/2026) - Patient timeline API: ?cursor=<next_cursor from the previous page>&limit=25
+@login_required
+def patient_timeline_api(request, pk):
+    patient = get_object_or_404(Patient, pk=pk)
+    try:
+        items, next_cursor = patient_timeline(
+            patient,
+            cursor=request.GET.get('cursor') or None,
+            limit=request.GET.get('limit') or TIMELINE_PAGE_SIZE,
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor or limit'}, status=400)
+    return JsonResponse({'results': items, 'next_cursor': next_cursor})
+
 # Add by Gocotano - as of 2025-12-13
 def delete_patient_document(request, pk):
     document = get_object_or_404(PatientDocument, pk=pk)